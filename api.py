@@ -1,131 +1,640 @@
-from fastapi import FastAPI, UploadFile, File, Response, HTTPException
+from fastapi import FastAPI, UploadFile, File, Header, Request, Response, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
 from pydantic import BaseModel
 import pandas as pd
-import joblib
-from preprocessing import nettoyage_automatisé  # Assurez-vous que c'est la bonne fonction
-import io
-from langdetect import detect, LangDetectException
-import nltk
+from contextlib import asynccontextmanager
+from preprocessing import nettoyage_automatisé, nettoyage_parallele, nettoyage_par_morceaux, default_engine, OUTPUT_COLUMNS  # Assurez-vous que c'est la bonne fonction
+from preprocessing import add_stage_observer, notifier_etape
+import asyncio
+import hmac
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Optional
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+from language import detecter_langues_lot
+from batching import MicroBatcher, traiter_en_flux
+from execution import bulk_lane, interactive_lane, jobs_lane, stream_lane, QueueFullError, PoolUnavailableError
+from model_store import model_store, ModelNotReadyError
+from cache import prediction_cache
+from startup import readiness, verifier_ressources_nltk, ServiceNotReadyError
+from formats import (MEDIA_TYPES, STREAMABLE_OUTPUTS, JSON_LAYOUTS, FormatNonSupporte, format_entree, format_sortie,
+                     lire_tableau, lire_par_morceaux, ecrire_tableau)
+from batch import traiter_fichier, sentiment_labels
+from jobs import JobStore, JobNotFoundError, JobLeaseLostError, DONE, FAILED
+from metrics import histogram, counter, gauge, exposition
+from logs import configurer_logging
 
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Phrase utilisée pour préchauffer tout le pipeline avant d'annoncer le service prêt
+PHRASE_PRECHAUFFAGE = "This movie was a wonderful surprise, the actors were great and the story moving."
 
-# Charger le modèle
-model = joblib.load("model/bernoulli_model.joblib")
+# Intervalle de vérification du fichier modèle pour le rechargement à chaud (0 = désactivé)
+MODEL_WATCH_SECONDS = float(os.environ.get("MODEL_WATCH_SECONDS", "30"))
 
-# Définir un modèle Pydantic pour l'entrée de texte
-class TextInput(BaseModel):
-    text: str
+# Jeton attendu dans l'en-tête X-Admin-Token des endpoints d'administration (vide = désactivés)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# Préchauffer langdetect, NLTK (WordNet compris) et le scorer avec une vraie prédiction
+def prechauffer():
+    predire_textes([PHRASE_PRECHAUFFAGE])
+
+# Préchauffer un nouveau scorer avant qu'il remplace l'ancien
+model_store.warmup = lambda scorer: scorer.predict([PHRASE_PRECHAUFFAGE])
+
+# Recharger le modèle dès que son fichier change (réentraînement hebdomadaire)
+async def surveiller_modele(intervalle):
+    while True:
+        await asyncio.sleep(intervalle)
+        if readiness.ready and model_store.has_changed():
+            try:
+                if await asyncio.to_thread(model_store.reload):
+                    logger.info("Nouveau modèle en service", extra={'model_version': model_store.version[:16]})
+            except Exception:
+                # L'ancien modèle reste en service
+                logger.exception("Échec du rechargement du modèle")
+
+# Démarrage en arrière-plan : /healthz répond tout de suite, /readyz une fois le modèle chargé et préchauffé
+@asynccontextmanager
+async def lifespan(app):
+    global cleaning_pool
+    configurer_logging()
+    cleaning_pool = creer_pool_nettoyage()
+    taches = [asyncio.create_task(readiness.demarrer(verifier_ressources_nltk, model_store.load, prechauffer))]
+    if MODEL_WATCH_SECONDS > 0:
+        taches.append(asyncio.create_task(surveiller_modele(MODEL_WATCH_SECONDS)))
+    arret_jobs.clear()
+    app.state.nouveau_job = asyncio.Event()
+    taches.extend(asyncio.create_task(executer_jobs(app.state.nouveau_job)) for _ in range(jobs_lane.max_workers))
+    yield
+    # Les jobs en cours s'arrêtent à la fin de leur morceau et seront repris au redémarrage
+    arret_jobs.set()
+    for tache in taches:
+        tache.cancel()
+    # Arrêter les pools de travail avec le serveur
+    interactive_lane.shutdown(wait=False)
+    stream_lane.shutdown(wait=False)
+    bulk_lane.shutdown(wait=True)
+    jobs_lane.shutdown(wait=True)
+    if cleaning_pool is not None:
+        cleaning_pool.shutdown(wait=False, cancel_futures=True)
+        cleaning_pool = None
+    # Écrire dans la base SQLite les prédictions encore en attente
+    prediction_cache.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Bornes des histogrammes de durée (secondes) et de taille des corps de requête et de réponse (octets)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+PAYLOAD_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, 1_000_000_000)
+
+# Durée, lignes traitées et lignes supprimées de chaque étape du prétraitement et de la prédiction
+@add_stage_observer
+def mesurer_etape(etape, secondes, lignes_entree, lignes_sortie):
+    histogram('preprocessing_stage_seconds', "Durée de chaque étape du prétraitement et de la prédiction",
+              STAGE_BUCKETS, stage=etape).observe(secondes)
+    counter('preprocessing_rows_total', "Lignes reçues par chaque étape", stage=etape).inc(lignes_entree)
+    if lignes_entree != lignes_sortie:
+        # Lignes non anglaises, vides (NaN) ou en double supprimées par les filtres
+        counter('preprocessing_rows_dropped_total', "Lignes supprimées par chaque étape de filtrage",
+                stage=etape).inc(lignes_entree - lignes_sortie)
+
+# Latence, statut et taille des requêtes par endpoint (chemin de la route, pas l'URL : /jobs/{job_id})
+@app.middleware("http")
+async def mesurer_requete(request: Request, call_next):
+    debut = time.perf_counter()
+    response = await call_next(request)
+    # Pour une réponse en streaming, la durée s'arrête à l'envoi des en-têtes
+    duree = time.perf_counter() - debut
+    route = request.scope.get('route')
+    endpoint = route.path if route is not None else 'inconnu'
+    histogram('http_request_duration_seconds', "Durée de traitement des requêtes par endpoint",
+              LATENCY_BUCKETS, endpoint=endpoint, method=request.method).observe(duree)
+    counter('http_requests_total', "Requêtes par endpoint et statut",
+            endpoint=endpoint, method=request.method, status=response.status_code).inc()
+    if request.headers.get('content-length'):
+        histogram('http_request_size_bytes', "Taille du corps des requêtes par endpoint",
+                  PAYLOAD_BUCKETS, endpoint=endpoint).observe(int(request.headers['content-length']))
+    if response.headers.get('content-length'):
+        histogram('http_response_size_bytes', "Taille du corps des réponses par endpoint (hors streaming)",
+                  PAYLOAD_BUCKETS, endpoint=endpoint).observe(int(response.headers['content-length']))
+    return response
+
+# Occupation des pools et du cache, lues à chaque exposition des métriques
+for lane in (interactive_lane, bulk_lane, stream_lane, jobs_lane):
+    gauge('lane_pending_tasks', "Tâches en cours ou en attente dans le pool", lambda lane=lane: lane.pending, lane=lane.name)
+    gauge('lane_rejected_tasks', "Tâches refusées (file pleine) depuis le démarrage", lambda lane=lane: lane.rejected, lane=lane.name)
+gauge('prediction_cache_hits', "Prédictions servies par le cache en mémoire", lambda: prediction_cache.hits)
+gauge('prediction_cache_misses', "Prédictions calculées par le modèle", lambda: prediction_cache.misses)
+gauge('model_ready', "1 si le modèle est chargé et le service prêt", lambda: int(readiness.ready))
 
-# Fonction pour détecter si le texte est en anglais
-def is_english(text: str) -> bool:
+MESSAGE_NON_ANGLAIS = "Le commentaire n'est pas en anglais. Veuillez entrer un commentaire en anglais."
+
+# Erreurs qui gardent leur propre réponse (400, 415, 503...) au lieu d'être transformées en 500
+ERREURS_TRANSMISES = (HTTPException, FormatNonSupporte, ModelNotReadyError, ServiceNotReadyError)
+
+# File d'attente pleine : le client doit réessayer plus tard
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Pool arrêté (par ex. pendant l'extinction du serveur)
+@app.exception_handler(PoolUnavailableError)
+async def pool_unavailable_handler(request: Request, exc: PoolUnavailableError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+# Service en cours de démarrage : modèle pas encore chargé
+@app.exception_handler(ModelNotReadyError)
+@app.exception_handler(ServiceNotReadyError)
+async def not_ready_handler(request: Request, exc: Exception):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Format de fichier inconnu ou dépendance optionnelle (pyarrow) absente
+@app.exception_handler(FormatNonSupporte)
+async def format_handler(request: Request, exc: FormatNonSupporte):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+# Job inconnu
+@app.exception_handler(JobNotFoundError)
+async def job_not_found_handler(request: Request, exc: JobNotFoundError):
+    return JSONResponse(status_code=404, content={"detail": f"Job inconnu : {exc.args[0]}."})
+
+# Le processus répond (sonde de vie)
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+# Le modèle est chargé et le pipeline préchauffé (sonde de disponibilité)
+@app.get("/readyz")
+async def readyz():
+    readiness.check()
+    return {"status": "ready", "model_version": model_store.version, "startup_seconds": readiness.startup_seconds}
+
+# Recharger le modèle à chaud (après un réentraînement), sans redémarrer le serveur.
+# Seul le worker qui reçoit la requête recharge : les autres workers uvicorn suivent
+# à la prochaine vérification du fichier (MODEL_WATCH_SECONDS)
+@app.post("/admin/reload-model")
+async def reload_model(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN or not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide.")
     try:
-        lang = detect(text)
-        return lang == 'en'
-    except LangDetectException:
-        return False
+        reloaded = await asyncio.to_thread(model_store.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Échec du rechargement du modèle : {str(e)}")
+    return {"reloaded": reloaded, "model_version": model_store.version}
 
-# Endpoint pour le nettoyage et la prédiction de sentiments à partir d'un fichier CSV/TSV
-@app.post("/predict-sentiment/")
-async def predict_sentiment(file: UploadFile = File(...)):
+# Nombre de processus de nettoyage des fichiers par worker uvicorn (0 = nettoyage dans le thread du pool 'bulk').
+# Le nettoyage des gros fichiers, en Python pur, se fait hors du processus de l'API et ne dispute pas le GIL aux
+# requêtes interactives. Par défaut, les cœurs sont partagés entre les workers uvicorn (WEB_CONCURRENCY, que
+# uvicorn lit pour --workers), avec au moins un processus par worker
+UVICORN_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+CLEANING_WORKERS = int(os.environ.get("CLEANING_WORKERS", str(max(1, (os.cpu_count() or 1) // UVICORN_WORKERS))))
+
+# Pool de nettoyage, créé au démarrage du serveur (lifespan) et arrêté avec lui
+cleaning_pool = None
+
+# Start the cleaning processes without forking the API process
+def creer_pool_nettoyage():
+    if CLEANING_WORKERS < 1:
+        return None
+    # forkserver (spawn à défaut) : un fork du processus de l'API, dont les threads (pools, écriture du cache,
+    # baux des jobs) peuvent tenir des verrous à cet instant, pourrait bloquer les processus créés
+    methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=CLEANING_WORKERS, mp_context=multiprocessing.get_context(methode))
+
+# Nettoyer un fichier complet, en parallèle si un pool de processus est configuré
+def nettoyer_fichier(df, engine=None):
+    if cleaning_pool is None:
+        return nettoyage_automatisé(df, engine)
+    return nettoyage_parallele(df, CLEANING_WORKERS, executor=cleaning_pool, engine=engine)
+
+# Lire le paramètre 'fields' (noms de colonnes séparés par des virgules), None = toutes les colonnes
+def colonnes_demandees(fields):
+    if not fields:
+        return None
+    return tuple(name.strip() for name in fields.split(',') if name.strip())
+
+# Moteur de prétraitement ne calculant que les colonnes demandées ('cleaned_text' en plus pour prédire)
+@lru_cache(maxsize=32)
+def moteur_pour(colonnes, prediction=False):
+    if colonnes is None:
+        return default_engine
+    colonnes = [name for name in OUTPUT_COLUMNS if name in colonnes or (prediction and name == 'cleaned_text')]
+    return default_engine.with_columns(colonnes)
+
+# Vérifier la disposition demandée pour la sortie JSON
+def verifier_layout(layout):
+    if layout not in JSON_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Disposition inconnue : {layout} (valeurs possibles : {', '.join(JSON_LAYOUTS)}).")
+
+# Ne garder que les colonnes demandées, dans l'ordre demandé
+def selectionner_colonnes(df, colonnes):
+    if colonnes is None:
+        return df
+    manquantes = [name for name in colonnes if name not in df.columns]
+    if manquantes:
+        raise HTTPException(status_code=400, detail=f"Colonnes inconnues : {', '.join(manquantes)}.")
+    return df[list(colonnes)]
+
+# Nombre de lignes lues et nettoyées à la fois en mode streaming
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", "10000"))
+
+# Le cache ne sert que les prédictions du modèle en service
+prediction_cache.current_version = lambda: model_store.version
+
+# Prédire avec le modèle en service, en réutilisant les prédictions déjà calculées pour un même texte nettoyé
+def predire(textes):
+    scorer, version = model_store.current()
+    debut = time.perf_counter()
+    predictions = prediction_cache.predict(textes, scorer, version)
+    notifier_etape('predict', time.perf_counter() - debut, len(textes), len(predictions))
+    return predictions
+
+
+# Ajouter la colonne 'sentiment' prédite à partir de 'cleaned_text'
+def ajouter_sentiments(df_cleaned):
+    predictions = predire(df_cleaned['cleaned_text'])
+    df_cleaned['sentiment'] = [sentiment_labels.get(pred, 'Neutre') for pred in predictions]
+    return df_cleaned
+
+# Lire, nettoyer et prédire un fichier morceau par morceau, en renvoyant des lignes TSV ou NDJSON
+def generer_par_morceaux(fichier, format_in='tsv', format_out='tsv', chunksize=STREAM_CHUNK_ROWS, colonnes=None):
+    reader = lire_par_morceaux(fichier, format_in, chunksize)
+    header = True
     try:
-        content = await file.read()
+        for df_cleaned in nettoyage_par_morceaux(reader, moteur_pour(colonnes, prediction=True),
+                                                 executor=cleaning_pool, n_workers=CLEANING_WORKERS):
+            df_cleaned = selectionner_colonnes(ajouter_sentiments(df_cleaned), colonnes)
+            yield ecrire_tableau(df_cleaned, format_out, header=header)
+            header = False
+    finally:
+        # Fermer le lecteur tant que le fichier reçu est encore ouvert
+        reader.close()
 
-        # Lire le fichier TSV original
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')), sep='\t')
-        print(f"Taille du fichier original : {df.shape}")
+# Parcourir un générateur synchrone dans le pool 'bulk', un morceau à la fois
+async def iterer_dans_pool(morceaux, premier_morceau):
+    yield premier_morceau
+    while True:
+        # Le flux est déjà admis : ses morceaux suivants ne sont pas refusés si la file est pleine
+        morceau = await bulk_lane.run(next, morceaux, None, reject_when_full=False)
+        if morceau is None:
+            break
+        yield morceau
 
-        # Appliquer le prétraitement
-        df_cleaned = nettoyage_automatisé(df)
-        print(f"Taille après nettoyage : {df_cleaned.shape}")
+# Définir un modèle Pydantic pour l'entrée de texte
+class TextInput(BaseModel):
+    text: str
+
+# Nettoyage et prédiction de sentiments d'un fichier complet (exécuté dans le pool 'bulk')
+def predire_fichier(content, format_in='tsv', format_out='tsv', colonnes=None, layout='records'):
+    try:
+        # Lire le fichier original directement depuis les octets reçus
+        df = lire_tableau(content, format_in)
+        logger.debug("Fichier reçu", extra={'rows': len(df), 'columns': df.shape[1]})
+
+        # Appliquer le prétraitement (seulement les colonnes demandées)
+        df_cleaned = nettoyer_fichier(df, moteur_pour(colonnes, prediction=True))
+        logger.debug("Fichier nettoyé", extra={'rows': len(df_cleaned), 'dropped_rows': len(df) - len(df_cleaned)})
 
         # Vérifier que la colonne textuelle 'cleaned_text' est présente
         if 'cleaned_text' not in df_cleaned.columns:
             raise HTTPException(status_code=400, detail="Colonne textuelle 'cleaned_text' manquante après le nettoyage.")
 
         # Prédire le sentiment
-        predictions = model.predict(df_cleaned['cleaned_text'])
-        print(f"Nombre de prédictions générées : {len(predictions)}")
+        predictions = predire(df_cleaned['cleaned_text'])
 
         # Assurez-vous que les tailles correspondent
         if len(predictions) != len(df_cleaned):
             raise HTTPException(status_code=500, detail="Le nombre de prédictions ne correspond pas au nombre de lignes après nettoyage.")
 
         # Mapper les prédictions (0, 1 -> Négatif) et (3, 4 -> Positif)
-        sentiment_labels = {0: 'Négatif', 1: 'Négatif', 3: 'Positif', 4: 'Positif'}
         df_cleaned['sentiment'] = [sentiment_labels.get(pred, 'Neutre') for pred in predictions]
 
-        # Convertir le DataFrame nettoyé avec les prédictions en TSV
-        output = df_cleaned.to_csv(sep='\t', index=False)
-
-        # Renvoyer le fichier TSV nettoyé avec les prédictions
-        return Response(content=output, media_type="text/tsv")
+        # Convertir le DataFrame nettoyé avec les prédictions dans le format demandé
+        return ecrire_tableau(selectionner_colonnes(df_cleaned, colonnes), format_out, layout=layout)
+    except ERREURS_TRANSMISES:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {str(e)}")
 
-# Endpoint pour le nettoyage seul à partir d'un fichier CSV/TSV
-@app.post("/clean-csv/")
-async def clean_csv(file: UploadFile = File(...)):
+# Endpoint pour le nettoyage et la prédiction de sentiments à partir d'un fichier TSV, NDJSON, Parquet ou Arrow.
+# Le format d'entrée suit le Content-Type (ou l'extension) du fichier, celui de sortie le paramètre
+# 'format' ou l'en-tête Accept (TSV par défaut). 'fields' limite la réponse (et le calcul) à certaines
+# colonnes, 'layout=columns' renvoie le JSON colonne par colonne
+@app.post("/predict-sentiment/")
+async def predict_sentiment(request: Request, file: UploadFile = File(...), stream: bool = False,
+                            format: Optional[str] = None, fields: Optional[str] = None, layout: str = 'records'):
+    # 503 tant que le modèle n'est pas chargé et préchauffé, avant de lire et nettoyer le fichier
+    readiness.check()
+    format_in = format_entree(file.content_type, file.filename)
+    format_out = format_sortie(format, request.headers.get("accept"))
+    colonnes = colonnes_demandees(fields)
+    verifier_layout(layout)
+
+    # Mode streaming : lecture par morceaux et envoi des lignes dès qu'elles sont prédites
+    if stream:
+        if format_out not in STREAMABLE_OUTPUTS:
+            raise HTTPException(status_code=406, detail=f"Le format '{format_out}' ne peut pas être envoyé en streaming.")
+        morceaux = generer_par_morceaux(file.file, format_in, format_out, colonnes=colonnes)
+        try:
+            # Traiter le premier morceau avant de répondre pour renvoyer une vraie erreur si le fichier est invalide
+            premier_morceau = await bulk_lane.run(next, morceaux, '')
+        except (QueueFullError, PoolUnavailableError) + ERREURS_TRANSMISES:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {str(e)}")
+        return StreamingResponse(iterer_dans_pool(morceaux, premier_morceau), media_type=MEDIA_TYPES[format_out])
+
     content = await file.read()
+    output = await bulk_lane.run(predire_fichier, content, format_in, format_out, colonnes, layout)
+
+    # Renvoyer le fichier nettoyé avec les prédictions
+    return Response(content=output, media_type=MEDIA_TYPES[format_out])
+
+# Nettoyage seul d'un fichier (exécuté dans le pool 'bulk'), dans le format demandé (JSON par défaut)
+def nettoyer_csv(content, format_in='tsv', format_out='json', colonnes=None, layout='records'):
     try:
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')), sep='\t')
-        df_cleaned = nettoyage_automatisé(df)
-        return df_cleaned.to_dict(orient='records')
+        df = lire_tableau(content, format_in)
+        df_cleaned = nettoyer_fichier(df, moteur_pour(colonnes))
+        return ecrire_tableau(selectionner_colonnes(df_cleaned, colonnes), format_out, layout=layout)
+    except ERREURS_TRANSMISES:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors du nettoyage : {str(e)}")
 
+# Endpoint pour le nettoyage seul à partir d'un fichier TSV, NDJSON, Parquet ou Arrow
+@app.post("/clean-csv/")
+async def clean_csv(request: Request, file: UploadFile = File(...), format: Optional[str] = None,
+                    fields: Optional[str] = None, layout: str = 'records'):
+    format_in = format_entree(file.content_type, file.filename)
+    # Sans format demandé, la réponse reste la liste JSON des enregistrements
+    format_out = format_sortie(format, request.headers.get("accept"), defaut='json')
+    verifier_layout(layout)
+    content = await file.read()
+    output = await bulk_lane.run(nettoyer_csv, content, format_in, format_out, colonnes_demandees(fields), layout)
+    return Response(content=output, media_type=MEDIA_TYPES[format_out])
+
 # Modèle pour recevoir les données nettoyées
 class CleanedDataModel(BaseModel):
     cleaned_data: list
 
-# Endpoint pour faire la prédiction à partir d'un fichier déjà nettoyé
-@app.post("/predict-from-cleaned/")
-async def predict_from_cleaned(data: CleanedDataModel):
+# Prédiction à partir de données déjà nettoyées (exécutée dans le pool 'bulk')
+def predire_depuis_nettoye(cleaned_data):
     try:
         # Convertir la liste des données nettoyées en DataFrame
-        df_cleaned = pd.DataFrame(data.cleaned_data)
+        df_cleaned = pd.DataFrame(cleaned_data)
 
         # Vérifiez que les données ont les colonnes nécessaires pour la prédiction
         if df_cleaned.empty or 'cleaned_text' not in df_cleaned.columns:
             raise HTTPException(status_code=400, detail="Les données nettoyées sont invalides ou manquent de colonnes nécessaires.")
 
         # Faire la prédiction
-        predictions = model.predict(df_cleaned['cleaned_text'])
+        predictions = predire(df_cleaned['cleaned_text'])
 
         return {"predictions": predictions.tolist()}
+    except ERREURS_TRANSMISES:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {str(e)}")
 
+# Endpoint pour faire la prédiction à partir d'un fichier déjà nettoyé
+@app.post("/predict-from-cleaned/")
+async def predict_from_cleaned(data: CleanedDataModel):
+    readiness.check()
+    return await bulk_lane.run(predire_depuis_nettoye, data.cleaned_data)
+
+# Jobs : le fichier est copié sur disque et traité en arrière-plan par morceaux, avec reprise après redémarrage
+job_store = JobStore()
+
+# Délai maximal entre deux recherches de jobs en attente (secondes)
+JOBS_POLL_SECONDS = float(os.environ.get("JOBS_POLL_SECONDS", "5"))
+
+# Arrêt propre des jobs en cours avec le serveur
+arret_jobs = threading.Event()
+
+# Traiter un job jusqu'au bout, ou jusqu'à l'arrêt du serveur (exécuté dans le pool 'jobs')
+def executer_job(job):
+    job_id, owner = job['id'], job['owner']
+    colonnes = job['fields']
+    try:
+        # Le bail du job est renouvelé pendant tout le traitement ; s'il est perdu, le traitement s'arrête
+        with job_store.lease(job, stop=arret_jobs) as bail:
+            etat = traiter_fichier(
+                job_store.input_path(job_id),
+                job_store.output_path(job_id),
+                lambda df_cleaned: selectionner_colonnes(ajouter_sentiments(df_cleaned), colonnes),
+                job['format_in'],
+                job['format_out'],
+                chunksize=STREAM_CHUNK_ROWS,
+                etat=job['progress'],
+                checkpoint=lambda progress: job_store.save_progress(job_id, progress, owner),
+                engine=moteur_pour(colonnes, prediction=True),
+                stop=bail,
+                # Nettoyage dans le pool de processus : un long job ne garde pas le GIL face aux requêtes interactives
+                executor=cleaning_pool,
+                n_workers=CLEANING_WORKERS,
+                # Bail renouvelé (et vérifié) juste avant chaque écriture : si le job a été repris pendant le
+                # morceau, rien n'est ajouté au fichier du nouveau propriétaire ; sinon personne ne peut le
+                # reprendre avant JOB_LEASE_SECONDS, bien plus que la durée d'une écriture
+                avant_ecriture=lambda: job_store.heartbeat(job_id, owner),
+            )
+        if bail.lost.is_set():
+            raise JobLeaseLostError(f"Le job {job_id} a été repris par un autre worker.")
+        if etat['done']:
+            job_store.finish(job_id, owner)
+        else:
+            job_store.release(job_id, owner)
+    except JobLeaseLostError:
+        # Un autre worker traite désormais le job : ne plus rien y écrire
+        logger.warning("Bail du job perdu, traitement abandonné", extra={'job_id': job_id})
+    except Exception as e:
+        logger.exception("Échec du job", extra={'job_id': job_id})
+        try:
+            job_store.finish(job_id, owner, error=getattr(e, 'detail', None) or str(e))
+        except JobLeaseLostError:
+            pass
+
+# Boucle d'un worker de jobs : prendre le plus ancien job en attente dès que le modèle est prêt,
+# sinon attendre la création d'un job (nouveau_job) ou au plus JOBS_POLL_SECONDS
+async def executer_jobs(nouveau_job):
+    while True:
+        if readiness.ready:
+            await asyncio.to_thread(job_store.requeue_interrupted)
+            job = await asyncio.to_thread(job_store.claim)
+            if job is not None:
+                await jobs_lane.run(executer_job, job, reject_when_full=False)
+                continue
+        nouveau_job.clear()
+        try:
+            await asyncio.wait_for(nouveau_job.wait(), JOBS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+# Endpoint pour soumettre un fichier à traiter en arrière-plan : renvoie tout de suite l'identifiant du job
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request, file: UploadFile = File(...), format: Optional[str] = None,
+                     fields: Optional[str] = None):
+    format_in = format_entree(file.content_type, file.filename)
+    format_out = format_sortie(format, request.headers.get("accept"))
+    if format_out not in STREAMABLE_OUTPUTS:
+        raise HTTPException(status_code=406, detail=f"Le format '{format_out}' ne peut pas être écrit par morceaux.")
+    job_id = await asyncio.to_thread(job_store.create, file.file, format_in, format_out, colonnes_demandees(fields))
+    request.app.state.nouveau_job.set()
+    return job_store.summary(job_id)
+
+# Endpoint pour suivre un job : état, lignes traitées et débit
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return job_store.summary(job_id)
+
+# Endpoint pour télécharger le résultat d'un job terminé
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_store.get(job_id)
+    if job['status'] != DONE:
+        raise HTTPException(status_code=409, detail=f"Le job n'est pas terminé (état : {job['status']}).")
+    return FileResponse(job_store.output_path(job_id), media_type=MEDIA_TYPES[job['format_out']],
+                        filename=f"{job_id}.{job['format_out']}")
+
+# Endpoint pour supprimer un job terminé et ses fichiers
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    job = job_store.get(job_id)
+    if job['status'] not in (DONE, FAILED):
+        raise HTTPException(status_code=409, detail=f"Le job n'est pas terminé (état : {job['status']}).")
+    await asyncio.to_thread(job_store.delete, job_id)
+    return {"deleted": job_id}
+
+# Nettoyer et prédire un lot de phrases (exécuté dans le pool 'interactive') : un résultat par phrase
+def predire_textes(textes):
+    # Vérification de la langue, transmise au pipeline pour ne pas la détecter deux fois
+    langues = detecter_langues_lot(textes)
+
+    # Un identifiant par phrase pour qu'aucune ne soit dédoublonnée avec une autre requête
+    df = pd.DataFrame({
+        "Phrase": textes,
+        "SentenceId": range(len(textes)),
+        "PhraseId": range(len(textes)),
+    })
+
+    # Appliquer le preprocessing (nettoyage automatisé)
+    df_cleaned = nettoyage_automatisé(df, langues=pd.Series(langues, index=df.index))
+
+    # Faire la prédiction
+    predictions = predire(df_cleaned['cleaned_text'])
+    logger.debug("Phrases prédites", extra={'texts': len(textes), 'predictions': len(predictions)})
+
+    # Mapper les prédictions (0, 1 -> Négatif) et (3, 4 -> Positif)
+    df_cleaned['sentiment_prediction'] = [sentiment_labels.get(pred, "Inconnu") for pred in predictions]
+
+    # Rendre à chaque phrase ses enregistrements, avec les identifiants d'une requête isolée
+    resultats = [[] if langue == 'en' else {"error": MESSAGE_NON_ANGLAIS} for langue in langues]
+    for record in df_cleaned.to_dict(orient='records'):
+        position = record['PhraseId']
+        record['SentenceId'] = record['PhraseId'] = 1
+        resultats[position].append(record)
+    return resultats
+
+# Regrouper les requêtes /predict-text/ concurrentes
+text_batcher = MicroBatcher(
+    predire_textes,
+    max_batch_size=int(os.environ.get("PREDICT_TEXT_MAX_BATCH", "64")),
+    max_wait_ms=float(os.environ.get("PREDICT_TEXT_BATCH_WAIT_MS", "2")),
+    name="predict_text",
+    runner=interactive_lane.run,
+)
+
 # Endpoint pour prédire directement à partir d'une phrase entrée à la main
 @app.post("/predict-text/")
 async def predict_text(input: TextInput):
-    text = input.text
+    # Vérifier la langue, nettoyer et prédire avec les autres requêtes concurrentes,
+    # puis retourner le DataFrame nettoyé avec la prédiction (ou l'erreur de langue)
+    return await text_batcher.submit(input.text)
 
-    # Vérification de la langue
-    if not is_english(text):
-        return {"error": "Le commentaire n'est pas en anglais. Veuillez entrer un commentaire en anglais."}
+# Taille maximale des lots des flux de commentaires, et commentaires envoyés par un client sans réponse reçue
+STREAM_MAX_BATCH = int(os.environ.get("STREAM_MAX_BATCH", "256"))
+STREAM_MAX_INFLIGHT = int(os.environ.get("STREAM_MAX_INFLIGHT", "512"))
 
-    # Créer un DataFrame à partir de la phrase saisie manuellement
-    df = pd.DataFrame([{"Phrase": text, "SentenceId": 1, "PhraseId": 1}])
+# Regrouper les commentaires des flux WebSocket : même nettoyage et même modèle que /predict-text/
+stream_batcher = MicroBatcher(
+    predire_textes,
+    max_batch_size=STREAM_MAX_BATCH,
+    max_wait_ms=float(os.environ.get("STREAM_BATCH_WAIT_MS", "5")),
+    name="predict_stream",
+    # Pool dédié : le contrôle de flux borne déjà chaque connexion, un lot attend un worker au lieu d'être refusé
+    runner=partial(stream_lane.run, reject_when_full=False),
+)
 
-    # Appliquer le preprocessing (nettoyage automatisé)
-    df_cleaned = nettoyage_automatisé(df)
-    print(f"Phrase après nettoyage : {df_cleaned}")
+# Body sent back for one streamed comment: the same as /predict-text/, or the error of its batch
+def reponse_flux(resultat, erreur):
+    counter('stream_messages_total', "Commentaires reçus par les flux WebSocket",
+            status='ok' if erreur is None else 'error').inc()
+    if erreur is None:
+        return resultat
+    if not isinstance(erreur, (ModelNotReadyError, ServiceNotReadyError, PoolUnavailableError)):
+        logger.error("Échec de la prédiction d'un commentaire en flux", exc_info=erreur)
+    return {"error": str(erreur)}
 
-    # Vérifier que la colonne textuelle 'cleaned_text' est présente après nettoyage
-    if 'cleaned_text' not in df_cleaned.columns:
-        raise HTTPException(status_code=400, detail="Erreur lors du nettoyage : la colonne 'cleaned_text' est manquante.")
+# Message binaire reçu sur un flux de commentaires (-> fermeture 1003)
+class MessageNonTexte(Exception):
+    pass
 
-    # Faire la prédiction
-    predictions = model.predict(df_cleaned['cleaned_text'])
-    print(f"Prédiction : {predictions}")
+connexions_flux = 0
+gauge('stream_open_connections', "Connexions WebSocket de flux de commentaires ouvertes", lambda: connexions_flux)
 
-    # Mapper les prédictions (0, 1 -> Négatif) et (3, 4 -> Positif)
-    sentiment_labels = {0: 'Négatif', 1: 'Négatif', 3: 'Positif', 4: 'Positif'}
-    df_cleaned['sentiment_prediction'] = sentiment_labels.get(predictions[0], "Inconnu")
+# Endpoint WebSocket : un message texte par commentaire, une réponse JSON par commentaire, dans le même ordre
+@app.websocket("/ws/predict-text")
+async def predict_text_stream(websocket: WebSocket):
+    global connexions_flux
+    await websocket.accept()
+    if not readiness.ready:
+        # 1013 : réessayer plus tard
+        await websocket.close(code=1013, reason="Service en cours de démarrage.")
+        return
+
+    async def commentaires():
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            if message.get('text') is None:
+                raise MessageNonTexte()
+            yield message['text']
+
+    connexions_flux += 1
+    try:
+        async for resultat, erreur in traiter_en_flux(commentaires(), stream_batcher.submit, STREAM_MAX_INFLIGHT):
+            await websocket.send_json(reponse_flux(resultat, erreur))
+    except MessageNonTexte:
+        # Les commentaires reçus avant le message binaire ont eu leur réponse ; 1003 : données non acceptées
+        await websocket.close(code=1003, reason="Un commentaire par message texte est attendu.")
+    except WebSocketDisconnect:
+        pass
+    finally:
+        connexions_flux -= 1
+
+# Endpoint pour consulter les histogrammes de taille des lots et de temps d'attente
+@app.get("/stats/batching")
+async def batching_stats():
+    return text_batcher.stats()
+
+# Endpoint pour consulter les compteurs du cache de prédictions
+@app.get("/stats/cache")
+async def cache_stats():
+    return prediction_cache.stats()
+
+# Endpoint Prometheus : latences par endpoint, étapes du prétraitement, lignes supprimées, tailles, pools et cache
+@app.get("/metrics")
+async def metrics():
+    return Response(content=exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
-    # Retourner le DataFrame nettoyé avec la prédiction
-    return df_cleaned.to_dict(orient='records')
+# Endpoint pour consulter l'occupation des pools et le temps d'attente en file
+@app.get("/stats/execution")
+async def execution_stats():
+    return {"interactive": interactive_lane.stats(), "bulk": bulk_lane.stats(), "stream": stream_lane.stats(),
+            "jobs": jobs_lane.stats()}
@@ -1,16 +1,28 @@
+import hashlib
+import math
+import os
+import time
+import uuid
 import streamlit as st
 import requests
 import pandas as pd
-from io import StringIO
-import nltk
-
-# Téléchargement des ressources NLTK
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
+from requests.adapters import HTTPAdapter
+from formats import EXTENSIONS, format_entree, lire_tableau
 
 # URL de l'API FastAPI
-api_url = "http://127.0.0.1:8000"  # Assurez-vous que c'est l'URL correcte
+api_url = os.environ.get("API_URL", "http://127.0.0.1:8000")  # Assurez-vous que c'est l'URL correcte
+
+# Au-delà de cette taille (octets), le fichier est traité par un job en arrière-plan, avec suivi de l'analyse
+APP_JOB_THRESHOLD_BYTES = int(os.environ.get("APP_JOB_THRESHOLD_BYTES", str(5 * 1024 * 1024)))
+
+# Intervalle entre deux consultations de l'état d'un job (secondes)
+APP_JOB_POLL_SECONDS = float(os.environ.get("APP_JOB_POLL_SECONDS", "0.5"))
+
+# Taille des blocs envoyés à l'API : la barre de progression avance à chaque bloc
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+
+# Nombres de lignes par page proposés dans les aperçus
+PAGE_SIZES = (50, 200, 1000)
 
 # Configuration de la page Streamlit
 st.set_page_config(page_title="✨ Prédiction de Sentiment ✨", layout="wide")
@@ -27,6 +39,105 @@ if 'manual_text_history' not in st.session_state:
 def switch_tab(tab_name):
     st.session_state['active_tab'] = tab_name
 
+# Pool de connexions à l'API partagé par toutes les sessions (le pool d'urllib3 supporte plusieurs threads)
+@st.cache_resource
+def adaptateur_http():
+    return HTTPAdapter(pool_connections=4, pool_maxsize=16)
+
+# Session HTTP propre à chaque utilisateur : Streamlit exécute les sessions dans des threads différents, et une
+# requests.Session (cookies, état) ne doit pas être partagée entre eux ; seules les connexions le sont
+def session_http():
+    if 'session_http' not in st.session_state:
+        session = requests.Session()
+        session.mount('http://', adaptateur_http())
+        session.mount('https://', adaptateur_http())
+        st.session_state['session_http'] = session
+    return st.session_state['session_http']
+
+# Erreur renvoyée par l'API (statut 4xx ou 5xx)
+class ErreurAPI(Exception):
+    pass
+
+def verifier(response):
+    if response.status_code >= 400:
+        raise ErreurAPI(response.text)
+    return response
+
+# Empreinte du contenu d'un fichier uploadé, calculée une seule fois par upload
+def empreinte(file):
+    cle = f"empreinte_{file.file_id}"
+    if cle not in st.session_state:
+        st.session_state[cle] = hashlib.sha256(file.getbuffer()).hexdigest()
+    return st.session_state[cle]
+
+# Fichier lu une seule fois par contenu : les exécutions suivantes du script réutilisent le DataFrame.
+# cache_resource plutôt que cache_data : le DataFrame n'est jamais modifié, inutile de le copier à chaque exécution
+@st.cache_resource(max_entries=4, show_spinner="Lecture du fichier...")
+def lire_fichier(empreinte_fichier, _contenu, fmt):
+    return lire_tableau(_contenu, fmt)
+
+# Aperçu paginé : seules les lignes de la page affichée sont envoyées au navigateur
+def apercu_pagine(df, cle):
+    total = len(df)
+    colonne_page, colonne_taille = st.columns(2)
+    taille = colonne_taille.selectbox("Lignes par page", PAGE_SIZES, key=f"{cle}_taille")
+    pages = max(1, math.ceil(total / taille))
+    # Une clé par taille de page : changer la taille revient à la première page
+    page = colonne_page.number_input(f"Page (sur {pages})", min_value=1, max_value=pages, value=1, step=1,
+                                     key=f"{cle}_page_{taille}")
+    debut = (page - 1) * taille
+    st.dataframe(df.iloc[debut:debut + taille])
+    if total:
+        st.caption(f"Lignes {debut + 1} à {min(debut + taille, total)} sur {total}, {df.shape[1]} colonnes")
+    else:
+        st.caption("Aucune ligne.")
+
+# Corps multipart envoyé bloc par bloc, pour suivre la progression de l'envoi
+def corps_multipart(contenu, nom, boundary, progression):
+    nom = nom.replace('"', '')
+    yield (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{nom}"\r\n'
+           f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+    for debut in range(0, len(contenu), UPLOAD_BLOCK_BYTES):
+        yield bytes(contenu[debut:debut + UPLOAD_BLOCK_BYTES])
+        progression(min(1.0, (debut + UPLOAD_BLOCK_BYTES) / len(contenu)))
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+# Envoyer un fichier à un endpoint de l'API avec une barre de progression
+def envoyer_fichier(chemin, contenu, nom, barre):
+    boundary = uuid.uuid4().hex
+    corps = corps_multipart(contenu, nom, boundary,
+                            lambda fraction: barre.progress(fraction, text=f"Envoi du fichier : {fraction:.0%}"))
+    return verifier(session_http().post(f"{api_url}{chemin}", data=corps,
+                                        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}))
+
+# Gros fichier : job en arrière-plan, dont l'avancement est suivi jusqu'au téléchargement du résultat
+def analyser_par_job(contenu, nom, total_lignes, barre):
+    job = envoyer_fichier("/jobs", contenu, nom, barre).json()
+    while job['status'] not in ('done', 'failed'):
+        barre.progress(min(1.0, job['rows_in'] / max(total_lignes, 1)),
+                       text=f"Analyse : {job['rows_in']} lignes sur {total_lignes} ({job['rows_per_second']:.0f} lignes/s)")
+        time.sleep(APP_JOB_POLL_SECONDS)
+        job = verifier(session_http().get(f"{api_url}/jobs/{job['id']}")).json()
+    try:
+        if job['status'] == 'failed':
+            raise ErreurAPI(job['error'])
+        barre.progress(1.0, text="Téléchargement du résultat...")
+        return verifier(session_http().get(f"{api_url}/jobs/{job['id']}/result")).content
+    finally:
+        session_http().delete(f"{api_url}/jobs/{job['id']}")
+
+# Nettoyer et analyser un fichier : requête directe pour un petit fichier, job pour un gros
+def analyser_fichier(contenu, nom, total_lignes):
+    barre = st.progress(0.0, text="Envoi du fichier...")
+    try:
+        if len(contenu) > APP_JOB_THRESHOLD_BYTES:
+            return analyser_par_job(contenu, nom, total_lignes, barre)
+        resultat = envoyer_fichier("/predict-sentiment/", contenu, nom, barre)
+        barre.progress(1.0, text="Analyse terminée.")
+        return resultat.content
+    finally:
+        barre.empty()
+
 
 
 # Créer des onglets pour les différentes options (fichier ou texte)
@@ -35,37 +146,46 @@ tab1, tab2, tab3 = st.tabs(["Fichier CSV/TSV", "Commentaire texte", "Historique"
 # Onglet pour l'upload de fichier
 with tab1:
     st.header("📩 Uploader un fichier TSV")
-    file = st.file_uploader("Choisir un fichier TSV", type=["tsv"])
+    file = st.file_uploader("Choisir un fichier TSV (ou NDJSON, Parquet, Arrow)",
+                            type=[extension.lstrip('.') for extension in EXTENSIONS])
 
     if file is not None:
-        # Lecture du fichier uploadé
-        df = pd.read_csv(file, sep='\t')
+        # Lecture du fichier uploadé (mise en cache selon son contenu)
+        empreinte_fichier = empreinte(file)
+        df = lire_fichier(empreinte_fichier, file.getbuffer(), format_entree(filename=file.name))
         st.write("Aperçu du fichier avant nettoyage :")
-        st.dataframe(df)
+        apercu_pagine(df, "apercu")
 
         # Bouton pour effectuer le nettoyage via l'API
         if st.button("Nettoyer et analyser les sentiments", on_click=switch_tab, args=('Fichier CSV/TSV',)):
             # Envoi du fichier à l'API pour nettoyage et prédiction
-            response = requests.post(f"{api_url}/predict-sentiment/", files={"file": file.getvalue()})
-
-            if response.status_code == 200:
-                # Lire la réponse de l'API et afficher le fichier modifié
-                updated_tsv = StringIO(response.text)
-                df_updated = pd.read_csv(updated_tsv, sep='\t')
-                st.write("Fichier nettoyé et prédictions ajoutées :")
-                st.dataframe(df_updated)
-
-                st.write(f"Taille du fichier après nettoyage et prédictions : {df_updated.shape}")
-
-                # Bouton pour télécharger le fichier modifié
-                st.download_button(
-                    label="Télécharger le fichier modifié",
-                    data=response.text,
-                    file_name="fichier_avec_sentiment.tsv",
-                    mime="text/tsv"
-                )
-            else:
-                st.error(f"Erreur lors de l'analyse des sentiments: {response.text}")
+            try:
+                contenu = analyser_fichier(file.getbuffer(), file.name, len(df))
+                # Résultat gardé pour les exécutions suivantes (changement de page, téléchargement)
+                st.session_state['resultat_fichier'] = {
+                    'empreinte': empreinte_fichier,
+                    'contenu': contenu,
+                    'df': lire_tableau(contenu, 'tsv'),
+                }
+            except (ErreurAPI, requests.RequestException) as e:
+                st.error(f"Erreur lors de l'analyse des sentiments: {e}")
+
+        resultat = st.session_state.get('resultat_fichier')
+        if resultat is not None and resultat['empreinte'] == empreinte_fichier:
+            # Afficher le fichier modifié
+            df_updated = resultat['df']
+            st.write("Fichier nettoyé et prédictions ajoutées :")
+            apercu_pagine(df_updated, "resultat")
+
+            st.write(f"Taille du fichier après nettoyage et prédictions : {df_updated.shape}")
+
+            # Bouton pour télécharger le fichier modifié
+            st.download_button(
+                label="Télécharger le fichier modifié",
+                data=resultat['contenu'],
+                file_name="fichier_avec_sentiment.tsv",
+                mime="text/tsv"
+            )
 
 
 
@@ -81,7 +201,7 @@ with tab2:
             st.warning("Le commentaire doit contenir au moins 50 caractères.")
         else:
             # Requête à l'API pour prédire le sentiment à partir du texte
-            response = requests.post(f"{api_url}/predict-text/", json={"text": text})
+            response = session_http().post(f"{api_url}/predict-text/", json={"text": text})
             if response.status_code == 200:
                 prediction = response.json()
 
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from formats import STREAMABLE_OUTPUTS, FormatSortieNonSupporte, format_entree, lire_par_morceaux, ecrire_tableau
+from preprocessing import nettoyage_par_morceaux, default_engine, OUTPUT_COLUMNS
+
+# Nombre de lignes lues, nettoyées et écrites à la fois
+BATCH_CHUNK_ROWS = int(os.environ.get("BATCH_CHUNK_ROWS", "10000"))
+
+# Mapper les prédictions (0, 1 -> Négatif) et (3, 4 -> Positif)
+sentiment_labels = {0: 'Négatif', 1: 'Négatif', 3: 'Positif', 4: 'Positif'}
+
+
+# Progress of a resumable run, saved after every chunk
+def etat_initial():
+    return {
+        'chunks_done': 0,    # morceaux d'entrée entièrement traités
+        'rows_in': 0,        # lignes lues
+        'rows_out': 0,       # lignes écrites après nettoyage
+        'output_bytes': 0,   # taille du fichier de sortie au dernier point de reprise
+        'ids_bytes': 0,      # taille du fichier des identifiants déjà vus
+        'seconds': 0.0,      # temps de traitement cumulé (toutes reprises comprises)
+        'done': False,
+    }
+
+# Throughput of a run in rows read per second
+def lignes_par_seconde(etat):
+    return etat['rows_in'] / etat['seconds'] if etat['seconds'] else 0.0
+
+# Truncate a file back to its size at the last checkpoint (discards a partially written chunk)
+def _tronquer(chemin, taille):
+    with open(chemin, 'ab') as f:
+        f.truncate(taille)
+
+# Reload the SentenceId / PhraseId already seen by the chunks processed before an interruption
+def _charger_identifiants(chemin):
+    seen_sentence_ids, seen_phrase_ids = set(), set()
+    with open(chemin, encoding='utf-8') as f:
+        for line in f:
+            kind, value = line.rstrip('\n').split('\t', 1)
+            (seen_sentence_ids if kind == 'S' else seen_phrase_ids).add(json.loads(value))
+    return seen_sentence_ids, seen_phrase_ids
+
+def _lignes_identifiants(kind, values):
+    return ''.join(f'{kind}\t{json.dumps(value)}\n' for value in values)
+
+def _ecrire_durablement(f, data):
+    f.write(data.encode('utf-8') if isinstance(data, str) else data)
+    f.flush()
+    os.fsync(f.fileno())
+    return f.tell()
+
+# Clean, transform and write a file chunk by chunk, resuming from a previous checkpoint
+def traiter_fichier(chemin_entree, chemin_sortie, traiter, format_in='tsv', format_out='tsv',
+                    chunksize=BATCH_CHUNK_ROWS, etat=None, checkpoint=None, engine=None, stop=None, executor=None,
+                    n_workers=None, avant_ecriture=None):
+    """Traite un fichier de taille quelconque en mémoire bornée et de façon reprenable.
+
+    Chaque morceau de chunksize lignes est nettoyé (nettoyage_par_morceaux), passé à
+    traiter (ex. ajout des prédictions) puis ajouté au fichier de sortie. Après chaque
+    morceau, la sortie et les identifiants déjà vus (fichier chemin_sortie + '.ids')
+    sont écrits sur disque, puis checkpoint(etat) enregistre la progression.
+
+    Avec l'etat d'une exécution interrompue, les morceaux déjà traités sont sautés et
+    un morceau écrit à moitié est effacé : le fichier final est identique à celui
+    d'une exécution sans interruption. Si stop (threading.Event) est positionné, le
+    traitement s'arrête proprement au morceau suivant avec etat['done'] à False.
+    Avec un executor (pool de n_workers processus), chaque morceau est nettoyé en parallèle.
+    avant_ecriture() est appelé juste avant d'écrire chaque morceau : s'il lève une
+    exception (par ex. bail d'un job repris par un autre worker), rien n'est écrit.
+    """
+    if format_out not in STREAMABLE_OUTPUTS:
+        raise FormatSortieNonSupporte(f"Le format '{format_out}' ne peut pas être écrit par morceaux.")
+    etat = dict(etat or etat_initial())
+    chemin_ids = chemin_sortie + '.ids'
+
+    if etat['chunks_done']:
+        _tronquer(chemin_sortie, etat['output_bytes'])
+        _tronquer(chemin_ids, etat['ids_bytes'])
+        seen_sentence_ids, seen_phrase_ids = _charger_identifiants(chemin_ids)
+    else:
+        open(chemin_sortie, 'wb').close()
+        open(chemin_ids, 'wb').close()
+        seen_sentence_ids, seen_phrase_ids = set(), set()
+
+    with open(chemin_entree, 'rb') as entree, open(chemin_sortie, 'ab') as sortie, open(chemin_ids, 'ab') as ids:
+        # Garder chaque morceau brut pour enregistrer ses 'SentenceId'
+        bruts = []
+        reader = lire_par_morceaux(entree, format_in, chunksize)
+
+        def morceaux():
+            for chunk in islice(reader, etat['chunks_done'], None):
+                if stop is not None and stop.is_set():
+                    return
+                bruts.append(chunk)
+                yield chunk
+
+        debut = time.perf_counter()
+        try:
+            for cleaned in nettoyage_par_morceaux(morceaux(), engine, seen_sentence_ids, seen_phrase_ids, executor, n_workers):
+                brut = bruts.pop()
+                sentence_ids = brut['SentenceId'].unique().tolist()
+                phrase_ids = cleaned['PhraseId'].tolist()
+                resultat = traiter(cleaned)
+
+                if avant_ecriture is not None:
+                    avant_ecriture()
+                etat['output_bytes'] = _ecrire_durablement(sortie, ecrire_tableau(resultat, format_out, header=etat['output_bytes'] == 0))
+                etat['ids_bytes'] = _ecrire_durablement(ids, _lignes_identifiants('S', sentence_ids) + _lignes_identifiants('P', phrase_ids))
+                etat['chunks_done'] += 1
+                etat['rows_in'] += len(brut)
+                etat['rows_out'] += len(resultat)
+                maintenant = time.perf_counter()
+                etat['seconds'] += maintenant - debut
+                debut = maintenant
+                if checkpoint is not None:
+                    checkpoint(dict(etat))
+        finally:
+            # Fermer le lecteur tant que le fichier d'entrée est encore ouvert (arrêt anticipé ou erreur compris)
+            reader.close()
+
+    etat['done'] = stop is None or not stop.is_set()
+    if etat['done']:
+        os.remove(chemin_ids)
+        if checkpoint is not None:
+            checkpoint(dict(etat))
+    return etat
+
+
+# Checkpoint file of a command-line run, next to its output
+def chemin_checkpoint(chemin_sortie):
+    return chemin_sortie + '.checkpoint.json'
+
+# Parameters that must not change between a run and its resumption
+def parametres_execution(chemin_entree, format_in, format_out, colonnes, chunksize, version):
+    return {
+        'input': os.path.abspath(chemin_entree),
+        'input_bytes': os.path.getsize(chemin_entree),
+        'input_mtime': os.path.getmtime(chemin_entree),
+        'format_in': format_in,
+        'format_out': format_out,
+        'fields': list(colonnes) if colonnes is not None else None,
+        'chunksize': chunksize,
+        'model_version': version,
+    }
+
+# Write the checkpoint atomically (never half-written, even if the process is killed)
+def sauvegarder_checkpoint(chemin, parametres, etat):
+    temporaire = chemin + '.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump({'parameters': parametres, 'progress': etat}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporaire, chemin)
+
+# Score a large file from the command line, resuming an interrupted run
+def scorer_fichier(chemin_entree, chemin_sortie, format_out='tsv', colonnes=None, chunksize=BATCH_CHUNK_ROWS,
+                   workers=None, recommencer=False):
+    from model_store import charger_scorer
+    scorer, version = charger_scorer()
+    format_in = format_entree(filename=chemin_entree)
+    parametres = parametres_execution(chemin_entree, format_in, format_out, colonnes, chunksize, version)
+
+    # Reprendre la dernière exécution si elle porte sur le même fichier avec les mêmes paramètres
+    checkpoint = chemin_checkpoint(chemin_sortie)
+    etat = None
+    if os.path.exists(checkpoint) and not recommencer:
+        with open(checkpoint, encoding='utf-8') as f:
+            sauvegarde = json.load(f)
+        if sauvegarde['parameters'] != parametres:
+            raise SystemExit(f"{checkpoint} correspond à une autre exécution (fichier, paramètres ou modèle "
+                             f"différents) : relancer avec --restart pour repartir de zéro.")
+        etat = sauvegarde['progress']
+        if etat['done']:
+            print(f"Déjà terminé : {chemin_sortie}")
+            return etat
+        print(f"Reprise après {etat['rows_in']} lignes ({etat['chunks_done']} morceaux)")
+
+    def traiter(df_cleaned):
+        df_cleaned['sentiment'] = [sentiment_labels.get(pred, 'Neutre') for pred in scorer.predict(df_cleaned['cleaned_text'])]
+        return df_cleaned[list(colonnes)] if colonnes is not None else df_cleaned
+
+    def enregistrer(etat):
+        sauvegarder_checkpoint(checkpoint, parametres, etat)
+        if not etat['done']:
+            print(f"{etat['rows_in']} lignes lues, {etat['rows_out']} écrites, {lignes_par_seconde(etat):.0f} lignes/s",
+                  flush=True)
+
+    engine = default_engine
+    if colonnes is not None:
+        engine = default_engine.with_columns([name for name in OUTPUT_COLUMNS if name in colonnes or name == 'cleaned_text'])
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        etat = traiter_fichier(chemin_entree, chemin_sortie, traiter, format_in, format_out, chunksize,
+                               etat=etat, checkpoint=enregistrer, engine=engine, executor=executor, n_workers=workers)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    print(f"Terminé : {etat['rows_in']} lignes lues, {etat['rows_out']} écrites dans {chemin_sortie} "
+          f"en {etat['seconds']:.1f} s ({lignes_par_seconde(etat):.0f} lignes/s)")
+    return etat
+
+
+if __name__ == "__main__":
+    # python batch.py avis.tsv avis_scores.tsv [--workers 8] [--chunksize 50000] [--fields PhraseId,sentiment]
+    parser = argparse.ArgumentParser(description="Nettoie et prédit le sentiment d'un fichier de taille quelconque, "
+                                                 "par morceaux, avec reprise après interruption.")
+    parser.add_argument('entree', help="fichier TSV, NDJSON, Parquet ou Arrow (format déduit de l'extension)")
+    parser.add_argument('sortie', help="fichier de résultats, écrit au fur et à mesure")
+    parser.add_argument('--format', choices=STREAMABLE_OUTPUTS, default='tsv', help="format de sortie")
+    parser.add_argument('--fields', help="colonnes à écrire, séparées par des virgules (toutes par défaut)")
+    parser.add_argument('--chunksize', type=int, default=BATCH_CHUNK_ROWS, help="lignes par morceau")
+    parser.add_argument('--workers', type=int, default=None, help="processus de nettoyage (tous les cœurs par défaut)")
+    parser.add_argument('--restart', action='store_true', help="ignorer le point de reprise et tout recommencer")
+    args = parser.parse_args()
+    colonnes = tuple(name.strip() for name in args.fields.split(',') if name.strip()) if args.fields else None
+    try:
+        scorer_fichier(args.entree, args.sortie, args.format, colonnes, args.chunksize, args.workers, args.restart)
+    except KeyboardInterrupt:
+        print("Interrompu : relancer la même commande pour reprendre au dernier morceau terminé.")
+        sys.exit(130)
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from metrics import histogram
+
+# Bornes des histogrammes de taille de lot et de temps d'attente (secondes)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+BATCH_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+# Micro-batching scheduler for concurrent single-item requests
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes en lots traités en un seul appel.
+
+    Un lot part dès qu'il atteint max_batch_size éléments ou que max_wait_ms
+    s'est écoulé depuis l'arrivée de son premier élément. process_batch reçoit
+    la liste des éléments et doit renvoyer un résultat par élément, dans le
+    même ordre ; chaque appelant reçoit le sien. Si runner est fourni (par ex.
+    WorkerLane.run), le lot est exécuté par lui plutôt que dans la boucle asyncio.
+    Si le lot échoue, ses éléments sont relancés un par un : seul l'appelant dont
+    l'élément est en cause reçoit l'erreur.
+    """
+
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=2.0, name='batch', runner=None):
+        self.process_batch = process_batch
+        self.runner = runner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batch_size_histogram = histogram(f'{name}_batch_size', "Nombre d'éléments par lot", BATCH_SIZE_BUCKETS)
+        self.wait_time_histogram = histogram(f'{name}_batch_wait_seconds', "Temps d'attente avant traitement du lot", BATCH_WAIT_BUCKETS)
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._inflight = set()
+
+    def _ensure_started(self):
+        # La file et la tâche sont liées à la boucle asyncio qui les utilise
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, item):
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            self.batch_size_histogram.observe(len(batch))
+            for _, _, submitted in batch:
+                self.wait_time_histogram.observe(started - submitted)
+            # Le lot suivant peut être collecté pendant que celui-ci s'exécute
+            task = self._loop.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self._execute([item for item, _, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                results = [e]
+            else:
+                # Isoler l'élément fautif : chaque élément est relancé seul
+                results = await asyncio.gather(*[self._execute_one(item) for item, _, _ in batch],
+                                               return_exceptions=True)
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _execute_one(self, item):
+        return (await self._execute([item]))[0]
+
+    async def _execute(self, items):
+        if self.runner is None:
+            return self.process_batch(items)
+        return await self.runner(self.process_batch, items)
+
+    def stats(self):
+        return {
+            'batch_size': self.batch_size_histogram.snapshot(),
+            'wait_seconds': self.wait_time_histogram.snapshot(),
+        }
+
+
+# Process an unbounded stream of items through submit(), in order, with a bounded number in flight
+async def traiter_en_flux(items, submit, max_inflight=256):
+    """Renvoie (résultat, erreur) pour chaque élément de items, dans l'ordre d'arrivée.
+
+    Les éléments sont soumis dès leur lecture, sans attendre les résultats
+    précédents : avec un MicroBatcher, un flux rapide forme des lots complets. Au
+    plus max_inflight éléments sont soumis et pas encore rendus ; au-delà, la
+    lecture de items s'arrête jusqu'à ce que le client ait consommé des résultats
+    (contrôle de flux). L'erreur d'un élément n'interrompt pas le flux.
+    """
+    loop = asyncio.get_running_loop()
+    places = asyncio.Semaphore(max_inflight)
+    en_cours = asyncio.Queue()
+    fin = object()
+
+    async def lire():
+        try:
+            async for item in items:
+                await places.acquire()
+                en_cours.put_nowait(loop.create_task(submit(item)))
+        finally:
+            en_cours.put_nowait(fin)
+
+    lecteur = loop.create_task(lire())
+    try:
+        while True:
+            tache = await en_cours.get()
+            if tache is fin:
+                break
+            try:
+                resultat, erreur = await tache, None
+            except Exception as e:
+                resultat, erreur = None, e
+            yield resultat, erreur
+            # La place n'est rendue qu'une fois le résultat consommé (par ex. envoyé au client)
+            places.release()
+        # Remonter l'erreur de lecture (client déconnecté, message invalide...)
+        await lecteur
+    finally:
+        lecteur.cancel()
+        while not en_cours.empty():
+            tache = en_cours.get_nowait()
+            if tache is not fin:
+                tache.cancel()
@@ -0,0 +1,83 @@
+import random
+import pandas as pd
+
+# Vocabulaire des avis synthétiques
+ADJECTIFS_POSITIFS = ['wonderful', 'great', 'moving', 'clever', 'funny', 'brilliant', 'charming', 'gripping', 'beautiful', 'sharp']
+ADJECTIFS_NEGATIFS = ['boring', 'terrible', 'dull', 'predictable', 'awful', 'messy', 'tedious', 'forgettable', 'bland', 'clumsy']
+SUJETS = ['the movie', 'this film', 'the plot', 'the acting', 'the soundtrack', 'the ending', 'the cast', 'the script',
+          'the director', 'the cinematography', 'the dialogue', 'the pacing']
+INTENSIFS = ['really', 'very', 'quite', 'incredibly', 'somewhat', 'truly', 'rather', 'so']
+MODELES = [
+    '{sujet} was {intensif} {adjectif}',
+    'I thought {sujet} was {adjectif} and {adjectif2}',
+    '{sujet} is {adjectif} , but {sujet2} feels {adjectif2}',
+    "it 's a {adjectif} story with {intensif} {adjectif2} moments",
+    'what a {adjectif} surprise , {sujet} kept me watching',
+    '{sujet} never stops being {adjectif} !',
+]
+# Avis dans d'autres langues (supprimés par le prétraitement)
+AVIS_ETRANGERS = [
+    "Le film était vraiment magnifique et les acteurs excellents",
+    "Una película aburrida con un guion muy previsible",
+    "Der Film war langweilig und viel zu lang",
+    "Il finale è stato sorprendente e commovente",
+    "Uma história encantadora com uma trilha sonora linda",
+]
+# Bruit présent dans les vrais avis : liens, lettres répétées, mots sans voyelles
+BRUITS = ['http://example.com/review', 'sooo', 'greeeat', 'hmmm', 'zzz', 'www', 'lol', '!!!', '10/10', ':-)']
+
+
+# Build one synthetic English review
+def _avis(rng):
+    positif = rng.random() < 0.5
+    adjectifs = ADJECTIFS_POSITIFS if positif else ADJECTIFS_NEGATIFS
+    texte = rng.choice(MODELES).format(
+        sujet=rng.choice(SUJETS), sujet2=rng.choice(SUJETS), intensif=rng.choice(INTENSIFS),
+        adjectif=rng.choice(adjectifs), adjectif2=rng.choice(adjectifs),
+    )
+    if rng.random() < 0.2:
+        texte += ' ' + rng.choice(BRUITS)
+    return texte[0].upper() + texte[1:], (3 if rng.random() < 0.5 else 4) if positif else (0 if rng.random() < 0.5 else 1)
+
+# Deterministic synthetic corpus in the training file layout (PhraseId, SentenceId, Phrase, Sentiment)
+def generer_corpus(n_lignes, seed=0):
+    """Corpus d'avis synthétiques reproductible : même n_lignes et même seed, même DataFrame.
+
+    Comme le jeu d'entraînement, chaque phrase (SentenceId) est suivie de quelques
+    sous-phrases, et le corpus contient des avis non anglais (environ 8 %), des
+    phrases vides et des PhraseId en double, pour que chaque étape de filtrage
+    du prétraitement ait des lignes à retirer.
+    """
+    rng = random.Random(seed)
+    phrase_ids, sentence_ids, phrases, sentiments = [], [], [], []
+    sentence_id = 0
+    while len(phrases) < n_lignes:
+        sentence_id += 1
+        tirage = rng.random()
+        if tirage < 0.08:
+            texte, sentiment = rng.choice(AVIS_ETRANGERS), 2
+        elif tirage < 0.10:
+            texte, sentiment = '', 2
+        else:
+            texte, sentiment = _avis(rng)
+
+        # La phrase entière puis des sous-phrases (suffixes de mots), comme dans le jeu d'origine
+        mots = texte.split(' ')
+        for debut in range(min(len(mots), rng.randint(1, 4))):
+            if len(phrases) >= n_lignes:
+                break
+            phrase_id = len(phrases) + 1
+            if phrase_ids and rng.random() < 0.01:
+                phrase_id = rng.choice(phrase_ids)  # doublon
+            phrase_ids.append(phrase_id)
+            sentence_ids.append(sentence_id)
+            phrases.append(' '.join(mots[debut:]))
+            sentiments.append(sentiment)
+
+    return pd.DataFrame({'PhraseId': phrase_ids, 'SentenceId': sentence_ids, 'Phrase': phrases, 'Sentiment': sentiments})
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.corpus 100000 corpus.tsv
+    import sys
+    generer_corpus(int(sys.argv[1])).to_csv(sys.argv[2], sep='\t', index=False)
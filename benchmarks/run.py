@@ -0,0 +1,375 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime, timezone
+import pandas as pd
+from benchmarks.corpus import generer_corpus
+
+# Tailles de corpus mesurées par défaut (lignes)
+TAILLES = (1, 1000, 100000)
+
+# Seuil de régression par défaut : +25 % de temps ou de mémoire par rapport à la référence
+SEUIL_REGRESSION = 0.25
+
+# En dessous de cette durée (secondes), l'écart est dominé par le bruit de mesure et n'est pas comparé
+DUREE_MINIMALE = 0.002
+
+# Nombre de requêtes /predict-text/ mesurées pour la latence
+REQUETES_TEXTE = 200
+
+
+# Run fn on fresh inputs and keep the best of several runs (the least disturbed by the rest of the machine)
+def chronometrer(fn, preparer=lambda: (), repetitions=3):
+    durees = []
+    resultat = None
+    for _ in range(repetitions):
+        arguments = preparer()
+        debut = time.perf_counter()
+        resultat = fn(*arguments)
+        durees.append(time.perf_counter() - debut)
+    return min(durees), resultat
+
+# Peak Python memory allocated while running fn once (MB)
+def pic_memoire(fn, preparer=lambda: ()):
+    arguments = preparer()
+    tracemalloc.start()
+    try:
+        fn(*arguments)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+# Measure one benchmark and build its result entry
+def mesurer(resultats, nom, fn, lignes, preparer=lambda: (), repetitions=3, memoire=True):
+    secondes, resultat = chronometrer(fn, preparer, repetitions)
+    entree = {'rows': lignes, 'seconds': secondes, 'rows_per_second': lignes / secondes if secondes else None}
+    if memoire:
+        entree['peak_mb'] = pic_memoire(fn, preparer)
+    resultats[nom] = entree
+    print(f"{nom:<60} {secondes * 1000:>10.2f} ms {entree['rows_per_second'] or 0:>12.0f} lignes/s"
+          + (f" {entree['peak_mb']:>8.1f} Mo" if memoire else ''), flush=True)
+    return resultat
+
+# Latency percentiles of a list of durations (seconds -> ms)
+def percentiles(durees):
+    durees = sorted(durees)
+    rang = lambda q: durees[min(len(durees) - 1, int(q * len(durees)))]
+    return {'p50_ms': rang(0.50) * 1000, 'p95_ms': rang(0.95) * 1000, 'p99_ms': rang(0.99) * 1000,
+            'mean_ms': statistics.fmean(durees) * 1000}
+
+# Sequential steps of the original pipeline, each applied to the output of the previous one
+def etapes_pretraitement():
+    from preprocessing import (keep_first_occurrence, detecter_langues, supprimer_non_anglais, clean_text,
+                               remove_stopwords, tokenize_text, remove_consonant_or_vowel_sequences_from_tokens,
+                               lemmatize_tokens, replace_empty_with_nan, remove_nan_rows, remove_short_words,
+                               remove_duplicates_by_column, supprimer_termes_3_caracteres_identiques)
+    from language import language_cache
+
+    def detecter(df):
+        language_cache.clear()  # mesure à froid : aucune langue déjà en cache
+        return detecter_langues(df, 'Phrase')
+
+    return [
+        ('01_keep_first_occurrence', lambda df: keep_first_occurrence(df, 'SentenceId')),
+        ('02_detecter_langues', detecter),
+        ('03_supprimer_non_anglais', supprimer_non_anglais),
+        ('09_replace_empty_with_nan', lambda df: replace_empty_with_nan(df, 'Phrase')),
+        ('10_remove_nan_rows', remove_nan_rows),
+        ('11_remove_duplicates_by_column', lambda df: remove_duplicates_by_column(df, 'PhraseId')),
+        ('04_clean_text', lambda df: df.assign(cleaned_text=df['Phrase'].apply(clean_text))),
+        ('05_remove_stopwords', lambda df: df.assign(text_without_stopwords=df['cleaned_text'].apply(remove_stopwords))),
+        ('06_tokenize_text', lambda df: df.assign(tokens=df['text_without_stopwords'].apply(tokenize_text))),
+        ('07_remove_consonant_or_vowel_sequences_from_tokens',
+         lambda df: df.assign(tokens=df['tokens'].apply(remove_consonant_or_vowel_sequences_from_tokens))),
+        ('08_lemmatize_tokens', lambda df: df.assign(lemmatized_tokens=df['tokens'].apply(lemmatize_tokens))),
+        ('10_remove_short_words', lambda df: df.assign(text_without_short_words=df['tokens'].apply(remove_short_words))),
+        ('12_supprimer_termes_3_caracteres_identiques',
+         lambda df: df.assign(lemmatized_tokens=df['lemmatized_tokens'].apply(supprimer_termes_3_caracteres_identiques))),
+    ]
+
+# Per-step and whole-pipeline timings of preprocessing.py for one corpus
+def benchmark_pretraitement(resultats, corpus, repetitions, memoire):
+    from preprocessing import (PreprocessingEngine, nettoyage_automatisé, nettoyage_parallele,
+                               nettoyage_par_morceaux, detecter_langues, keep_first_occurrence)
+    from language import language_cache
+    n = len(corpus)
+
+    # Chaque étape reçoit une copie de la sortie de l'étape précédente
+    etat = corpus
+    for nom, etape in etapes_pretraitement():
+        entree = etat
+        etat = mesurer(resultats, f'preprocessing/{nom}/{n}', etape, len(entree),
+                       lambda: (entree.copy(),), repetitions, memoire)
+
+    # Détection de langue avec le cache déjà rempli
+    mesurer(resultats, f'preprocessing/02_detecter_langues_cache_chaud/{n}',
+            lambda df: detecter_langues(df, 'Phrase'), n, lambda: (keep_first_occurrence(corpus, 'SentenceId'),),
+            repetitions, memoire)
+
+    # Pipeline complet : moteur fusionné seul, puis nettoyage séquentiel, parallèle et par morceaux
+    filtre = etat[['PhraseId', 'SentenceId', 'Phrase']]
+    engine = PreprocessingEngine()
+    mesurer(resultats, f'preprocessing/PreprocessingEngine.transform/{n}', engine.transform, len(filtre),
+            lambda: (filtre.copy(),), repetitions, memoire)
+
+    def a_froid():
+        language_cache.clear()
+        return (corpus.copy(),)
+
+    mesurer(resultats, f'preprocessing/nettoyage_automatisé/{n}', nettoyage_automatisé, n, a_froid, repetitions, memoire)
+    n_workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        # Premier appel hors mesure : démarrage des processus
+        nettoyage_parallele(corpus.copy(), n_workers, executor=executor)
+        mesurer(resultats, f'preprocessing/nettoyage_parallele/{n}', lambda df: nettoyage_parallele(df, n_workers, executor=executor),
+                n, a_froid, repetitions, memoire=False)
+    taille_morceau = max(1, n // 10)
+    mesurer(resultats, f'preprocessing/nettoyage_par_morceaux/{n}',
+            lambda df: pd.concat(list(nettoyage_par_morceaux(
+                df.iloc[debut:debut + taille_morceau] for debut in range(0, len(df), taille_morceau)))),
+            n, a_froid, repetitions, memoire)
+    return etat
+
+# Compiled scorer and prediction cache on the cleaned corpus
+def benchmark_prediction(resultats, taille, textes, repetitions, memoire):
+    from model_store import model_store
+    from cache import PredictionCache
+    scorer, version = model_store.current()
+    mesurer(resultats, f'predict/scorer.predict/{taille}', scorer.predict, len(textes), lambda: (textes,),
+            repetitions, memoire)
+    cache = PredictionCache(maxsize=max(1, len(textes)))
+    cache.predict(textes, scorer, version)
+    mesurer(resultats, f'predict/prediction_cache_hit/{taille}', lambda t: cache.predict(t, scorer, version),
+            len(textes), lambda: (textes,), repetitions, memoire)
+
+# Throughput and latency of every api.py endpoint, through an in-process test client
+def benchmark_api(resultats, client, corpus, textes_nettoyes, repetitions, memoire):
+    import api
+    from language import language_cache
+    from cache import PredictionCache
+    n = len(corpus)
+    tsv = corpus.to_csv(sep='\t', index=False).encode('utf-8')
+
+    # Mesures à froid : ni langues ni prédictions déjà en cache (sert aussi de preparer sans argument).
+    # Le cache de prédictions de l'API est remplacé par un cache neuf, avec la même base SQLite éventuelle
+    def vider_caches():
+        language_cache.clear()
+        ancien = api.prediction_cache
+        neuf = PredictionCache(maxsize=ancien.maxsize, ttl=ancien.ttl)
+        neuf.store, neuf.current_version = ancien.store, ancien.current_version
+        api.prediction_cache = neuf
+        return ()
+
+    def fichier():
+        return vider_caches() + ({'file': ('corpus.tsv', tsv, 'text/tab-separated-values')},)
+
+    def poster(url):
+        def envoyer(files):
+            reponse = client.post(url, files=files)
+            reponse.raise_for_status()
+            return reponse
+        return envoyer
+
+    mesurer(resultats, f'api/predict-sentiment/{n}', poster('/predict-sentiment/'), n, fichier, repetitions, memoire)
+    mesurer(resultats, f'api/predict-sentiment-stream/{n}', poster('/predict-sentiment/?stream=true'), n, fichier,
+            repetitions, memoire)
+    mesurer(resultats, f'api/predict-sentiment-lean/{n}', poster('/predict-sentiment/?fields=PhraseId,sentiment'), n,
+            fichier, repetitions, memoire)
+    mesurer(resultats, f'api/clean-csv/{n}', poster('/clean-csv/'), n, fichier, repetitions, memoire)
+    try:
+        parquet = io.BytesIO()
+        corpus.to_parquet(parquet)
+        mesurer(resultats, f'api/predict-sentiment-parquet/{n}', poster('/predict-sentiment/'), n,
+                lambda: vider_caches() + ({'file': ('corpus.parquet', parquet.getvalue(), 'application/vnd.apache.parquet')},),
+                repetitions, memoire)
+    except ImportError:
+        pass  # pyarrow absent
+
+    donnees = {'cleaned_data': [{'cleaned_text': texte} for texte in textes_nettoyes]}
+    if textes_nettoyes:
+        mesurer(resultats, f'api/predict-from-cleaned/{n}',
+                lambda: client.post('/predict-from-cleaned/', json=donnees).raise_for_status(), len(textes_nettoyes),
+                vider_caches, repetitions, memoire)
+
+    def job(files):
+        job_id = client.post('/jobs', files=files).json()['id']
+        while client.get(f'/jobs/{job_id}').json()['status'] not in ('done', 'failed'):
+            time.sleep(0.01)
+        client.get(f'/jobs/{job_id}/result').raise_for_status()
+        client.delete(f'/jobs/{job_id}')
+
+    mesurer(resultats, f'api/jobs/{n}', job, n, fichier, repetitions, memoire=False)
+
+    # Latence des requêtes interactives, une à une puis concurrentes (regroupées par le micro-batcher)
+    vider_caches()
+    phrases = corpus['Phrase'].dropna()
+    phrases = phrases[phrases != ''].tolist()[:REQUETES_TEXTE] or ['This movie was great']
+
+    def requete(phrase):
+        debut = time.perf_counter()
+        client.post('/predict-text/', json={'text': phrase}).raise_for_status()
+        return time.perf_counter() - debut
+
+    for nom, requetes in (('healthz', lambda: [time_get(client, '/healthz') for _ in phrases]),
+                          ('predict-text', lambda: [requete(phrase) for phrase in phrases])):
+        debut = time.perf_counter()
+        durees = requetes()
+        total = time.perf_counter() - debut
+        resultats[f'api/{nom}/{n}'] = {'rows': len(phrases), 'seconds': total,
+                                       'rows_per_second': len(phrases) / total, **percentiles(durees)}
+        afficher_latence(f'api/{nom}/{n}', resultats)
+
+    vider_caches()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        debut = time.perf_counter()
+        durees = list(pool.map(requete, phrases))
+        total = time.perf_counter() - debut
+    nom = f'api/predict-text-concurrent/{n}'
+    resultats[nom] = {'rows': len(phrases), 'seconds': total, 'rows_per_second': len(phrases) / total, **percentiles(durees)}
+    afficher_latence(nom, resultats)
+
+    # Latence interactive pendant qu'un gros fichier est traité : elle doit rester proche de api/predict-text
+    vider_caches()
+    fin_envoi = threading.Event()
+
+    def envoyer_en_boucle():
+        while not fin_envoi.is_set():
+            client.post('/predict-sentiment/', files={'file': ('corpus.tsv', tsv, 'text/tab-separated-values')}).raise_for_status()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        envoi = pool.submit(envoyer_en_boucle)
+        # Laisser le premier fichier arriver dans le pool 'bulk' avant de mesurer
+        time.sleep(0.2)
+        debut = time.perf_counter()
+        durees = [requete(phrase) for phrase in phrases]
+        total = time.perf_counter() - debut
+        fin_envoi.set()
+        envoi.result()
+    nom = f'api/predict-text-during-bulk/{n}'
+    resultats[nom] = {'rows': len(phrases), 'seconds': total, 'rows_per_second': len(phrases) / total, **percentiles(durees)}
+    afficher_latence(nom, resultats)
+
+def time_get(client, url):
+    debut = time.perf_counter()
+    client.get(url).raise_for_status()
+    return time.perf_counter() - debut
+
+def afficher_latence(nom, resultats):
+    entree = resultats[nom]
+    print(f"{nom:<60} {entree['seconds'] * 1000:>10.2f} ms {entree['rows_per_second']:>12.0f} req/s "
+          f"p50 {entree['p50_ms']:.2f} ms p95 {entree['p95_ms']:.2f} ms", flush=True)
+
+# Start the API in-process and wait until the model is loaded and warmed up
+def demarrer_api():
+    os.environ.setdefault('JOBS_DIR', tempfile.mkdtemp(prefix='benchmark-jobs-'))
+    os.environ.setdefault('MODEL_WATCH_SECONDS', '0')
+    # Une ligne de journal par requête fausserait les mesures
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import api
+    from fastapi.testclient import TestClient
+    client = TestClient(api.app)
+    client.__enter__()
+    while client.get('/readyz').status_code != 200:
+        time.sleep(0.05)
+    return client
+
+# Compare the results with a baseline: entries more than `seuil` slower (or larger) are regressions
+def comparer(resultats, reference, seuil=SEUIL_REGRESSION, duree_minimale=DUREE_MINIMALE):
+    regressions = []
+    for nom, entree in sorted(resultats.items()):
+        base = reference.get(nom)
+        if base is None:
+            continue
+        for mesure in ('seconds', 'p95_ms', 'peak_mb'):
+            if mesure not in entree or mesure not in base or not base[mesure]:
+                continue
+            if mesure == 'seconds' and base[mesure] < duree_minimale:
+                continue
+            ratio = entree[mesure] / base[mesure]
+            if ratio > 1 + seuil:
+                regressions.append((nom, mesure, base[mesure], entree[mesure], ratio))
+    return regressions
+
+def metadonnees(tailles):
+    import numpy
+    import sklearn
+    return {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': numpy.__version__,
+        'sklearn': sklearn.__version__,
+        'sizes': list(tailles),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesure le prétraitement, la prédiction et les endpoints de l'API.")
+    parser.add_argument('--sizes', default=','.join(map(str, TAILLES)), help="tailles de corpus, séparées par des virgules")
+    parser.add_argument('--repetitions', type=int, default=3, help="répétitions par mesure (la meilleure est gardée)")
+    parser.add_argument('--output', help="fichier JSON où écrire les résultats (ex. nouvelle référence)")
+    parser.add_argument('--compare', help="fichier JSON de référence : échoue en cas de régression")
+    parser.add_argument('--threshold', type=float, default=SEUIL_REGRESSION, help="régression tolérée (0.25 = +25 %%)")
+    parser.add_argument('--no-memory', action='store_true', help="ne pas mesurer la mémoire (plus rapide)")
+    parser.add_argument('--no-api', action='store_true', help="ne pas mesurer les endpoints")
+    args = parser.parse_args(argv)
+
+    tailles = [int(taille) for taille in args.sizes.split(',')]
+    memoire = not args.no_memory
+    resultats = {}
+
+    client = None if args.no_api else demarrer_api()
+    if client is None:
+        from model_store import model_store
+        model_store.load()
+
+    for taille in tailles:
+        corpus = generer_corpus(taille)
+        # Une seule répétition pour les gros corpus : chaque mesure dure déjà plusieurs secondes
+        repetitions = args.repetitions if taille <= 10000 else 1
+        print(f"\n== {taille} lignes ==")
+        nettoye = benchmark_pretraitement(resultats, corpus, repetitions, memoire)
+        textes = nettoye['cleaned_text'].tolist()
+        benchmark_prediction(resultats, taille, textes, repetitions, memoire)
+        if client is not None:
+            benchmark_api(resultats, client, corpus, textes, repetitions, memoire)
+
+    if client is not None:
+        client.__exit__(None, None, None)
+
+    rapport = {'meta': metadonnees(tailles), 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+               'results': resultats}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+        print(f"\nRésultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            reference = json.load(f)
+        regressions = comparer(resultats, reference['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%} :")
+            for nom, mesure, avant, apres, ratio in regressions:
+                print(f"  {nom} [{mesure}] {avant:.4g} -> {apres:.4g} (x{ratio:.2f})")
+            return 1
+        print(f"\nAucune régression au-delà de {args.threshold:.0%} par rapport à {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.run --sizes 1,1000,100000 --output benchmarks/baseline.json
+    # python -m benchmarks.run --compare benchmarks/baseline.json
+    sys.exit(main())
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+# Taille du cache en mémoire, durée de vie des entrées (secondes) et base SQLite partagée optionnelle
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "100000"))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_DB = os.environ.get("PREDICTION_CACHE_DB", "")
+
+# Nombre d'écritures entre deux purges des entrées expirées de la base SQLite
+SQLITE_PURGE_EVERY = 1000
+
+# Nombre maximal de clés par requête SELECT (limite de paramètres de SQLite)
+SQLITE_MAX_KEYS = 500
+
+# Lots de prédictions en attente d'écriture ; au-delà, les nouveaux lots ne sont pas écrits dans la base
+SQLITE_MAX_PENDING_WRITES = 64
+
+
+# Persistent backend shared by all the workers of a node
+class SQLitePredictionStore:
+    """Base SQLite des prédictions, écrite en arrière-plan.
+
+    Les lectures se font dans la requête. Les écritures sont confiées à un thread
+    qui a sa propre connexion et regroupe tous les lots en attente dans une seule
+    transaction : elles ne ralentissent pas la requête qui a calculé les prédictions.
+    Les entrées d'une autre version du modèle ne sont jamais lues (la version fait
+    partie de la clé) et disparaissent à leur expiration.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key BLOB PRIMARY KEY, version TEXT NOT NULL, prediction INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.dropped_writes = 0
+        self._pending = queue.Queue(maxsize=SQLITE_MAX_PENDING_WRITES)
+        self._writer = threading.Thread(target=self._write_loop, name='prediction-cache-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def get_many(self, keys, now):
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), SQLITE_MAX_KEYS):
+                batch = keys[start:start + SQLITE_MAX_KEYS]
+                found.update(self._connection.execute(
+                    f"SELECT key, prediction FROM predictions WHERE expires_at > ? AND key IN ({','.join('?' * len(batch))})",
+                    [now, *batch],
+                ).fetchall())
+        return found
+
+    def set_many(self, items, version, expires_at):
+        """Met le lot en file d'écriture ; s'il y a trop de lots en attente, il n'est pas écrit."""
+        try:
+            self._pending.put_nowait([(key, version, prediction, expires_at) for key, prediction in items])
+        except queue.Full:
+            self.dropped_writes += len(items)
+
+    # Writer thread: one transaction for all the batches waiting in the queue
+    def _write_loop(self):
+        connection = self._connect()
+        writes = 0
+        while True:
+            batches = [self._pending.get()]
+            while True:
+                try:
+                    batches.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for batch in batches if batch is not None for row in batch]
+            try:
+                if rows:
+                    with connection:
+                        connection.execute("BEGIN")
+                        connection.executemany(
+                            "INSERT OR REPLACE INTO predictions (key, version, prediction, expires_at) VALUES (?, ?, ?, ?)",
+                            rows,
+                        )
+                    writes += len(rows)
+                    if writes >= SQLITE_PURGE_EVERY:
+                        writes = 0
+                        connection.execute("DELETE FROM predictions WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error:
+                # Le cache reste correct sans ces entrées : elles seront recalculées
+                self.dropped_writes += len(rows)
+            finally:
+                for _ in batches:
+                    self._pending.task_done()
+            if None in batches:
+                connection.close()
+                return
+
+    def flush(self):
+        """Attend que les écritures en attente soient dans la base."""
+        self._pending.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        with self._lock:
+            self._connection.close()
+
+
+# Prediction cache keyed by the cleaned text and the model version
+class PredictionCache:
+    """Cache des prédictions indexé par l'empreinte (version du modèle, texte nettoyé).
+
+    Niveau 1 : LRU en mémoire borné en taille, chaque entrée expirant après ttl
+    secondes. Niveau 2 optionnel : base SQLite partagée par les workers du nœud.
+    La version du modèle fait partie de la clé, et le changement de version vide
+    le niveau 1 : un rechargement du modèle invalide donc le cache automatiquement.
+    Le niveau 2 n'est pas purgé au changement de version : pendant un rechargement
+    progressif, des workers servent encore l'ancien modèle et d'autres déjà le
+    nouveau, et chaque version y garde ses entrées jusqu'à leur expiration.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL, sqlite_path=PREDICTION_CACHE_DB):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = SQLitePredictionStore(sqlite_path) if sqlite_path else None
+        self.version = None
+        self.current_version = None  # fonction renvoyant la version en service (ex. celle du ModelStore)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()  # clé -> (prédiction, expiration)
+        self._lock = threading.Lock()
+
+    def _use_version(self, version):
+        """Passe à la version donnée ; renvoie False si ce n'est plus la version en service
+        (requête encore en cours sur l'ancien modèle), auquel cas le cache n'est pas utilisé."""
+        if self.current_version is not None and version != self.current_version():
+            return False
+        if version == self.version:
+            return True
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+        return True
+
+    def key(self, text, version):
+        return hashlib.blake2b(f'{version}\0{text}'.encode('utf-8'), digest_size=16).digest()
+
+    def _get_memory(self, keys, now):
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._data[key]
+                    self.evictions += 1
+                    continue
+                self._data.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def _set_memory(self, items, expires_at):
+        with self._lock:
+            for key, prediction in items:
+                self._data[key] = (prediction, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, texts, scorer, version):
+        """Prédictions de scorer pour texts, en ne calculant que celles absentes du cache."""
+        if not self._use_version(version):
+            return scorer.predict(texts)
+        texts = list(texts)
+        now = time.time()
+        # Les valeurs qui ne sont pas du texte passent sans cache (le scorer signalera l'erreur)
+        keys = [self.key(text, version) if isinstance(text, str) else None for text in texts]
+        unique_keys = list({key for key in keys if key is not None})
+
+        found = self._get_memory(unique_keys, now)
+        if self.store is not None:
+            missing = [key for key in unique_keys if key not in found]
+            if missing:
+                from_disk = self.store.get_many(missing, now)
+                self._set_memory(from_disk.items(), now + self.ttl)
+                found.update(from_disk)
+                self.disk_hits += len(from_disk)
+
+        # Calculer une seule fois chaque texte absent du cache
+        to_compute = {}
+        for text, key in zip(texts, keys):
+            if key is None or key not in found:
+                to_compute.setdefault(key if key is not None else id(text), text)
+        hits = sum(1 for key in keys if key is not None and key in found)
+        self.hits += hits
+        self.misses += len(texts) - hits
+
+        if to_compute:
+            predictions = scorer.predict(list(to_compute.values()))
+            computed = {key: prediction.item() for key, prediction in zip(to_compute, predictions)}
+            new_items = [(key, prediction) for key, prediction in computed.items() if isinstance(key, bytes)]
+            self._set_memory(new_items, now + self.ttl)
+            if self.store is not None and new_items:
+                self.store.set_many(new_items, version, now + self.ttl)
+            found.update(computed)
+
+        return np.array([found[key if key is not None else id(text)] for text, key in zip(texts, keys)],
+                        dtype=scorer.classes.dtype)
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'model_version': self.version,
+            'sqlite': self.store.path if self.store is not None else None,
+            'sqlite_dropped_writes': self.store.dropped_writes if self.store is not None else 0,
+        }
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import histogram
+
+# Bornes de l'histogramme du temps passé en file avant exécution (secondes)
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+# Raised when a lane already holds its maximum number of pending tasks (-> 429)
+class QueueFullError(Exception):
+    pass
+
+
+# Raised when a lane no longer accepts work, e.g. during shutdown (-> 503)
+class PoolUnavailableError(Exception):
+    pass
+
+
+# Dedicated worker pool with a bounded queue for one class of traffic
+class WorkerLane:
+    """Pool de threads dédié à un type de trafic, avec une file d'attente bornée.
+
+    Le travail synchrone (pandas, NLTK, langdetect, scoring) s'exécute hors de la
+    boucle asyncio. Au-delà de max_workers tâches en cours plus max_queue tâches
+    en attente, les nouvelles tâches sont refusées au lieu d'allonger la file.
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_workers + max_queue
+        self.pending = 0
+        self.rejected = 0
+        self.closed = False
+        self.queue_wait_histogram = histogram(f'{name}_queue_wait_seconds', "Temps d'attente en file avant exécution", QUEUE_WAIT_BUCKETS)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'{name}-worker')
+        self._lock = threading.Lock()
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args, reject_when_full=True):
+        """Exécute fn(*args) dans le pool et attend son résultat.
+
+        Avec reject_when_full=False la tâche est acceptée même si la file est
+        pleine (suite d'un travail déjà admis, comme les morceaux d'un streaming).
+        """
+        if self.closed:
+            raise PoolUnavailableError(f"Le pool '{self.name}' n'accepte plus de travail.")
+        with self._lock:
+            if reject_when_full and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"File d'attente '{self.name}' pleine.")
+            self.pending += 1
+
+        submitted = time.perf_counter()
+
+        def task():
+            self.queue_wait_histogram.observe(time.perf_counter() - submitted)
+            return fn(*args)
+
+        try:
+            future = self._executor.submit(task)
+        except RuntimeError as e:
+            self._release()
+            raise PoolUnavailableError(str(e))
+        # Libérer la place à la fin réelle de la tâche, même si l'appelant a abandonné
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait=True):
+        self.closed = True
+        self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        return {
+            'workers': self.max_workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'rejected': self.rejected,
+            'queue_wait_seconds': self.queue_wait_histogram.snapshot(),
+        }
+
+
+# Lanes séparées : les petites requêtes interactives ne font jamais la queue derrière les gros fichiers
+interactive_lane = WorkerLane(
+    'interactive',
+    max_workers=int(os.environ.get("INTERACTIVE_WORKERS", "2")),
+    max_queue=int(os.environ.get("INTERACTIVE_QUEUE", "256")),
+)
+bulk_lane = WorkerLane(
+    'bulk',
+    max_workers=int(os.environ.get("BULK_WORKERS", "2")),
+    max_queue=int(os.environ.get("BULK_QUEUE", "8")),
+)
+# Flux WebSocket de commentaires : leurs gros lots ne font jamais la queue devant /predict-text/.
+# Les lots attendent un worker sans être refusés, la file étant bornée par le contrôle de flux de chaque connexion
+stream_lane = WorkerLane(
+    'stream',
+    max_workers=int(os.environ.get("STREAM_WORKERS", "1")),
+    max_queue=0,
+)
+# Jobs en arrière-plan : un job occupe un worker du début à la fin, sans file d'attente (les jobs attendent en base)
+jobs_lane = WorkerLane(
+    'jobs',
+    max_workers=int(os.environ.get("JOBS_WORKERS", "1")),
+    max_queue=0,
+)
@@ -0,0 +1,172 @@
+import io
+import json
+import os
+import pandas as pd
+
+# Encodeur JSON rapide, optionnel
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Formats tabulaires acceptés en entrée et en sortie, avec leur type MIME de réponse
+MEDIA_TYPES = {
+    'tsv': 'text/tsv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'json': 'application/json',
+}
+
+# Types MIME et extensions reconnus pour chaque format
+CONTENT_TYPES = {
+    'text/tsv': 'tsv',
+    'text/tab-separated-values': 'tsv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'application/vnd.apache.parquet': 'parquet',
+    'application/parquet': 'parquet',
+    'application/x-parquet': 'parquet',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/vnd.apache.arrow.file': 'arrow',
+}
+EXTENSIONS = {
+    '.tsv': 'tsv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.arrows': 'arrow',
+    '.feather': 'arrow',
+}
+
+# Types MIME reconnus dans l'en-tête Accept (JSON n'existe qu'en sortie)
+ACCEPT_TYPES = {**CONTENT_TYPES, 'application/json': 'json'}
+
+# Dispositions de la sortie JSON : liste d'enregistrements ou une liste de valeurs par colonne
+JSON_LAYOUTS = ('records', 'columns')
+
+# Formats dont les lignes peuvent être écrites au fil de l'eau
+STREAMABLE_OUTPUTS = ('tsv', 'ndjson')
+
+# Signature du format de fichier Arrow IPC (par opposition au format flux)
+ARROW_FILE_MAGIC = b'ARROW1'
+
+# Types imposés à la lecture NDJSON : sans eux, pandas convertit une phrase comme "123" en nombre
+NDJSON_DTYPES = {'Phrase': str}
+
+
+# Raised for an unknown input format or a missing optional dependency (-> 415)
+class FormatNonSupporte(ValueError):
+    status_code = 415
+
+
+# Raised for an output format the server cannot produce (-> 406)
+class FormatSortieNonSupporte(FormatNonSupporte):
+    status_code = 406
+
+
+def _pyarrow(erreur=FormatNonSupporte):
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise erreur("Les formats Parquet et Arrow nécessitent le paquet 'pyarrow'.")
+    return pyarrow
+
+# Input format from the upload's content type, then its file extension (TSV by default)
+def format_entree(content_type=None, filename=None):
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type in CONTENT_TYPES:
+        return CONTENT_TYPES[media_type]
+    extension = os.path.splitext(filename or '')[1].lower()
+    return EXTENSIONS.get(extension, 'tsv')
+
+# Output format from an explicit 'format' parameter, then the Accept header
+def format_sortie(format_demande=None, accept=None, defaut='tsv'):
+    if format_demande:
+        if format_demande not in MEDIA_TYPES:
+            raise FormatSortieNonSupporte(f"Format de sortie inconnu : {format_demande}.")
+        return format_demande
+    for media_type in (accept or '').split(','):
+        media_type = media_type.split(';')[0].strip().lower()
+        if media_type in ACCEPT_TYPES:
+            return ACCEPT_TYPES[media_type]
+    return defaut
+
+# Read a whole table from the upload bytes, without decoding them to a str
+def lire_tableau(content, fmt='tsv'):
+    if fmt == 'tsv':
+        return pd.read_csv(io.BytesIO(content), sep='\t')
+    if fmt == 'ndjson':
+        return pd.read_json(io.BytesIO(content), lines=True, dtype=NDJSON_DTYPES)
+    pa = _pyarrow()
+    buffer = pa.py_buffer(content)  # vue sur les octets reçus, sans copie
+    if fmt == 'parquet':
+        return pa.parquet.read_table(pa.BufferReader(buffer)).to_pandas()
+    if fmt == 'arrow':
+        if content[:len(ARROW_FILE_MAGIC)] == ARROW_FILE_MAGIC:
+            return pa.ipc.open_file(buffer).read_all().to_pandas()
+        return pa.ipc.open_stream(buffer).read_all().to_pandas()
+    raise FormatNonSupporte(f"Format d'entrée inconnu : {fmt}.")
+
+# Read a table from a binary file object in DataFrame chunks of about chunksize rows
+def lire_par_morceaux(fichier, fmt='tsv', chunksize=10000):
+    if fmt == 'tsv':
+        yield from pd.read_csv(fichier, sep='\t', chunksize=chunksize)
+    elif fmt == 'ndjson':
+        yield from pd.read_json(fichier, lines=True, dtype=NDJSON_DTYPES, chunksize=chunksize)
+    elif fmt == 'parquet':
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(fichier).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif fmt == 'arrow':
+        pa = _pyarrow()
+        magic = fichier.read(len(ARROW_FILE_MAGIC))
+        fichier.seek(0)
+        if magic == ARROW_FILE_MAGIC:
+            reader = pa.ipc.open_file(fichier)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = pa.ipc.open_stream(fichier)
+        for batch in batches:
+            yield batch.to_pandas()
+    else:
+        raise FormatNonSupporte(f"Format d'entrée inconnu : {fmt}.")
+
+# Serialize a table as JSON records or as a columnar {column: [values]} object
+def ecrire_json(df, layout='records'):
+    if layout == 'records':
+        # Encodeur C de pandas : plus rapide que to_dict + json.dumps, même sur les listes de tokens
+        return df.to_json(orient='records', force_ascii=False)
+    if layout == 'columns':
+        if orjson is not None:
+            return orjson.dumps({name: df[name].tolist() for name in df.columns})
+        return '{' + ','.join(
+            json.dumps(str(name), ensure_ascii=False) + ':' + df[name].to_json(orient='values', force_ascii=False)
+            for name in df.columns
+        ) + '}'
+    raise FormatSortieNonSupporte(f"Disposition JSON inconnue : {layout}.")
+
+# Serialize a table; header=False continues a TSV already started (streaming)
+def ecrire_tableau(df, fmt='tsv', header=True, layout='records'):
+    if fmt == 'json':
+        return ecrire_json(df, layout)
+    if fmt == 'tsv':
+        return df.to_csv(sep='\t', index=False, header=header)
+    if fmt == 'ndjson':
+        return df.to_json(orient='records', lines=True, force_ascii=False) if len(df) else ''
+    pa = _pyarrow(FormatSortieNonSupporte)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == 'parquet':
+        pa.parquet.write_table(table, sink)
+    elif fmt == 'arrow':
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise FormatSortieNonSupporte(f"Format de sortie inconnu : {fmt}.")
+    return sink.getvalue().to_pybytes()
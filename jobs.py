@@ -0,0 +1,237 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from batch import etat_initial, lignes_par_seconde
+
+# Dossier des fichiers reçus et produits par les jobs, et base SQLite de leur état
+JOBS_DIR = os.environ.get("JOBS_DIR", "jobs")
+JOBS_DB = os.environ.get("JOBS_DB", os.path.join(JOBS_DIR, "jobs.db"))
+
+# Un job 'running' dont le bail n'a pas été renouvelé depuis ce délai (secondes) est considéré comme interrompu
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))
+
+# Intervalle de renouvellement du bail d'un job en cours (plusieurs renouvellements par bail)
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", str(JOB_LEASE_SECONDS / 4)))
+
+# États d'un job
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+# Raised for an unknown job id (-> 404)
+class JobNotFoundError(KeyError):
+    pass
+
+
+# Raised when a worker writes to a job that another worker has taken over (expired lease)
+class JobLeaseLostError(Exception):
+    pass
+
+
+# Job state store shared by the workers of a node, kept across restarts
+class JobStore:
+    """État des jobs dans une base SQLite locale.
+
+    Chaque job garde sa progression (etat de batch.traiter_fichier) après chaque
+    morceau : un job interrompu par un redémarrage repart de son dernier point de
+    reprise au lieu de tout recommencer.
+
+    claim attribue au job un jeton (owner) : seul le worker qui le détient peut
+    renouveler le bail, enregistrer la progression et terminer le job. Un worker
+    dont le job a été repris par un autre (bail expiré) ne peut plus rien écrire.
+    """
+
+    def __init__(self, path=JOBS_DB, jobs_dir=JOBS_DIR):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _db(self):
+        # Base ouverte à la première utilisation : importer l'API ne crée aucun fichier
+        if self._connection is None:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, format_in TEXT NOT NULL, format_out TEXT NOT NULL, "
+                "fields TEXT, input_bytes INTEGER NOT NULL, progress TEXT NOT NULL, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, updated_at REAL, finished_at REAL, owner TEXT)"
+            )
+            # Base créée par une version sans jeton de propriétaire
+            if 'owner' not in {row['name'] for row in connection.execute("PRAGMA table_info(jobs)")}:
+                connection.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._connection = connection
+        return self._connection
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def input_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), 'input')
+
+    def output_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), 'output')
+
+    def create(self, fichier, format_in='tsv', format_out='tsv', fields=None):
+        """Copie le fichier reçu (objet fichier binaire) sur disque et enregistre le job en attente."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(self.input_path(job_id), 'wb') as f:
+            shutil.copyfileobj(fichier, f, 1024 * 1024)
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, status, format_in, format_out, fields, input_bytes, progress, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, format_in, format_out, json.dumps(fields) if fields is not None else None,
+                 os.path.getsize(self.input_path(job_id)), json.dumps(etat_initial()), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(job_id)
+        job = dict(row)
+        job['fields'] = tuple(json.loads(job['fields'])) if job['fields'] is not None else None
+        job['progress'] = json.loads(job['progress'])
+        return job
+
+    def claim(self):
+        """Passe le plus ancien job en attente à l'état 'running' et le renvoie (None s'il n'y en a pas).
+
+        La mise à jour n'aboutit que si le job est toujours en attente : deux workers
+        partageant la base ne peuvent pas prendre le même job. job['owner'] est le
+        jeton à passer à heartbeat, save_progress, release et finish.
+        """
+        owner = uuid.uuid4().hex
+        while True:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = self._db().execute(
+                    "UPDATE jobs SET status = ?, owner = ?, started_at = COALESCE(started_at, ?), updated_at = ? "
+                    "WHERE id = ? AND status = ?",
+                    (RUNNING, owner, time.time(), time.time(), row['id'], QUEUED),
+                ).rowcount
+            if claimed:
+                return self.get(row['id'])
+
+    def requeue_interrupted(self, lease=JOB_LEASE_SECONDS):
+        """Remet en attente les jobs 'running' dont le bail n'a pas été renouvelé depuis lease
+        secondes (worker arrêté ou redémarré) ; renvoie leur nombre."""
+        with self._lock:
+            return self._db().execute(
+                "UPDATE jobs SET status = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, RUNNING, time.time() - lease),
+            ).rowcount
+
+    def _update_owned(self, job_id, owner, assignments, values):
+        # Mise à jour d'un job en cours, seulement par le worker qui détient son jeton
+        with self._lock:
+            updated = self._db().execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND owner = ? AND status = ?",
+                (*values, job_id, owner, RUNNING),
+            ).rowcount
+        if not updated:
+            raise JobLeaseLostError(f"Le job {job_id} a été repris par un autre worker.")
+
+    def heartbeat(self, job_id, owner):
+        """Renouvelle le bail d'un job en cours (JobLeaseLostError s'il a été repris)."""
+        self._update_owned(job_id, owner, "updated_at = ?", (time.time(),))
+
+    def save_progress(self, job_id, progress, owner):
+        self._update_owned(job_id, owner, "progress = ?, updated_at = ?", (json.dumps(progress), time.time()))
+
+    def release(self, job_id, owner):
+        """Remet en attente un job arrêté proprement avant la fin (il reprendra à son dernier point de reprise)."""
+        self._update_owned(job_id, owner, "status = ?, owner = NULL", (QUEUED,))
+
+    def finish(self, job_id, owner, error=None):
+        self._update_owned(job_id, owner, "status = ?, error = ?, finished_at = ?, owner = NULL",
+                           (FAILED if error is not None else DONE, error, time.time()))
+        if error is None:
+            os.remove(self.input_path(job_id))
+
+    def lease(self, job, stop=None, interval=JOB_HEARTBEAT_SECONDS):
+        return JobLease(self, job['id'], job['owner'], stop, interval)
+
+    def delete(self, job_id):
+        with self._lock:
+            self._db().execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def summary(self, job_id):
+        """Description publique d'un job : état, lignes traitées et débit."""
+        job = self.get(job_id)
+        progress = job['progress']
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'format_in': job['format_in'],
+            'format_out': job['format_out'],
+            'fields': list(job['fields']) if job['fields'] is not None else None,
+            'input_bytes': job['input_bytes'],
+            'rows_in': progress['rows_in'],
+            'rows_out': progress['rows_out'],
+            'chunks_done': progress['chunks_done'],
+            'processing_seconds': progress['seconds'],
+            'rows_per_second': lignes_par_seconde(progress),
+            'error': job['error'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+        }
+
+
+# Lease of a running job, renewed from a background thread while the worker processes it
+class JobLease:
+    """Renouvelle le bail d'un job toutes les interval secondes, dans un thread, tant que
+    le bloc with s'exécute : un morceau long (NLTK lent, gros morceau, pause du GC) ne
+    fait plus expirer le bail d'un job vivant.
+
+    Sert aussi de signal d'arrêt pour batch.traiter_fichier (is_set) : vrai si stop
+    (arrêt du serveur) est positionné ou si le job a été repris par un autre worker
+    (lost), auquel cas le worker doit s'arrêter sans rien écrire de plus.
+    """
+
+    def __init__(self, store, job_id, owner, stop=None, interval=JOB_HEARTBEAT_SECONDS):
+        self.store = store
+        self.job_id = job_id
+        self.owner = owner
+        self.stop = stop
+        self.interval = interval
+        self.lost = threading.Event()
+        self._done = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            try:
+                self.store.heartbeat(self.job_id, self.owner)
+            except JobLeaseLostError:
+                self.lost.set()
+                return
+
+    def is_set(self):
+        return self.lost.is_set() or (self.stop is not None and self.stop.is_set())
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f'job-lease-{self.job_id[:8]}', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
@@ -0,0 +1,326 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+import scipy.sparse as sp
+from langdetect import DetectorFactory, detect, LangDetectException
+
+logger = logging.getLogger(__name__)
+
+# Graine fixe : sans elle langdetect peut donner deux langues différentes pour le même texte,
+# et les résultats mis en cache ne seraient plus reproductibles
+DetectorFactory.seed = 0
+
+# Nombre maximal de textes gardés en cache
+LANGUAGE_CACHE_SIZE = int(os.environ.get("LANGUAGE_CACHE_SIZE", "100000"))
+
+# Moteur de détection : 'ngram' (modèle par lots, langdetect pour les cas incertains) ou 'langdetect' (phrase par phrase)
+LANGID_ENGINE = os.environ.get("LANGID_ENGINE", "ngram")
+
+# Modèle n-grammes de caractères livré avec le projet (voir construire_modele_langues)
+LANGID_MODEL_PATH = os.environ.get(
+    "LANGID_MODEL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'langid.npz'))
+
+# Probabilité minimale de la langue trouvée par le modèle ; en dessous, langdetect tranche.
+# Calibrée sur le corpus de benchmark : au-dessus de 0,7, langdetect ne change presque jamais la
+# décision anglais / non anglais du modèle et coûte environ 3,5 ms par texte
+LANGID_MIN_CONFIDENCE = float(os.environ.get("LANGID_MIN_CONFIDENCE", "0.7"))
+
+# Chemin rapide : un texte ASCII d'au moins 3 mots dont au moins 25 % de mots outils anglais est anglais
+FAST_PATH_MIN_WORDS = 3
+FAST_PATH_STOPWORD_RATIO = 0.25
+
+# Mots outils propres à l'anglais (sans 'a', 'in', 'is', 'was', 'so', 'to'... fréquents dans d'autres langues)
+ENGLISH_STOPWORDS = frozenset('''
+    the and of this that with for are but not you have his her they be by at or from he she we my what
+    all were there been has had would just very about too than it its their them which who when
+    did does could should your our these those because into only also more most really after before
+'''.split())
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# Lissage de langdetect : probabilité ajoutée aux n-grammes absents du profil d'une langue
+LANGID_SMOOTHING = 0.5 / 10000
+
+# Un n-gramme de 1 à 3 caractères est codé sur un entier : 21 bits par caractère
+CHAR_BITS = 21
+
+
+# Bounded LRU cache of detected languages, keyed by a hash of the text
+class LanguageCache:
+    """Cache LRU des langues détectées.
+
+    Les clés sont des empreintes blake2b de 16 octets plutôt que les textes eux-mêmes,
+    pour que la taille mémoire du cache ne dépende pas de la longueur des phrases.
+    """
+
+    def __init__(self, maxsize=LANGUAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            langue = self._data.get(key)
+            if langue is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return langue
+
+    def set(self, key, langue):
+        with self._lock:
+            self._data[key] = langue
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+
+language_cache = LanguageCache()
+
+# Hash a text into a compact cache key
+def text_key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+# Character normalization of langdetect (punctuation -> space, kana, hangul and kanji classes...)
+@lru_cache(maxsize=None)
+def table_normalisation():
+    from langdetect.utils.ngram import NGram
+    table = {}
+    for codepoint in range(0x10000):
+        if 0xD800 <= codepoint < 0xE000:
+            continue
+        normalized = NGram.normalize(chr(codepoint))
+        if normalized != chr(codepoint):
+            table[codepoint] = normalized
+    # Séparateur des textes d'un lot, gardé tel quel
+    table[0] = '\x00'
+    return table
+
+# Code of an n-gram (1 to 3 characters) as an integer
+def code_ngramme(ngramme):
+    code = 0
+    for char in ngramme:
+        code = (code << CHAR_BITS) | ord(char)
+    return code
+
+# Character 1- to 3-grams of a batch of texts, extracted with array operations over the whole batch
+def ngrammes(textes):
+    """Renvoie (codes, document, ordre - 1) de chaque n-gramme des textes, comme langdetect.
+
+    Les textes sont mis en minuscules, normalisés et concaténés (séparés par un
+    caractère nul) ; les n-grammes ne franchissent ni un espace intérieur ni la
+    frontière entre deux textes. Un caractère nul contenu dans un texte est
+    remplacé par un espace : il décalerait le numéro des textes suivants.
+    """
+    texte = ' \x00 '.join(text.replace('\x00', ' ') for text in textes)
+    texte = (' ' + texte + ' ').lower().translate(table_normalisation())
+    texte = re.sub(' {2,}', ' ', texte)
+    chars = np.frombuffer(texte.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    documents = np.cumsum(chars == 0)
+    espace, separateur = chars == 32, chars == 0
+
+    valides_1 = ~espace & ~separateur
+    valides_2 = ~separateur[:-1] & ~separateur[1:]
+    valides_3 = ~separateur[:-2] & ~separateur[1:-1] & ~separateur[2:] & ~espace[1:-1]
+    codes = np.concatenate([
+        chars[valides_1],
+        ((chars[:-1] << CHAR_BITS) | chars[1:])[valides_2],
+        ((chars[:-2] << 2 * CHAR_BITS) | (chars[1:-1] << CHAR_BITS) | chars[2:])[valides_3],
+    ])
+    docs = np.concatenate([documents[valides_1], documents[:-1][valides_2], documents[:-2][valides_3]])
+    ordres = np.concatenate([np.zeros(valides_1.sum(), np.int8), np.ones(valides_2.sum(), np.int8),
+                             np.full(valides_3.sum(), 2, np.int8)])
+    return codes, docs, ordres
+
+
+# Naive Bayes language identifier on character n-grams, scored a whole batch at a time
+class NgramLanguageModel:
+    """Identifie la langue d'un lot de textes avec une seule multiplication de matrices creuses.
+
+    Comme langdetect, P(n-gramme | langue) = fréquence dans le profil + lissage.
+    Le terme de lissage étant le même pour toutes les langues, le score d'une
+    langue est la somme, sur les n-grammes du texte, de log(1 + fréquence / lissage) :
+    une matrice creuse (n-grammes x langues) multipliée par la matrice des
+    n-grammes présents dans chaque texte.
+    """
+
+    def __init__(self, codes, log_ratios, languages):
+        self.codes = codes            # codes des n-grammes connus, triés
+        self.log_ratios = log_ratios  # (n_ngrammes, n_langues), creuse
+        self.languages = languages
+
+    @classmethod
+    def from_counts(cls, counts, languages, smoothing=LANGID_SMOOTHING):
+        """counts : {code du n-gramme: {indice de langue: nombre d'occurrences}}."""
+        codes = np.array(sorted(counts), dtype=np.int64)
+        ordres = np.where(codes < 1 << CHAR_BITS, 0, np.where(codes < 1 << 2 * CHAR_BITS, 1, 2))
+        rows, cols, values = [], [], []
+        for row, code in enumerate(codes.tolist()):
+            for language, count in counts[code].items():
+                rows.append(row)
+                cols.append(language)
+                values.append(count)
+        rows, cols, values = np.array(rows), np.array(cols), np.array(values, dtype=np.float64)
+        # Total des n-grammes de chaque ordre par langue, pour passer des comptes aux fréquences
+        totals = np.zeros((len(languages), 3))
+        np.add.at(totals, (cols, ordres[rows]), values)
+        frequencies = values / totals[cols, ordres[rows]]
+        log_ratios = sp.csr_matrix((np.log1p(frequencies / smoothing).astype(np.float32), (rows, cols)),
+                                   shape=(len(codes), len(languages)))
+        return cls(codes, log_ratios, list(languages))
+
+    def save(self, path):
+        np.savez_compressed(path, codes=self.codes, data=self.log_ratios.data, indices=self.log_ratios.indices,
+                            indptr=self.log_ratios.indptr, shape=np.array(self.log_ratios.shape),
+                            languages=np.array(self.languages))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            log_ratios = sp.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+            return cls(data['codes'], log_ratios, data['languages'].tolist())
+
+    def predict(self, textes):
+        """(langues, probabilités) des textes ; 'unknown' (probabilité 0) pour un texte sans n-gramme connu."""
+        codes, docs, _ = ngrammes(textes)
+        positions = np.searchsorted(self.codes, codes)
+        positions[positions == len(self.codes)] = 0
+        found = self.codes[positions] == codes
+        presence = sp.csr_matrix((np.ones(found.sum(), np.float32), (docs[found], positions[found])),
+                                 shape=(len(textes), len(self.codes)))
+        scores = (presence @ self.log_ratios).toarray()
+
+        # Probabilité a posteriori (langues équiprobables a priori)
+        best = scores.argmax(axis=1)
+        exp_scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        confidence = 1 / exp_scores.sum(axis=1)
+        known = np.diff(presence.indptr) > 0
+        languages = [self.languages[index] if has_ngrams else 'unknown' for index, has_ngrams in zip(best, known)]
+        return languages, np.where(known, confidence, 0.0)
+
+
+# Build the model from langdetect's language profiles (shipped with the package), plus an optional labelled corpus
+def construire_modele_langues(textes_etiquetes=()):
+    """textes_etiquetes : couples (texte, langue) ajoutés aux profils, par ex. des avis anglais du corpus."""
+    import langdetect
+    profiles_dir = os.path.join(os.path.dirname(langdetect.__file__), 'profiles')
+    languages = sorted(os.listdir(profiles_dir))
+    counts = {}
+    for index, language in enumerate(languages):
+        with open(os.path.join(profiles_dir, language), encoding='utf-8') as f:
+            profile = json.load(f)
+        for ngramme, count in profile['freq'].items():
+            # Les textes sont mis en minuscules : les comptes des deux casses sont regroupés
+            lower = ngramme.lower()
+            ngramme = lower if len(lower) == len(ngramme) else ngramme
+            per_language = counts.setdefault(code_ngramme(ngramme), {})
+            per_language[index] = per_language.get(index, 0) + count
+
+    textes_etiquetes = list(textes_etiquetes)
+    for language in sorted({language for _, language in textes_etiquetes} - set(languages)):
+        languages.append(language)
+    if textes_etiquetes:
+        textes, etiquettes = zip(*textes_etiquetes)
+        codes, docs, _ = ngrammes(textes)
+        indices = np.array([languages.index(language) for language in etiquettes])[docs]
+        for code, index in zip(codes.tolist(), indices.tolist()):
+            per_language = counts.setdefault(code, {})
+            per_language[index] = per_language.get(index, 0) + 1
+    return NgramLanguageModel.from_counts(counts, languages)
+
+# Model shipped with the project, loaded on first use (None if the file is missing: langdetect only)
+@lru_cache(maxsize=None)
+def modele_langues(path=LANGID_MODEL_PATH):
+    if not os.path.exists(path):
+        logger.warning("Modèle de langues absent, détection par langdetect seul", extra={'path': path})
+        return None
+    return NgramLanguageModel.load(path)
+
+# Obvious English: ASCII text with a high share of English function words
+def anglais_evident(text):
+    if not text.isascii():
+        return False
+    words = WORD_PATTERN.findall(text.lower())
+    return len(words) >= FAST_PATH_MIN_WORDS and \
+        sum(word in ENGLISH_STOPWORDS for word in words) >= FAST_PATH_STOPWORD_RATIO * len(words)
+
+# Detect one text with langdetect, 'unknown' if the detection fails
+def detecter_langdetect(text):
+    try:
+        return detect(text)
+    except LangDetectException:
+        return 'unknown'
+
+# Detect the languages of a batch of texts: cache, ASCII/stopword fast path, n-gram model, then langdetect if unsure
+def detecter_langues_lot(textes):
+    langues = ['unknown' if not isinstance(text, str) else language_cache.get(text_key(text)) for text in textes]
+    a_detecter = [i for i, langue in enumerate(langues) if langue is None]
+    modele = modele_langues() if LANGID_ENGINE == 'ngram' else None
+
+    if modele is not None:
+        for i in a_detecter:
+            if anglais_evident(textes[i]):
+                langues[i] = 'en'
+        restants = [i for i in a_detecter if langues[i] is None]
+        if restants:
+            predites, confiances = modele.predict([textes[i] for i in restants])
+            for i, langue, confiance in zip(restants, predites, confiances):
+                # Sans n-gramme connu, langdetect échouerait aussi : 'unknown' directement
+                if langue == 'unknown' or confiance >= LANGID_MIN_CONFIDENCE:
+                    langues[i] = langue
+
+    for i in a_detecter:
+        if langues[i] is None:
+            langues[i] = detecter_langdetect(textes[i])
+        language_cache.set(text_key(textes[i]), langues[i])
+    return langues
+
+# Detect the language of a text, 'unknown' if the detection fails
+def detecter_langue(text):
+    return detecter_langues_lot([text])[0]
+
+# Fonction pour détecter si le texte est en anglais
+def is_english(text: str) -> bool:
+    return detecter_langue(text) == 'en'
+
+
+if __name__ == "__main__":
+    # Étape de build : python language.py [--corpus avis.tsv --language en] [--output model/langid.npz]
+    parser = argparse.ArgumentParser(description="Construit le modèle de langues n-grammes à partir des profils "
+                                                 "de langdetect et, en option, d'un corpus étiqueté.")
+    parser.add_argument('--corpus', help="fichier TSV, NDJSON, Parquet ou Arrow de textes étiquetés")
+    parser.add_argument('--text-column', default='Phrase', help="colonne du texte")
+    parser.add_argument('--language-column', help="colonne de la langue de chaque texte")
+    parser.add_argument('--language', help="langue de tous les textes du corpus (par ex. en)")
+    parser.add_argument('--output', default=LANGID_MODEL_PATH, help="fichier du modèle")
+    args = parser.parse_args()
+
+    textes_etiquetes = []
+    if args.corpus:
+        from formats import format_entree, lire_tableau
+        with open(args.corpus, 'rb') as f:
+            corpus = lire_tableau(f.read(), format_entree(filename=args.corpus)).dropna(subset=[args.text_column])
+        etiquettes = corpus[args.language_column] if args.language_column else [args.language] * len(corpus)
+        textes_etiquetes = list(zip(corpus[args.text_column].astype(str), etiquettes))
+    modele = construire_modele_langues(textes_etiquetes)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    modele.save(args.output)
+    print(f"Modèle de {len(modele.languages)} langues et {len(modele.codes)} n-grammes sauvegardé sous : {args.output}")
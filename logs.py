@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+import sys
+
+# Niveau des journaux (DEBUG, INFO, WARNING...) et format : 'text' (clé=valeur) ou 'json' (un objet par ligne)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+
+# Attributs présents sur tout LogRecord : les autres viennent de extra={...}
+_STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_handler = None
+
+
+# Structured fields passed with extra={...}
+def champs(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRIBUTES}
+
+
+# One JSON object per line, for log collectors
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **champs(record),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+# Readable line followed by the structured fields as key=value
+class KeyValueFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()}"
+        fields = champs(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={json.dumps(value, ensure_ascii=False, default=str)}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+# Send the application's logs to stderr with the configured level and format
+def configurer_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    global _handler
+    root = logging.getLogger()
+    # Un second appel remplace le gestionnaire du premier au lieu de dupliquer chaque ligne
+    if _handler is not None:
+        root.removeHandler(_handler)
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(JsonFormatter() if fmt == 'json' else KeyValueFormatter())
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
@@ -0,0 +1,136 @@
+import bisect
+import threading
+
+# Registre des métriques du processus, par nom (et par valeurs d'étiquettes)
+registry = {}
+_registry_lock = threading.Lock()
+
+
+# Prometheus label set rendering: {endpoint="/predict-text/",le="0.1"}
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Cumulative histogram with fixed upper bounds, Prometheus-style
+class Histogram:
+    """Histogramme à bornes fixes : compte les observations par intervalle, plus leur somme."""
+
+    type = 'histogram'
+
+    def __init__(self, name, description, buckets, labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # dernier intervalle : +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Comptes cumulés par borne supérieure, comme dans le format Prometheus."""
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+        return {'buckets': buckets, 'sum': total, 'count': count}
+
+    def samples(self):
+        snapshot = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{_format_labels({**self.labels, 'le': bound})} {count}"
+            for bound, count in snapshot['buckets'].items()
+        ]
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {_format_value(snapshot['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {snapshot['count']}")
+        return lines
+
+
+# Monotonic counter (requests, rows processed, rows dropped...)
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, description, labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self.value)}"]
+
+
+# Value read at exposition time from a callback (queue lengths, cache size...)
+class Gauge:
+    type = 'gauge'
+
+    def __init__(self, name, description, fn, labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.fn = fn
+
+    def samples(self):
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self.fn())}"]
+
+
+def _get_or_create(cls, name, labels, *args):
+    key = (name, tuple(sorted(labels.items()))) if labels else name
+    with _registry_lock:
+        if key not in registry:
+            registry[key] = cls(name, *args, labels=labels)
+        return registry[key]
+
+# Get or create a histogram in the registry (one per set of label values)
+def histogram(name, description, buckets, **labels):
+    return _get_or_create(Histogram, name, labels, description, buckets)
+
+# Get or create a counter in the registry
+def counter(name, description, **labels):
+    return _get_or_create(Counter, name, labels, description)
+
+# Register a gauge whose value is computed by fn() when the metrics are read
+def gauge(name, description, fn, **labels):
+    return _get_or_create(Gauge, name, labels, description, fn)
+
+# Render every registered metric in the Prometheus text exposition format
+def exposition():
+    with _registry_lock:
+        metrics = list(registry.values())
+    families = {}
+    for metric in metrics:
+        families.setdefault(metric.name, []).append(metric)
+    lines = []
+    for name, members in families.items():
+        lines.append(f"# HELP {name} {members[0].description.replace(chr(10), ' ')}")
+        lines.append(f"# TYPE {name} {members[0].type}")
+        for metric in members:
+            lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
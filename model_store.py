@@ -0,0 +1,167 @@
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from scorer import CompiledScorer
+
+# Modèle entraîné (Pipeline TfidfVectorizer + BernoulliNB)
+MODEL_PATH = os.environ.get("MODEL_PATH", "model/bernoulli_model.joblib")
+
+# Dossier des scorers compilés, un sous-dossier par version du modèle
+SCORER_DIR = os.environ.get("SCORER_DIR", "model/bernoulli_scorer")
+
+
+# Raised while no model has been loaded yet (-> 503)
+class ModelNotReadyError(Exception):
+    pass
+
+
+# Hash of a model file, used as its version
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Directory of the scorer compiled from a given model version
+def scorer_path(scorer_dir, version):
+    return os.path.join(scorer_dir, version[:16])
+
+# Compile the joblib pipeline and publish its scorer directory atomically
+def compiler_et_exporter(model_path, path, version):
+    import joblib  # sklearn n'est importé que si l'export de cette version n'existe pas encore
+    scorer = CompiledScorer.from_pipeline(joblib.load(model_path))
+    scorer.config['source_sha256'] = version
+
+    # Écrire dans un dossier temporaire puis le renommer : un autre worker ne lit jamais un export partiel
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(path))
+    try:
+        scorer.save(tmp_dir)
+        os.replace(tmp_dir, path)
+    except OSError:
+        # Un autre worker a publié la même version entre-temps
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return scorer
+
+# Load the compiled scorer of the current model, exporting it first if needed
+def charger_scorer(model_path=MODEL_PATH, scorer_dir=SCORER_DIR, version=None, mmap_mode=None):
+    version = version or file_sha256(model_path)
+    path = scorer_path(scorer_dir, version)
+    if not os.path.isfile(os.path.join(path, 'config.json')):
+        scorer = compiler_et_exporter(model_path, path, version)
+        if mmap_mode is None:
+            return scorer, version
+    return CompiledScorer.load(path, mmap_mode=mmap_mode), version
+
+# Remove the exports of every model version except the given ones
+def supprimer_anciens_exports(scorer_dir, versions_gardees):
+    """Supprime les exports des versions absentes de versions_gardees et renvoie leurs noms.
+
+    Les versions sont comparées par empreinte, jamais par date : l'appelant garde la
+    version en service, la précédente (encore servie par les workers qui n'ont pas
+    rechargé) et celle du fichier modèle (que d'autres workers chargent peut-être).
+    """
+    gardes = {os.path.basename(scorer_path(scorer_dir, version)) for version in versions_gardees if version}
+    supprimes = []
+    for name in sorted(os.listdir(scorer_dir)):
+        path = os.path.join(scorer_dir, name)
+        # Les dossiers '.tmp-' sont des exports en cours d'écriture
+        if name.startswith('.') or name in gardes or not os.path.isdir(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        supprimes.append(name)
+    return supprimes
+
+
+# Holder of the scorer currently used by the API, with hot reload
+class ModelStore:
+    """Garde le scorer courant et sa version, et permet de le remplacer à chaud.
+
+    Les tableaux du scorer sont projetés en mémoire depuis l'export : N workers
+    uvicorn partagent les mêmes pages au lieu de garder chacun une copie. Un
+    rechargement prépare et préchauffe le nouveau scorer à côté de l'ancien,
+    puis remplace la référence en une seule affectation ; les requêtes en cours
+    terminent avec le scorer qu'elles ont déjà récupéré. Les exports des versions
+    plus anciennes que la précédente sont ensuite supprimés du disque.
+
+    Chaque worker uvicorn a son propre ModelStore : un rechargement ne concerne
+    que le processus qui l'effectue.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, scorer_dir=SCORER_DIR, mmap_mode='r'):
+        self.model_path = model_path
+        self.scorer_dir = scorer_dir
+        self.mmap_mode = mmap_mode
+        self.warmup = None  # fonction appelée avec le nouveau scorer avant la bascule
+        self.reloads = 0
+        self._state = None  # (scorer, version), remplacé d'un bloc
+        self._file_stat = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        self.reload(force=True)
+        return self.scorer
+
+    def reload(self, force=False):
+        """Charge la version actuelle du fichier modèle ; renvoie False si elle est déjà en service."""
+        with self._lock:
+            self._file_stat = self._stat()
+            version = file_sha256(self.model_path)
+            if not force and self._state is not None and self._state[1] == version:
+                return False
+            try:
+                scorer, version = charger_scorer(self.model_path, self.scorer_dir, version, self.mmap_mode)
+                if self.warmup is not None:
+                    self.warmup(scorer)
+            except Exception:
+                # La prochaine vérification du fichier réessaiera
+                self._file_stat = None
+                raise
+            precedente = self.version
+            self._state = (scorer, version)
+            self.reloads += 1
+            try:
+                supprimer_anciens_exports(self.scorer_dir, (version, precedente, file_sha256(self.model_path)))
+            except OSError:
+                # Le nouveau modèle est en service : un export non supprimé n'est pas une erreur
+                pass
+            return True
+
+    def has_changed(self):
+        """Le fichier modèle a-t-il été modifié depuis le dernier chargement ?"""
+        try:
+            return self._stat() != self._file_stat
+        except OSError:
+            return False
+
+    def current(self):
+        """Le couple (scorer, version) en service, lu d'un bloc."""
+        state = self._state
+        if state is None:
+            raise ModelNotReadyError("Le modèle n'est pas encore chargé.")
+        return state
+
+    @property
+    def scorer(self):
+        return self.current()[0]
+
+    @property
+    def version(self):
+        return self._state[1] if self._state is not None else None
+
+
+model_store = ModelStore()
+
+
+if __name__ == "__main__":
+    # Étape de build : compiler le scorer à l'avance pour que les workers n'importent pas sklearn
+    _, version = charger_scorer(*sys.argv[1:3])
+    print(f"Scorer compilé pour la version {version[:16]}")
@@ -1,34 +1,101 @@
 import pandas as pd
 import re
-from langdetect import detect, LangDetectException
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
 import numpy as np
+from language import detecter_langues_lot
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+
+# Expressions régulières compilées une seule fois pour tout le module
+URL_PATTERN = re.compile(r'http\\S+')
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^A-Za-z0-9\s]')
+CONSONANT_OR_VOWEL_SEQUENCE_PATTERN = re.compile(r'(?:[bcdfghjklmnpqrstvwxyz]{3,}|[aeiou]{3,})')
+THREE_IDENTICAL_CHARACTERS_PATTERN = re.compile(r'(.)\\1{2,}')
+
+# Colonnes produites par le prétraitement ligne à ligne, dans l'ordre historique
+OUTPUT_COLUMNS = ['cleaned_text', 'text_without_stopwords', 'tokens', 'lemmatized_tokens', 'text_without_short_words']
+
+logger = logging.getLogger(__name__)
+
+# Ressources NLTK livrées avec le projet (voir startup.py), prioritaires sur celles du système
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+os.environ['NLTK_DATA'] = os.pathsep.join(filter(None, [NLTK_DATA_DIR, os.environ.get('NLTK_DATA')]))
+
+# Observateurs des étapes : appelés avec (étape, secondes, lignes en entrée, lignes en sortie)
+stage_observers = []
+
+# Register a stage observer (usable as a decorator)
+def add_stage_observer(observer):
+    stage_observers.append(observer)
+    return observer
+
+def remove_stage_observer(observer):
+    stage_observers.remove(observer)
+
+# Notify the observers that a stage ran
+def notifier_etape(etape, secondes, lignes_entree, lignes_sortie):
+    for observer in stage_observers:
+        observer(etape, secondes, lignes_entree, lignes_sortie)
+
+# Run one DataFrame step, timed and reported to the observers (step name = function name)
+def executer_etape(fn, df, *args):
+    if not stage_observers:
+        return fn(df, *args)
+    # Mesurer avant l'appel : certaines étapes modifient df sur place
+    lignes_entree = len(df)
+    debut = time.perf_counter()
+    resultat = fn(df, *args)
+    notifier_etape(fn.__name__, time.perf_counter() - debut, lignes_entree, len(resultat))
+    return resultat
+
+# NLTK est importé à la première utilisation : son import seul prend plus d'une demi-seconde
+# Load the English stopwords once
+@lru_cache(maxsize=None)
+def get_stop_words():
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+# Build the WordNet lemmatizer once
+@lru_cache(maxsize=None)
+def get_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+# Load the NLTK word tokenizer once
+@lru_cache(maxsize=None)
+def get_word_tokenize():
+    from nltk.tokenize import word_tokenize
+    return word_tokenize
 
 # Function to keep first occurrence of duplicates
 def keep_first_occurrence(df, column_name):
     return df.drop_duplicates(subset=[column_name], keep='first')
 
 # Function to detect languages in a text column with error handling
-def detecter_langues(df, colonne_texte):
-    langues_detectees = []
-
-    # Itérer sur chaque phrase dans la colonne spécifiée
-    for phrase in df[colonne_texte].dropna():
-        try:
-            langue = detect(phrase)  # Détecter la langue de la phrase
-            langues_detectees.append(langue)
-        except:
-            langues_detectees.append('unknown')  # Si la détection échoue, ajouter 'unknown'
+def detecter_langues(df, colonne_texte, langues=None):
+    # Les langues déjà vérifiées par l'API (Series alignée sur l'index de df) ne sont pas recalculées ;
+    # une colonne 'langue_detectee' venue du fichier envoyé est ignorée et recalculée
+    if langues is not None:
+        langues_detectees = [langue if isinstance(langue, str) else None for langue in langues.reindex(df.index)]
+    else:
+        langues_detectees = [None] * len(df)
+
+    # Détecter en un seul lot les phrases dont la langue est inconnue (détection mise en cache)
+    a_detecter = [i for i, langue in enumerate(langues_detectees) if langue is None]
+    phrases = df[colonne_texte].tolist()
+    for i, langue in zip(a_detecter, detecter_langues_lot([phrases[i] for i in a_detecter])):
+        langues_detectees[i] = langue
 
     # Ajouter la colonne des langues détectées au DataFrame
     df['langue_detectee'] = langues_detectees
 
-    # Afficher les langues détectées et le nombre de lignes pour chaque langue
-    langues_comptage = df['langue_detectee'].value_counts()
-    print("Langues détectées et nombre de lignes par langue :")
-    print(langues_comptage)
+    # Journaliser les langues détectées et le nombre de lignes pour chaque langue
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Langues détectées", extra={'langues': df['langue_detectee'].value_counts().to_dict()})
 
     return df
 
@@ -39,30 +106,29 @@ def supprimer_non_anglais(df):
 
 # Clean text function to remove unwanted characters
 def clean_text(text):
-    text = re.sub(r'http\\S+', '', text)  # Remove URLs
-    text = re.sub(r'[^A-Za-z0-9\s]', '', text)  # Remove non-alphanumeric characters
+    text = URL_PATTERN.sub('', text)  # Remove URLs
+    text = NON_ALPHANUMERIC_PATTERN.sub('', text)  # Remove non-alphanumeric characters
     return text.lower()
 
 # Remove stopwords function
 def remove_stopwords(text):
-    stop_words = set(stopwords.words('english'))
-    word_tokens = word_tokenize(text)
+    stop_words = get_stop_words()
+    word_tokens = get_word_tokenize()(text)
     filtered_sentence = [w for w in word_tokens if not w in stop_words]
     return ' '.join(filtered_sentence)
 
 # Tokenize text function
 def tokenize_text(text):
-    return word_tokenize(text)
+    return get_word_tokenize()(text)
 
 # Remove vowel/consonant sequences function
 def remove_consonant_or_vowel_sequences_from_tokens(tokens):
-    pattern = r'(?:[bcdfghjklmnpqrstvwxyz]{3,}|[aeiou]{3,})'
-    filtered_tokens = [token for token in tokens if not re.search(pattern, token)]
+    filtered_tokens = [token for token in tokens if not CONSONANT_OR_VOWEL_SEQUENCE_PATTERN.search(token)]
     return filtered_tokens
 
 # Lemmatize tokens function
 def lemmatize_tokens(tokens):
-    lemmatizer = WordNetLemmatizer()
+    lemmatizer = get_lemmatizer()
     return [lemmatizer.lemmatize(token) for token in tokens]
 
 # Replace empty cells with NaN
@@ -94,47 +160,314 @@ def remove_duplicates_by_column(df, column_name):
 
 # Remove terms with 3 identical characters in a row
 def supprimer_termes_3_caracteres_identiques(tokens):
-    return [token for token in tokens if not re.search(r'(.)\\1{2,}', token)]
-
-# Main function for the cleaning process
-def nettoyage_automatisé(df):
-    # 1. Garder la première occurrence basée sur 'SentenceId'
-    df = keep_first_occurrence(df, 'SentenceId')
+    return [token for token in tokens if not THREE_IDENTICAL_CHARACTERS_PATTERN.search(token)]
+
+# Table token -> (keep?, lemme) précalculée sur le vocabulaire du modèle (voir construire_table_lemmes)
+LEMMA_TABLE_PATH = os.environ.get("LEMMA_TABLE_PATH", "model/lemmes.tsv")
+
+# Lemmatiser avec WordNet les tokens absents de la table (0 : le token est gardé tel quel, WordNet n'est jamais chargé)
+WORDNET_FALLBACK = os.environ.get("WORDNET_FALLBACK", "1") == "1"
+
+# Build the token -> (keep?, lemma) table for a vocabulary (steps 7 and 8)
+def construire_table_lemmes(tokens):
+    lemmatize = get_lemmatizer().lemmatize
+    table = {}
+    for token in tokens:
+        keep = not CONSONANT_OR_VOWEL_SEQUENCE_PATTERN.search(token)
+        table[token] = (keep, lemmatize(token) if keep else '')
+    return table
+
+# Save the lemma table as a TSV file (token, keep, lemma)
+def sauvegarder_table_lemmes(table, chemin=LEMMA_TABLE_PATH):
+    with open(chemin, 'w', encoding='utf-8') as f:
+        for token, (keep, lemma) in sorted(table.items()):
+            f.write(f'{token}\t{int(keep)}\t{lemma}\n')
+
+# Load a lemma table saved by sauvegarder_table_lemmes
+def charger_table_lemmes(chemin=LEMMA_TABLE_PATH):
+    table = {}
+    with open(chemin, encoding='utf-8') as f:
+        for line in f:
+            token, keep, lemma = line.rstrip('\n').split('\t')
+            table[token] = (keep == '1', lemma)
+    return table
+
+
+# Compiled preprocessing engine: steps 4 to 8, 10 and 12 fused in a single pass per row
+class PreprocessingEngine:
+    """Applique le prétraitement ligne à ligne en un seul passage.
+
+    Les ressources NLTK et les expressions régulières ne sont chargées qu'une
+    fois ; la tokenisation est faite une seule fois puisque les tokens sans
+    stopwords sont réutilisés directement au lieu d'être re-tokenisés.
+
+    Les étapes par token (7, 8, 10 et 12) ne sont calculées qu'une fois par
+    token distinct d'un lot, puis reportées sur chaque ligne. Les tokens
+    présents dans la table de lemmes sont résolus sans WordNet.
+    """
+
+    def __init__(self, min_length=2, lemma_table=None, lemma_table_path=None, wordnet_fallback=True,
+                 columns=OUTPUT_COLUMNS):
+        unknown = set(columns) - set(OUTPUT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Colonnes inconnues : {sorted(unknown)}.")
+        self.min_length = min_length
+        self.lemma_table_path = lemma_table_path
+        self.wordnet_fallback = wordnet_fallback
+        self.columns = [name for name in OUTPUT_COLUMNS if name in columns]
+        self._lemma_table = lemma_table
+
+    @property
+    def lemma_table(self):
+        # Chargée à la première utilisation, si le fichier existe
+        if self._lemma_table is None:
+            if self.lemma_table_path and os.path.exists(self.lemma_table_path):
+                self._lemma_table = charger_table_lemmes(self.lemma_table_path)
+            else:
+                self._lemma_table = {}
+        return self._lemma_table
+
+    @property
+    def needs_wordnet(self):
+        return self.wordnet_fallback and 'lemmatized_tokens' in self.columns
+
+    def with_columns(self, columns):
+        """Moteur identique ne produisant que les colonnes demandées (table de lemmes partagée)."""
+        return PreprocessingEngine(self.min_length, self.lemma_table, self.lemma_table_path,
+                                   self.wordnet_fallback, columns)
+
+    def __getstate__(self):
+        # La table est rechargée depuis son fichier dans chaque processus plutôt que copiée à chaque envoi
+        state = self.__dict__.copy()
+        if self.lemma_table_path:
+            state['_lemma_table'] = None
+        return state
+
+    def split(self, phrase):
+        """Étapes 4 à 6 : texte nettoyé, texte sans stopwords et tokens restants."""
+        # 4. Nettoyer le texte
+        cleaned_text = clean_text(phrase)
+
+        # 5-6. Retirer les stopwords puis garder les tokens restants
+        stop_words = get_stop_words()
+        tokens = [token for token in get_word_tokenize()(cleaned_text) if token not in stop_words]
+        return cleaned_text, ' '.join(tokens), tokens
+
+    def token_entry(self, token, lemmatize=True):
+        """Étapes 7, 8, 10 et 12 pour un token : (gardé ?, lemme, lemme gardé ?, assez long ?).
+
+        Avec lemmatize=False (colonne 'lemmatized_tokens' non demandée), le lemme n'est pas calculé.
+        """
+        entry = self.lemma_table.get(token)
+        if entry is None:
+            # 7. Retirer les séquences de consonnes ou voyelles
+            keep = not CONSONANT_OR_VOWEL_SEQUENCE_PATTERN.search(token)
+            if not lemmatize:
+                return keep, '', False, len(token) >= self.min_length
+            # 8. Lemmatiser
+            lemma = (get_lemmatizer().lemmatize(token) if self.wordnet_fallback else token) if keep else ''
+        else:
+            keep, lemma = entry
+        # 12. Termes avec 3 caractères identiques / 10. mots courts
+        return keep, lemma, keep and not THREE_IDENTICAL_CHARACTERS_PATTERN.search(lemma), len(token) >= self.min_length
+
+    def combine(self, split_row, entries):
+        """Assemble les valeurs des colonnes OUTPUT_COLUMNS d'une ligne à partir des entrées de ses tokens."""
+        cleaned_text, text_without_stopwords, tokens = split_row
+        tokens = [token for token in tokens if entries[token][0]]
+        lemmatized_tokens = [entries[token][1] for token in tokens if entries[token][2]]
+        text_without_short_words = [token for token in tokens if entries[token][3]]
+        return cleaned_text, text_without_stopwords, tokens, lemmatized_tokens, text_without_short_words
+
+    def process(self, phrase):
+        """Renvoie les valeurs des colonnes OUTPUT_COLUMNS pour une phrase."""
+        split_row = self.split(phrase)
+        entries = {token: self.token_entry(token) for token in split_row[2]}
+        return self.combine(split_row, entries)
+
+    def transform(self, df, colonne_texte='Phrase'):
+        """Ajoute les colonnes demandées (self.columns) au DataFrame en un seul passage sur les lignes.
+
+        Seules les étapes nécessaires aux colonnes demandées sont exécutées, et chaque
+        colonne est construite puis ajoutée sans garder les autres valeurs intermédiaires.
+        """
+        columns = self.columns
+        if not columns:
+            return df
+        phrases = df[colonne_texte]
+        data = {}
+        debut = time.perf_counter()
+        if columns == ['cleaned_text']:
+            # Ni tokenisation ni stopwords : seulement l'étape 4
+            data['cleaned_text'] = [clean_text(phrase) for phrase in phrases]
+            notifier_etape('clean_text', time.perf_counter() - debut, len(df), len(df))
+        else:
+            split_rows = [self.split(phrase) for phrase in phrases]
+            notifier_etape('split', time.perf_counter() - debut, len(df), len(df))
+            if 'cleaned_text' in columns:
+                data['cleaned_text'] = [split_row[0] for split_row in split_rows]
+            if 'text_without_stopwords' in columns:
+                data['text_without_stopwords'] = [split_row[1] for split_row in split_rows]
+
+            token_columns = [name for name in columns if name in OUTPUT_COLUMNS[2:]]
+            if token_columns:
+                # Chaîne par token calculée une seule fois par token distinct du lot
+                debut = time.perf_counter()
+                vocabulary = set()
+                for _, _, tokens in split_rows:
+                    vocabulary.update(tokens)
+                lemmatize = 'lemmatized_tokens' in columns
+                entries = {token: self.token_entry(token, lemmatize) for token in vocabulary}
+                notifier_etape('token_entries', time.perf_counter() - debut, len(df), len(df))
+
+                debut = time.perf_counter()
+                kept = [[token for token in split_row[2] if entries[token][0]] for split_row in split_rows]
+                del split_rows
+                if 'tokens' in columns:
+                    data['tokens'] = kept
+                if lemmatize:
+                    data['lemmatized_tokens'] = [[entries[token][1] for token in tokens if entries[token][2]] for tokens in kept]
+                if 'text_without_short_words' in columns:
+                    data['text_without_short_words'] = [[token for token in tokens if entries[token][3]] for tokens in kept]
+                notifier_etape('combine', time.perf_counter() - debut, len(df), len(df))
+
+        return df.assign(**{
+            name: pd.Series(data[name], index=df.index)
+            for name in columns
+        })
+
+
+default_engine = PreprocessingEngine(lemma_table_path=LEMMA_TABLE_PATH, wordnet_fallback=WORDNET_FALLBACK)
+
+# Steps 2 to 12: chaque ligne est traitée indépendamment, le DataFrame peut donc être découpé
+def nettoyer_segment(df, engine=None, langues=None):
+    engine = engine or default_engine
 
     # 2. Détecter les langues dans la colonne 'Phrase'
-    df = detecter_langues(df, 'Phrase')
+    df = executer_etape(detecter_langues, df, 'Phrase', langues)
 
     # 3. Supprimer les lignes non anglaises
-    df = supprimer_non_anglais(df)
-
-    # 4. Nettoyer le texte dans la colonne 'Phrase'
-    df['cleaned_text'] = df['Phrase'].apply(clean_text)
-
-    # 5. Retirer les stopwords pour la colonne 'cleaned_text'
-    df['text_without_stopwords'] = df['cleaned_text'].apply(remove_stopwords)
-
-    # 6. Tokeniser le texte dans 'text_without_stopwords'
-    df['tokens'] = df['text_without_stopwords'].apply(tokenize_text)
-
-    # 7. Retirer les séquences de consonnes ou voyelles dans les 'tokens'
-    df['tokens'] = df['tokens'].apply(remove_consonant_or_vowel_sequences_from_tokens)
-
-    # 8. Lemmatiser les 'tokens'
-    df['lemmatized_tokens'] = df['tokens'].apply(lemmatize_tokens)
+    df = executer_etape(supprimer_non_anglais, df)
 
     # 9. Remplacer les cellules vides par des NaN
-    df = replace_empty_with_nan(df, 'Phrase')
+    # (les colonnes calculées ne sont jamais vides : filtrer avant le passage ligne à ligne
+    # garde exactement les mêmes lignes, sans nettoyer celles qui seront supprimées)
+    df = executer_etape(replace_empty_with_nan, df, 'Phrase')
 
     #10. Supprimer les NaN
-    df = remove_nan_rows(df)
-
-    # 10. Retirer les mots courts dans la colonne 'tokens'
-    df['text_without_short_words'] = df['tokens'].apply(lambda tokens: remove_short_words(tokens, min_length=2))
+    df = executer_etape(remove_nan_rows, df)
 
     # 11. Supprimer les doublons par 'PhraseId'
-    df = remove_duplicates_by_column(df, 'PhraseId')
+    df = executer_etape(remove_duplicates_by_column, df, 'PhraseId')
 
-    # 12. Supprimer les termes avec 3 caractères identiques dans 'lemmatized_tokens'
-    df['lemmatized_tokens'] = df['lemmatized_tokens'].apply(lambda tokens: supprimer_termes_3_caracteres_identiques(tokens))
+    # 4-8, 10, 12. Nettoyage, stopwords, tokens, lemmes et mots courts en un seul passage
+    return engine.transform(df, 'Phrase')
 
+# Main function for the cleaning process
+def nettoyage_automatisé(df, engine=None, langues=None):
+    # 1. Garder la première occurrence basée sur 'SentenceId'
+    df = executer_etape(keep_first_occurrence, df, 'SentenceId')
+
+    # 2-12. Langue, lignes vides, doublons 'PhraseId' et passage ligne à ligne
+    return nettoyer_segment(df, engine, langues)
+
+# Parallel cleaning process for large DataFrames
+def nettoyage_parallele(df, n_workers=None, chunk_size=None, executor=None, engine=None):
+    """Nettoie le DataFrame par morceaux sur un pool de processus.
+
+    Le résultat est identique à celui de nettoyage_automatisé : la déduplication
+    par 'SentenceId' est faite avant le découpage, et celle par 'PhraseId' est
+    refaite après la fusion des morceaux (remis dans l'ordre d'origine) pour
+    couvrir les doublons situés de part et d'autre d'une frontière. Avec un
+    executor, n_workers est la taille de ce pool (gardée par l'appelant avec le pool).
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Quelques morceaux par processus pour équilibrer la charge
+        chunk_size = max(1000, math.ceil(len(df) / (n_workers * 4)))
+
+    # 1. Garder la première occurrence basée sur 'SentenceId' (sur tout le fichier)
+    df = executer_etape(keep_first_occurrence, df, 'SentenceId')
+
+    # Avec un pool fourni, même d'un seul processus, le nettoyage se fait hors du processus appelant
+    if (executor is None and n_workers <= 1) or len(df) <= chunk_size:
+        return nettoyer_segment(df, engine)
+
+    chunks = [df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)]
+    # Les étapes exécutées dans les processus sont renvoyées avec chaque morceau et rejouées ici pour les observateurs
+    segment = _nettoyer_segment_observe if stage_observers else nettoyer_segment
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            cleaned_chunks = list(pool.map(segment, chunks, repeat(engine)))
+    else:
+        cleaned_chunks = list(executor.map(segment, chunks, repeat(engine)))
+    if stage_observers:
+        cleaned_chunks = [_rejouer_etapes(*resultat) for resultat in cleaned_chunks]
+
+    # 11. Supprimer les doublons par 'PhraseId' entre les morceaux
+    df = pd.concat(cleaned_chunks)
+    return executer_etape(remove_duplicates_by_column, df, 'PhraseId')
+
+# Clean a segment in a worker process, recording its stage events instead of notifying the worker's observers
+def _nettoyer_segment_observe(df, engine=None):
+    evenements = []
+    observers = stage_observers[:]
+    stage_observers[:] = [lambda *evenement: evenements.append(evenement)]
+    try:
+        return nettoyer_segment(df, engine), evenements
+    finally:
+        stage_observers[:] = observers
+
+def _rejouer_etapes(df, evenements):
+    for evenement in evenements:
+        notifier_etape(*evenement)
     return df
+
+# Drop the rows whose identifier was seen in a previous chunk, then remember the new ones
+def supprimer_identifiants_vus(df, column_name, seen_ids):
+    df = df[~df[column_name].isin(seen_ids)]
+    seen_ids.update(df[column_name])
+    return df
+
+# Cleaning process for a stream of DataFrame chunks (ex. pd.read_csv(..., chunksize=...))
+def nettoyage_par_morceaux(chunks, engine=None, seen_sentence_ids=None, seen_phrase_ids=None, executor=None,
+                           n_workers=None):
+    """Nettoie une suite de morceaux et les renvoie au fur et à mesure (générateur).
+
+    Les identifiants déjà rencontrés sont gardés d'un morceau à l'autre, de sorte que
+    la concaténation des morceaux produits est identique au résultat de
+    nettoyage_automatisé sur le fichier entier. Seuls ces ensembles d'identifiants
+    grandissent avec le fichier, pas les données elles-mêmes.
+
+    Avec un executor (pool de processus de n_workers processus), chaque morceau est
+    lui-même nettoyé en parallèle par nettoyage_parallele.
+    """
+    seen_sentence_ids = set() if seen_sentence_ids is None else seen_sentence_ids
+    seen_phrase_ids = set() if seen_phrase_ids is None else seen_phrase_ids
+
+    for chunk in chunks:
+        # 1. Garder la première occurrence basée sur 'SentenceId', y compris entre les morceaux
+        chunk = executer_etape(keep_first_occurrence, chunk, 'SentenceId')
+        chunk = executer_etape(supprimer_identifiants_vus, chunk, 'SentenceId', seen_sentence_ids)
+
+        # 2-12. Langue, lignes vides, doublons 'PhraseId' et passage ligne à ligne
+        if executor is None:
+            cleaned = nettoyer_segment(chunk, engine)
+        else:
+            cleaned = nettoyage_parallele(chunk, n_workers, executor=executor, engine=engine)
+
+        # 11. Supprimer les doublons par 'PhraseId' déjà vus dans un morceau précédent
+        cleaned = executer_etape(supprimer_identifiants_vus, cleaned, 'PhraseId', seen_phrase_ids)
+
+        yield cleaned
+
+
+if __name__ == "__main__":
+    # python preprocessing.py [chemin de la table] : table de lemmes du vocabulaire du modèle en service
+    import sys
+    from model_store import charger_scorer
+    scorer, _ = charger_scorer()
+    tokens = {token for term in scorer.vocabulary.tolist() for token in term.split(' ')}
+    chemin = sys.argv[1] if len(sys.argv) > 1 else LEMMA_TABLE_PATH
+    sauvegarder_table_lemmes(construire_table_lemmes(tokens), chemin)
+    print(f"Table de {len(tokens)} lemmes sauvegardée sous : {chemin}")
@@ -0,0 +1,206 @@
+import json
+import os
+import re
+import sys
+import unicodedata
+from itertools import repeat
+import numpy as np
+
+
+# Accent stripping identical to sklearn's strip_accents='unicode' / 'ascii'
+def strip_accents_unicode(text):
+    normalized = unicodedata.normalize('NFKD', text)
+    if normalized == text:
+        return text
+    return ''.join(c for c in normalized if not unicodedata.combining(c))
+
+
+def strip_accents_ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII')
+
+
+# Index of a term in a HashingVectorizer output, as computed by sklearn's _hashing_fast
+def hashed_index(murmurhash3_32, term, n_features):
+    h = murmurhash3_32(term, 0)
+    if h == -2147483648:
+        return (2147483647 - (n_features - 1)) % n_features
+    return abs(h) % n_features
+
+
+# Compiled array-backed version of a Pipeline(TfidfVectorizer, BernoulliNB)
+class CompiledScorer:
+    """Scorer compilé à partir d'un pipeline TfidfVectorizer + BernoulliNB entraîné.
+
+    BernoulliNB (binarize=0.0) ne regarde que la présence de chaque terme : le
+    poids TF-IDF n'a aucune influence sur la prédiction. Le score d'une classe
+    est donc une constante plus la somme d'un delta par terme présent, ce qui se
+    calcule avec une recherche dans le vocabulaire trié et une somme indexée.
+
+    Un pipeline HashingVectorizer + BernoulliNB (entraînement par morceaux, voir
+    training.py) est compilé de la même façon : le delta est indexé par le hash
+    du terme au lieu de sa position dans le vocabulaire.
+    """
+
+    def __init__(self, vocabulary, delta, base, classes, config):
+        self.vocabulary = vocabulary  # termes triés (tableau unicode)
+        self.delta = delta            # (n_termes, n_classes) : log P(présent) - log P(absent)
+        self.base = base              # (n_classes,) : log prior + somme des log P(absent)
+        self.classes = classes
+        self.config = config
+        self._max_term_length = vocabulary.dtype.itemsize // np.dtype('U1').itemsize
+        self._token_pattern = re.compile(config['token_pattern'])
+        self._stop_words = frozenset(config['stop_words']) if config['stop_words'] is not None else None
+        self._strip_accents = {
+            None: None,
+            'unicode': strip_accents_unicode,
+            'ascii': strip_accents_ascii,
+        }[config['strip_accents']]
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        vectorizer = pipeline.steps[0][1]
+        classifier = pipeline.steps[-1][1]
+        hashing = hasattr(vectorizer, 'n_features')  # HashingVectorizer : pas de vocabulaire
+
+        if vectorizer.analyzer != 'word' or vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+            raise ValueError("Seul l'analyseur 'word' par défaut de TfidfVectorizer peut être compilé.")
+        if vectorizer.strip_accents not in (None, 'unicode', 'ascii'):
+            raise ValueError(f"strip_accents={vectorizer.strip_accents!r} n'est pas pris en charge.")
+        if getattr(classifier, 'binarize', None) != 0.0:
+            raise ValueError("Le classifieur doit être un BernoulliNB avec binarize=0.0.")
+        if hashing and vectorizer.alternate_sign:
+            # Avec des signes alternés, un terme peut donner une valeur négative, donc « absente » pour BernoulliNB
+            raise ValueError("Le HashingVectorizer doit être créé avec alternate_sign=False.")
+
+        # Décomposition de BernoulliNB._joint_log_likelihood
+        feature_log_prob = classifier.feature_log_prob_
+        neg_prob = np.log(1 - np.exp(feature_log_prob))
+        delta = (feature_log_prob - neg_prob).T
+        base = classifier.class_log_prior_ + neg_prob.sum(axis=1)
+
+        stop_words = vectorizer.get_stop_words()
+        config = {
+            'lowercase': bool(vectorizer.lowercase),
+            'token_pattern': vectorizer.token_pattern,
+            'ngram_range': list(vectorizer.ngram_range),
+            'strip_accents': vectorizer.strip_accents,
+            'stop_words': sorted(stop_words) if stop_words is not None else None,
+        }
+        if hashing:
+            config['n_features'] = vectorizer.n_features
+            return cls(np.array([], dtype='U1'), np.ascontiguousarray(delta), base, classifier.classes_, config)
+
+        # Vocabulaire trié pour la recherche dichotomique
+        terms = np.asarray(vectorizer.get_feature_names_out(), dtype=str)
+        order = np.argsort(terms)
+        return cls(terms[order], np.ascontiguousarray(delta[order]), base, classifier.classes_, config)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'vocabulary.npy'), self.vocabulary)
+        np.save(os.path.join(path, 'delta.npy'), self.delta)
+        np.save(os.path.join(path, 'base.npy'), self.base)
+        np.save(os.path.join(path, 'classes.npy'), self.classes)
+        with open(os.path.join(path, 'config.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.config, f)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Charge un scorer exporté ; avec mmap_mode='r' les tableaux sont projetés en mémoire
+        et partagés (cache de pages du système) par tous les processus qui les ouvrent."""
+        with open(os.path.join(path, 'config.json'), encoding='utf-8') as f:
+            config = json.load(f)
+        # np.asarray : vue ndarray sur la même projection, sans le surcoût de la sous-classe memmap
+        return cls(
+            np.asarray(np.load(os.path.join(path, 'vocabulary.npy'), mmap_mode=mmap_mode)),
+            np.asarray(np.load(os.path.join(path, 'delta.npy'), mmap_mode=mmap_mode)),
+            np.load(os.path.join(path, 'base.npy')),
+            np.load(os.path.join(path, 'classes.npy')),
+            config,
+        )
+
+    def analyze(self, text):
+        """Reproduit l'analyseur 'word' de TfidfVectorizer."""
+        if self.config['lowercase']:
+            text = text.lower()
+        if self._strip_accents is not None:
+            text = self._strip_accents(text)
+        tokens = self._token_pattern.findall(text)
+        if self._stop_words is not None:
+            tokens = [token for token in tokens if token not in self._stop_words]
+
+        min_n, max_n = self.config['ngram_range']
+        if max_n == 1:
+            return tokens
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            terms.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def decision_function(self, texts):
+        """Log-vraisemblance jointe (n_textes, n_classes), comme BernoulliNB."""
+        if self.config.get('n_features'):
+            n_texts, docs, features = self._hashed_features(texts)
+        else:
+            n_texts, docs, features = self._vocabulary_features(texts)
+
+        scores = np.tile(self.base, (n_texts, 1))
+        if not len(features):
+            return scores
+        contributions = self.delta[features]
+        for class_index in range(scores.shape[1]):
+            scores[:, class_index] += np.bincount(docs, weights=contributions[:, class_index], minlength=n_texts)
+        return scores
+
+    def _vocabulary_features(self, texts):
+        """(nombre de textes, document, position dans le vocabulaire) de chaque terme connu présent."""
+        doc_ids = []
+        terms = []
+        n_texts = 0
+        for doc_id, text in enumerate(texts):
+            # Les termes plus longs que le plus long terme du vocabulaire ne peuvent pas y être
+            doc_terms = {term for term in self.analyze(text) if len(term) <= self._max_term_length}
+            terms.extend(doc_terms)
+            doc_ids.extend(repeat(doc_id, len(doc_terms)))
+            n_texts = doc_id + 1
+
+        if not terms:
+            return n_texts, np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+
+        terms = np.array(terms, dtype=self.vocabulary.dtype)
+        positions = np.searchsorted(self.vocabulary, terms)
+        positions[positions == len(self.vocabulary)] = 0
+        found = self.vocabulary[positions] == terms
+        return n_texts, np.asarray(doc_ids)[found], positions[found]
+
+    def _hashed_features(self, texts):
+        """Comme _vocabulary_features pour un modèle haché : chaque indice de hash compte une fois par document."""
+        # Fonction de hash de sklearn, importée seulement pour les modèles hachés
+        from sklearn.utils.murmurhash import murmurhash3_32
+        n_features = self.config['n_features']
+        doc_ids = []
+        features = []
+        n_texts = 0
+        for doc_id, text in enumerate(texts):
+            doc_features = {hashed_index(murmurhash3_32, term, n_features) for term in self.analyze(text)}
+            features.extend(doc_features)
+            doc_ids.extend(repeat(doc_id, len(doc_features)))
+            n_texts = doc_id + 1
+        return n_texts, np.asarray(doc_ids, dtype=np.intp), np.asarray(features, dtype=np.intp)
+
+    def predict(self, texts):
+        return self.classes[np.argmax(self.decision_function(texts), axis=1)]
+
+
+# Export the fitted joblib pipeline as a compiled scorer directory
+def export_scorer(model_path, scorer_dir):
+    import joblib
+    scorer = CompiledScorer.from_pipeline(joblib.load(model_path))
+    scorer.save(scorer_dir)
+    print(f'Scorer compilé sauvegardé sous : {scorer_dir}')
+    return scorer
+
+
+if __name__ == "__main__":
+    # python scorer.py model/bernoulli_model.joblib dossier_de_sortie
+    export_scorer(sys.argv[1], sys.argv[2])
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from preprocessing import NLTK_DATA_DIR, default_engine
+
+logger = logging.getLogger(__name__)
+
+# Ressources NLTK utilisées par le prétraitement, avec leur chemin dans nltk_data
+NLTK_RESOURCES = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+}
+
+# Autoriser le téléchargement des ressources manquantes (désactivé : les serveurs n'ont pas accès au réseau)
+NLTK_ALLOW_DOWNLOAD = os.environ.get("NLTK_ALLOW_DOWNLOAD", "0") == "1"
+
+
+# Raised by request handlers while the service is still warming up (-> 503)
+class ServiceNotReadyError(Exception):
+    pass
+
+
+# Make sure the bundled nltk_data directory is searched first
+def configurer_nltk():
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk
+
+# NLTK resources actually needed (WordNet is not, when the lemma table replaces it)
+def ressources_nltk_requises():
+    return [nom for nom in NLTK_RESOURCES if nom != 'wordnet' or default_engine.needs_wordnet]
+
+# List the NLTK resources that cannot be found locally
+def ressources_nltk_manquantes():
+    nltk = configurer_nltk()
+    manquantes = []
+    for nom in ressources_nltk_requises():
+        chemin = NLTK_RESOURCES[nom]
+        try:
+            nltk.data.find(chemin)
+        except LookupError:
+            manquantes.append(nom)
+    return manquantes
+
+# Check the local NLTK resources, downloading them only if explicitly allowed
+def verifier_ressources_nltk(allow_download=NLTK_ALLOW_DOWNLOAD):
+    manquantes = ressources_nltk_manquantes()
+    if manquantes and allow_download:
+        telecharger_ressources_nltk(manquantes)
+        manquantes = ressources_nltk_manquantes()
+    if manquantes:
+        raise RuntimeError(
+            f"Ressources NLTK introuvables : {', '.join(manquantes)}. "
+            f"Les installer au build avec 'python startup.py' (dossier {NLTK_DATA_DIR})."
+        )
+
+# Download NLTK resources into the bundled directory (build step, needs network)
+def telecharger_ressources_nltk(ressources=tuple(NLTK_RESOURCES)):
+    nltk = configurer_nltk()
+    for nom in ressources:
+        nltk.download(nom, download_dir=NLTK_DATA_DIR, quiet=True)
+
+
+# Readiness state of the service
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.error = None
+        self.started_at = time.monotonic()
+        self.startup_seconds = None
+
+    def check(self):
+        if not self.ready:
+            raise ServiceNotReadyError(self.error or "Le service démarre, réessayez dans un instant.")
+
+    async def demarrer(self, *etapes):
+        """Exécute les étapes de démarrage (fonctions synchrones) hors de la boucle, puis marque le service prêt."""
+        try:
+            for etape in etapes:
+                await asyncio.to_thread(etape)
+        except Exception as e:
+            self.error = f"Échec du démarrage : {e}"
+            logger.exception("Échec du démarrage")
+            return
+        self.startup_seconds = time.monotonic() - self.started_at
+        self.ready = True
+        logger.info("Service prêt", extra={'startup_seconds': round(self.startup_seconds, 3)})
+
+
+readiness = Readiness()
+
+
+if __name__ == "__main__":
+    # Étape de build : python startup.py [ressource ...]
+    telecharger_ressources_nltk(sys.argv[1:] or tuple(NLTK_RESOURCES))
+    print(f"Ressources NLTK installées dans {NLTK_DATA_DIR}")
@@ -0,0 +1,123 @@
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+import api
+
+
+# Client sans lifespan : le modèle n'est jamais chargé, le service reste en démarrage
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api.readiness, 'ready', False)
+    return TestClient(api.app)
+
+
+def test_healthz_answers_before_startup(client):
+    response = client.get('/healthz')
+    assert response.status_code == 200
+    assert response.json() == {'status': 'ok'}
+
+
+def test_readyz_is_503_before_warmup(client):
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '1'
+
+
+def test_prediction_endpoints_are_503_before_warmup(client):
+    tsv = "PhraseId\tSentenceId\tPhrase\n1\t1\tA great movie\n"
+    response = client.post('/predict-sentiment/', files={'file': ('avis.tsv', tsv)})
+    assert response.status_code == 503
+    response = client.post('/predict-from-cleaned/', json={'cleaned_data': [{'cleaned_text': 'great movie'}]})
+    assert response.status_code == 503
+
+
+def test_model_not_ready_is_not_turned_into_500(client, monkeypatch):
+    # Même si la vérification de démarrage est passée, un modèle absent reste un 503
+    monkeypatch.setattr(api.readiness, 'ready', True)
+    monkeypatch.setattr(api.model_store, '_state', None)
+    response = client.post('/predict-from-cleaned/', json={'cleaned_data': [{'cleaned_text': 'great movie'}]})
+    assert response.status_code == 503
+
+
+def test_unknown_output_format_is_406(client, monkeypatch):
+    monkeypatch.setattr(api.readiness, 'ready', True)
+    tsv = "PhraseId\tSentenceId\tPhrase\n1\t1\tA great movie\n"
+    response = client.post('/predict-sentiment/?format=xml', files={'file': ('avis.tsv', tsv)})
+    assert response.status_code == 406
+
+
+def test_cleaning_pool_is_created_at_startup_without_fork(monkeypatch):
+    # Pas de pool à l'import : il est créé par le lifespan, avec forkserver
+    assert api.cleaning_pool is None
+    monkeypatch.setattr(api, 'CLEANING_WORKERS', 1)
+    pool = api.creer_pool_nettoyage()
+    try:
+        assert pool.submit(os.getpid).result(timeout=60) != os.getpid()
+    finally:
+        pool.shutdown()
+    monkeypatch.setattr(api, 'CLEANING_WORKERS', 0)
+    assert api.creer_pool_nettoyage() is None
+
+
+# Flux WebSocket avec un lot factice : majuscules, erreur pour les commentaires 'boom'
+@pytest.fixture
+def stream_client(monkeypatch):
+    def process_batch(textes):
+        if 'boom' in textes:
+            raise ValueError("lot invalide")
+        return [text.upper() for text in textes]
+
+    monkeypatch.setattr(api.readiness, 'ready', True)
+    monkeypatch.setattr(api.stream_batcher, 'process_batch', process_batch)
+    return TestClient(api.app)
+
+
+def test_websocket_stream_answers_in_order(stream_client):
+    textes = [f'comment {i}' for i in range(50)]
+    with stream_client.websocket_connect('/ws/predict-text') as websocket:
+        for text in textes:
+            websocket.send_text(text)
+        assert [websocket.receive_json() for _ in textes] == [text.upper() for text in textes]
+    assert api.connexions_flux == 0
+
+
+def test_websocket_stream_reports_errors_per_comment(stream_client):
+    # Les trois commentaires partagent un lot : seule l'erreur du commentaire fautif est renvoyée
+    with stream_client.websocket_connect('/ws/predict-text') as websocket:
+        for text in ('avant', 'boom', 'après'):
+            websocket.send_text(text)
+        assert websocket.receive_json() == 'AVANT'
+        assert websocket.receive_json() == {'error': 'lot invalide'}
+        assert websocket.receive_json() == 'APRÈS'
+
+
+def test_websocket_stream_closes_before_ready(client):
+    with client.websocket_connect('/ws/predict-text') as websocket:
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            websocket.receive_text()
+    assert excinfo.value.code == 1013
+
+
+def test_websocket_stream_rejects_binary_messages(stream_client):
+    with stream_client.websocket_connect('/ws/predict-text') as websocket:
+        websocket.send_text('texte')
+        websocket.send_bytes(b'\x00\x01')
+        assert websocket.receive_json() == 'TEXTE'
+        with pytest.raises(WebSocketDisconnect) as excinfo:
+            websocket.receive_text()
+    assert excinfo.value.code == 1003
+
+
+def test_websocket_stream_client_disconnect(stream_client, monkeypatch):
+    def slow_batch(textes):
+        time.sleep(0.01)
+        return textes
+
+    monkeypatch.setattr(api.stream_batcher, 'process_batch', slow_batch)
+    with stream_client.websocket_connect('/ws/predict-text') as websocket:
+        for i in range(20):
+            websocket.send_text(f'comment {i}')
+    # Le client part sans lire les réponses : le flux se termine sans erreur
+    assert api.connexions_flux == 0
@@ -0,0 +1,88 @@
+import io
+import threading
+import pandas as pd
+import pytest
+from batch import traiter_fichier
+from jobs import JobLeaseLostError, JobStore
+from preprocessing import nettoyage_automatisé
+
+DF = pd.DataFrame({
+    'PhraseId': [1, 2, 3, 1, 4, 2, 5],
+    'SentenceId': [1, 1, 2, 3, 2, 4, 5],
+    'Phrase': ['This movie was a wonderful surprise', 'The acting was terrible and boring',
+               'I really loved the soundtrack', 'What a waste of two hours',
+               'The plot was clever and funny', 'The ending was far too long',
+               'A great cast and a moving story'],
+})
+
+
+def garder_texte(df_cleaned):
+    return df_cleaned[['PhraseId', 'cleaned_text']]
+
+
+def test_traiter_fichier_matches_full_cleaning(tmp_path):
+    entree, sortie = tmp_path / 'in.tsv', tmp_path / 'out.tsv'
+    DF.to_csv(entree, sep='\t', index=False)
+    etat = traiter_fichier(str(entree), str(sortie), garder_texte, chunksize=2)
+    assert etat['done'] and etat['chunks_done'] == 4 and etat['rows_in'] == len(DF)
+    expected = garder_texte(nettoyage_automatisé(DF.copy())).to_csv(sep='\t', index=False)
+    assert sortie.read_text(encoding='utf-8') == expected
+    assert etat['rows_out'] == len(expected.splitlines()) - 1
+
+
+def test_traiter_fichier_resumes_after_interruption(tmp_path):
+    entree, sortie = tmp_path / 'in.tsv', tmp_path / 'out.tsv'
+    DF.to_csv(entree, sep='\t', index=False)
+    expected = garder_texte(nettoyage_automatisé(DF.copy())).to_csv(sep='\t', index=False)
+
+    # Arrêt après deux morceaux, puis un morceau à moitié écrit avant le « crash »
+    stop = threading.Event()
+    checkpoints = []
+
+    def checkpoint(etat):
+        checkpoints.append(etat)
+        if etat['chunks_done'] == 2:
+            stop.set()
+
+    etat = traiter_fichier(str(entree), str(sortie), garder_texte, chunksize=2, checkpoint=checkpoint, stop=stop)
+    assert not etat['done'] and etat['chunks_done'] == 2
+    with open(sortie, 'a', encoding='utf-8') as f:
+        f.write('99\tligne incomplète')
+
+    etat = traiter_fichier(str(entree), str(sortie), garder_texte, chunksize=2, etat=checkpoints[-1])
+    assert etat['done'] and etat['rows_in'] == len(DF)
+    assert sortie.read_text(encoding='utf-8') == expected
+
+
+def test_traiter_fichier_writes_nothing_after_losing_the_lease(tmp_path):
+    entree, sortie = tmp_path / 'in.tsv', tmp_path / 'out.tsv'
+    DF.to_csv(entree, sep='\t', index=False)
+    store = JobStore(str(tmp_path / 'jobs.db'), str(tmp_path / 'jobs'))
+    job_id = store.create(io.BytesIO(b'x'))
+    owner = store.claim()['owner']
+    checkpoints = []
+
+    def traiter(df_cleaned):
+        # Pendant le deuxième morceau, le bail expire et un autre worker reprend le job
+        if len(checkpoints) == 1:
+            store.requeue_interrupted(lease=0)
+            store.claim()
+        return garder_texte(df_cleaned)
+
+    with pytest.raises(JobLeaseLostError):
+        traiter_fichier(str(entree), str(sortie), traiter, chunksize=2,
+                        checkpoint=lambda etat: checkpoints.append(etat) or store.save_progress(job_id, etat, owner),
+                        avant_ecriture=lambda: store.heartbeat(job_id, owner))
+    assert len(checkpoints) == 1
+    assert sortie.stat().st_size == checkpoints[0]['output_bytes']
+
+
+def test_traiter_fichier_with_process_pool(tmp_path):
+    from concurrent.futures import ProcessPoolExecutor
+    entree, sortie = tmp_path / 'in.tsv', tmp_path / 'out.tsv'
+    pd.concat([DF] * 400, ignore_index=True).assign(PhraseId=lambda df: df.index, SentenceId=lambda df: df.index // 2) \
+        .to_csv(entree, sep='\t', index=False)
+    expected = garder_texte(nettoyage_automatisé(pd.read_csv(entree, sep='\t'))).to_csv(sep='\t', index=False)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        traiter_fichier(str(entree), str(sortie), garder_texte, chunksize=1500, executor=executor)
+    assert sortie.read_text(encoding='utf-8') == expected
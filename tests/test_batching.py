@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from batching import MicroBatcher, traiter_en_flux
+from metrics import Histogram
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    batches = []
+
+    def process_batch(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait_ms=50, name='test_groups')
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit(i) for i in range(10)])
+
+    assert asyncio.run(main()) == [i * 2 for i in range(10)]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert batcher.stats()['batch_size']['count'] == 3
+
+
+def test_micro_batcher_propagates_errors():
+    def process_batch(items):
+        raise ValueError("lot invalide")
+
+    batcher = MicroBatcher(process_batch, max_batch_size=2, max_wait_ms=1, name='test_errors')
+
+    async def main():
+        return await batcher.submit('texte')
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_micro_batcher_isolates_failing_item():
+    batches = []
+
+    def process_batch(items):
+        batches.append(list(items))
+        if 'boom' in items:
+            raise ValueError("texte invalide")
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher(process_batch, max_batch_size=8, max_wait_ms=50, name='test_isolation')
+
+    async def main():
+        return await asyncio.gather(*[batcher.submit(item) for item in ('a', 'boom', 'b')], return_exceptions=True)
+
+    first, failed, last = asyncio.run(main())
+    assert (first, last) == ('A', 'B')
+    assert isinstance(failed, ValueError)
+    # Un seul lot concurrent, puis chaque élément relancé seul
+    assert batches[0] == ['a', 'boom', 'b']
+    assert sorted(batches[1:]) == [['a'], ['b'], ['boom']]
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram('test', 'histogramme de test', buckets=(1, 5))
+    for value in (0.5, 3, 10):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot['buckets'] == {'1': 1, '5': 2, '+Inf': 3}
+    assert snapshot['count'] == 3
+    assert snapshot['sum'] == 13.5
+
+
+def test_traiter_en_flux_keeps_order_and_bounds_inflight():
+    inflight, max_inflight = [0], [0]
+
+    async def submit(item):
+        inflight[0] += 1
+        max_inflight[0] = max(max_inflight[0], inflight[0])
+        # Les derniers éléments soumis finissent les premiers
+        await asyncio.sleep(0.001 * (item % 3))
+        inflight[0] -= 1
+        if item == 5:
+            raise ValueError("élément invalide")
+        return item * 2
+
+    async def items():
+        for item in range(20):
+            yield item
+
+    async def main():
+        return [(resultat, erreur) async for resultat, erreur in traiter_en_flux(items(), submit, max_inflight=4)]
+
+    resultats = asyncio.run(main())
+    assert [resultat for resultat, _ in resultats] == [None if i == 5 else i * 2 for i in range(20)]
+    assert isinstance(resultats[5][1], ValueError)
+    assert 1 < max_inflight[0] <= 4
@@ -0,0 +1,34 @@
+from benchmarks.corpus import generer_corpus
+from benchmarks.run import comparer, percentiles
+
+
+def test_generer_corpus_is_deterministic():
+    corpus = generer_corpus(500)
+    assert len(corpus) == 500
+    assert corpus.equals(generer_corpus(500))
+    assert not corpus.equals(generer_corpus(500, seed=1))
+    # Chaque filtre du prétraitement a des lignes à retirer
+    assert corpus['SentenceId'].duplicated().any()
+    assert corpus['PhraseId'].duplicated().any()
+    assert (corpus['Phrase'] == '').any()
+
+
+def test_comparer_flags_regressions_beyond_threshold():
+    reference = {
+        'a/1000': {'seconds': 1.0, 'peak_mb': 10.0},
+        'b/1000': {'seconds': 1.0, 'p95_ms': 5.0},
+        'c/1': {'seconds': 0.0001},
+    }
+    resultats = {
+        'a/1000': {'seconds': 1.2, 'peak_mb': 20.0},
+        'b/1000': {'seconds': 2.0, 'p95_ms': 5.5},
+        'c/1': {'seconds': 0.001},     # sous la durée minimale : bruit, pas comparé
+        'd/1000': {'seconds': 9.0},    # absent de la référence
+    }
+    regressions = comparer(resultats, reference, seuil=0.25)
+    assert [(nom, mesure) for nom, mesure, *_ in regressions] == [('a/1000', 'peak_mb'), ('b/1000', 'seconds')]
+
+
+def test_percentiles():
+    latences = percentiles([i / 1000 for i in range(1, 101)])
+    assert round(latences['p50_ms']) == 51 and round(latences['p95_ms']) == 96
@@ -0,0 +1,83 @@
+import time
+import numpy as np
+from cache import PredictionCache
+
+
+class FakeScorer:
+    classes = np.array([0, 1, 3, 4])
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, texts):
+        texts = list(texts)
+        self.calls.append(texts)
+        return np.array([3 if 'great' in text else 1 for text in texts])
+
+
+def test_prediction_cache_reuses_predictions():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    scorer = FakeScorer()
+    first = cache.predict(['great movie', 'bad movie', 'great movie'], scorer, 'v1')
+    second = cache.predict(['bad movie', 'great movie'], scorer, 'v1')
+    assert list(first) == [3, 1, 3]
+    assert list(second) == [1, 3]
+    assert scorer.calls == [['great movie', 'bad movie']]  # chaque texte calculé une seule fois
+    assert cache.stats()['hits'] == 2
+
+
+def test_prediction_cache_evicts_by_size_and_ttl():
+    cache = PredictionCache(maxsize=1, ttl=60)
+    scorer = FakeScorer()
+    cache.predict(['great movie', 'bad movie'], scorer, 'v1')
+    assert cache.stats()['size'] == 1
+    assert cache.stats()['evictions'] == 1
+
+    cache = PredictionCache(maxsize=10, ttl=0.01)
+    cache.predict(['great movie'], scorer, 'v1')
+    time.sleep(0.02)
+    cache.predict(['great movie'], scorer, 'v1')
+    assert cache.stats()['hits'] == 0
+
+
+def test_prediction_cache_invalidated_by_new_model_version():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    scorer = FakeScorer()
+    cache.predict(['great movie'], scorer, 'v1')
+    cache.predict(['great movie'], scorer, 'v2')
+    assert len(scorer.calls) == 2
+    assert cache.stats()['model_version'] == 'v2'
+
+
+def test_prediction_cache_bypassed_for_retired_model():
+    cache = PredictionCache(maxsize=10, ttl=60)
+    cache.current_version = lambda: 'v2'
+    scorer = FakeScorer()
+    cache.predict(['great movie'], scorer, 'v1')
+    assert cache.stats()['size'] == 0
+
+
+def test_prediction_cache_shared_through_sqlite(tmp_path):
+    path = str(tmp_path / 'predictions.db')
+    scorer = FakeScorer()
+    worker = PredictionCache(maxsize=10, ttl=60, sqlite_path=path)
+    worker.predict(['great movie'], scorer, 'v1')
+    worker.store.flush()
+    other_worker = PredictionCache(maxsize=10, ttl=60, sqlite_path=path)
+    assert list(other_worker.predict(['great movie'], scorer, 'v1')) == [3]
+    assert len(scorer.calls) == 1
+    assert other_worker.stats()['disk_hits'] == 1
+
+
+def test_prediction_cache_keeps_other_versions_during_rolling_reload(tmp_path):
+    # Un worker passé au nouveau modèle, puis un worker encore sur l'ancien : aucun n'efface les entrées de l'autre
+    path = str(tmp_path / 'predictions.db')
+    scorer = FakeScorer()
+    for version, text in (('v2', 'great movie'), ('v1', 'bad movie')):
+        worker = PredictionCache(maxsize=10, ttl=60, sqlite_path=path)
+        worker.predict([text], scorer, version)
+        worker.close()
+    for version, text in (('v2', 'great movie'), ('v1', 'bad movie')):
+        worker = PredictionCache(maxsize=10, ttl=60, sqlite_path=path)
+        worker.predict([text], scorer, version)
+        assert worker.stats()['disk_hits'] == 1
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import pytest
+from execution import WorkerLane, QueueFullError, PoolUnavailableError
+
+
+def test_worker_lane_runs_off_event_loop():
+    lane = WorkerLane('test_run', max_workers=1, max_queue=1)
+
+    async def main():
+        return await lane.run(lambda: threading.current_thread().name)
+
+    assert asyncio.run(main()).startswith('test_run-worker')
+    assert lane.stats()['queue_wait_seconds']['count'] == 1
+    lane.shutdown()
+
+
+def test_worker_lane_rejects_when_queue_is_full():
+    lane = WorkerLane('test_full', max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def main():
+        blocked = [asyncio.ensure_future(lane.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError):
+            await lane.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+        # Les places sont libérées une fois les tâches terminées
+        return await lane.run(lambda: 'ok')
+
+    assert asyncio.run(main()) == 'ok'
+    assert lane.stats()['rejected'] == 1
+    lane.shutdown()
+
+
+def test_worker_lane_unavailable_after_shutdown():
+    lane = WorkerLane('test_shutdown', max_workers=1, max_queue=1)
+    lane.shutdown()
+
+    async def main():
+        await lane.run(lambda: 'ok')
+
+    with pytest.raises(PoolUnavailableError):
+        asyncio.run(main())
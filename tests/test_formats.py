@@ -0,0 +1,65 @@
+import io
+import json
+import pandas as pd
+import pytest
+from formats import (format_entree, format_sortie, lire_tableau, lire_par_morceaux, ecrire_tableau, FormatNonSupporte,
+                     FormatSortieNonSupporte)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'PhraseId': [1, 2, 3],
+        'SentenceId': [1, 1, 2],
+        'Phrase': ['A great movie', 'great', 'Bad acting'],
+        'tokens': [['great', 'movie'], ['great'], ['bad', 'acting']],
+    })
+
+
+def test_format_negotiation():
+    assert format_entree('application/x-ndjson', 'a.bin') == 'ndjson'
+    assert format_entree('application/octet-stream', 'data.parquet') == 'parquet'
+    assert format_entree(None, None) == 'tsv'
+    assert format_sortie('arrow', 'text/tsv') == 'arrow'
+    assert format_sortie(None, 'text/html, application/vnd.apache.parquet;q=0.9') == 'parquet'
+    assert format_sortie(None, '*/*') == 'tsv'
+    assert format_sortie(None, '*/*', defaut=None) is None
+    with pytest.raises(FormatSortieNonSupporte):
+        format_sortie('xml')
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'parquet', 'arrow'])
+def test_round_trip(df, fmt):
+    if fmt in ('parquet', 'arrow'):
+        pytest.importorskip('pyarrow')
+    content = ecrire_tableau(df, fmt)
+    content = content.encode('utf-8') if isinstance(content, str) else content
+    result = lire_tableau(content, fmt)
+    assert result[['PhraseId', 'SentenceId', 'Phrase']].equals(df[['PhraseId', 'SentenceId', 'Phrase']])
+    assert [list(tokens) for tokens in result['tokens']] == df['tokens'].tolist()
+
+    chunks = list(lire_par_morceaux(io.BytesIO(content), fmt, chunksize=2))
+    assert sum(len(chunk) for chunk in chunks) == len(df)
+
+
+def test_ndjson_phrases_stay_text():
+    content = b'{"PhraseId": 1, "Phrase": "123"}\n{"PhraseId": 2, "Phrase": "2020-01-01"}\n'
+    for result in (lire_tableau(content, 'ndjson'), next(lire_par_morceaux(io.BytesIO(content), 'ndjson'))):
+        assert result['Phrase'].tolist() == ['123', '2020-01-01']
+        assert result['PhraseId'].tolist() == [1, 2]
+
+
+def test_tsv_read_from_bytes(df):
+    content = ecrire_tableau(df[['PhraseId', 'SentenceId', 'Phrase']]).encode('utf-8')
+    assert lire_tableau(content, 'tsv').equals(df[['PhraseId', 'SentenceId', 'Phrase']])
+    # En streaming, seul le premier morceau porte l'en-tête
+    assert ecrire_tableau(df[['Phrase']], header=False) == 'A great movie\ngreat\nBad acting\n'
+
+
+def test_json_layouts(df):
+    records = json.loads(ecrire_tableau(df, 'json'))
+    assert records[0] == {'PhraseId': 1, 'SentenceId': 1, 'Phrase': 'A great movie', 'tokens': ['great', 'movie']}
+    columns = json.loads(ecrire_tableau(df, 'json', layout='columns'))
+    assert columns == {name: df[name].tolist() for name in df.columns}
+    with pytest.raises(FormatNonSupporte):
+        ecrire_tableau(df, 'json', layout='rows')
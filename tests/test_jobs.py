@@ -0,0 +1,62 @@
+import io
+import time
+import pytest
+from jobs import JobStore, JobLeaseLostError, QUEUED, RUNNING, DONE
+
+
+def test_job_store_claim_progress_and_requeue(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'), str(tmp_path / 'jobs'))
+    job_id = store.create(io.BytesIO(b'PhraseId\tSentenceId\tPhrase\n'), fields=('PhraseId', 'sentiment'))
+    assert store.get(job_id)['status'] == QUEUED
+    assert store.get(job_id)['fields'] == ('PhraseId', 'sentiment')
+
+    job = store.claim()
+    assert job['id'] == job_id and job['status'] == RUNNING
+    assert store.claim() is None  # un job n'est pris qu'une fois
+
+    store.save_progress(job_id, dict(job['progress'], rows_in=100, seconds=2.0), job['owner'])
+    assert store.summary(job_id)['rows_per_second'] == 50.0
+
+    # Un job 'running' sans progression récente est remis en attente avec sa progression
+    assert store.requeue_interrupted(lease=60) == 0
+    time.sleep(0.01)
+    assert store.requeue_interrupted(lease=0) == 1
+    job = store.claim()
+    assert job['progress']['rows_in'] == 100
+
+    store.finish(job_id, job['owner'])
+    assert store.get(job_id)['status'] == DONE
+
+
+def test_job_store_survives_restart(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'), str(tmp_path / 'jobs'))
+    job_id = store.create(io.BytesIO(b'x'))
+    restarted = JobStore(str(tmp_path / 'jobs.db'), str(tmp_path / 'jobs'))
+    assert restarted.claim()['id'] == job_id
+
+
+def test_job_lease_is_renewed_and_fences_the_previous_owner(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.db'), str(tmp_path / 'jobs'))
+    job_id = store.create(io.BytesIO(b'x'))
+    job = store.claim()
+
+    # Le bail est renouvelé pendant le traitement, même sans point de reprise
+    with store.lease(job, interval=0.01) as bail:
+        time.sleep(0.1)
+        assert store.requeue_interrupted(lease=0.05) == 0
+        assert not bail.is_set()
+
+    # Bail expiré : un autre worker reprend le job, l'ancien ne peut plus rien écrire
+    time.sleep(0.06)
+    assert store.requeue_interrupted(lease=0.05) == 1
+    repris = store.claim()
+    assert repris['owner'] != job['owner']
+    with pytest.raises(JobLeaseLostError):
+        store.save_progress(job_id, job['progress'], job['owner'])
+    with pytest.raises(JobLeaseLostError):
+        store.finish(job_id, job['owner'])
+    with store.lease(job, interval=0.01) as bail:
+        assert bail.lost.wait(1)
+        assert bail.is_set()
+    store.finish(job_id, repris['owner'])
+    assert store.get(job_id)['status'] == DONE
@@ -0,0 +1,97 @@
+import pandas as pd
+import language
+from language import LanguageCache, anglais_evident, detecter_langue, detecter_langues_lot, is_english, modele_langues, text_key
+from preprocessing import detecter_langues
+
+
+def test_language_cache_evicts_least_recently_used():
+    cache = LanguageCache(maxsize=2)
+    cache.set(b'a', 'en')
+    cache.set(b'b', 'fr')
+    assert cache.get(b'a') == 'en'  # 'a' devient le plus récent
+    cache.set(b'c', 'de')
+    assert cache.get(b'b') is None
+    assert len(cache) == 2
+
+
+def test_detecter_langue_uses_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(language, 'LANGID_ENGINE', 'langdetect')
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    monkeypatch.setattr(language, 'detect', lambda text: calls.append(text) or 'en')
+    assert detecter_langue('A great movie') == 'en'
+    assert detecter_langue('A great movie') == 'en'
+    assert calls == ['A great movie']
+    assert language.language_cache.hits == 1
+
+
+def test_detecter_langue_unknown_on_failure():
+    assert detecter_langue('') == 'unknown'
+    assert detecter_langue(None) == 'unknown'
+    assert not is_english('')
+
+
+def test_text_key_is_stable():
+    assert text_key('Hello World') == text_key('Hello World')
+    assert text_key('Hello World') != text_key('Hello world')
+
+
+def test_detecter_langues_keeps_known_languages(monkeypatch):
+    monkeypatch.setattr(language, 'detect', lambda text: 'fr')
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    df = pd.DataFrame({'Phrase': ['Hello World', 'Bonjour le monde']})
+    result = detecter_langues(df, 'Phrase', pd.Series(['en', None]))
+    assert list(result['langue_detectee']) == ['en', 'fr']
+
+
+def test_detecter_langues_ignores_uploaded_language_column(monkeypatch):
+    # Un client ne peut pas déclarer ses lignes anglaises pour passer le filtre de langue
+    monkeypatch.setattr(language, 'detect', lambda text: 'fr')
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    df = pd.DataFrame({'Phrase': ['Bonjour le monde'], 'langue_detectee': ['en']})
+    assert list(detecter_langues(df, 'Phrase')['langue_detectee']) == ['fr']
+
+
+def test_ngram_model_identifies_languages():
+    langues, confiances = modele_langues().predict(
+        ['Ceci est un très bon film', 'Das ist ein sehr guter Film', 'Una película muy buena', ''])
+    assert langues == ['fr', 'de', 'es', 'unknown']
+    assert confiances[3] == 0
+
+
+def test_ngram_model_ignores_nul_characters(monkeypatch):
+    # Un caractère nul dans un commentaire ne décale pas les textes suivants du lot
+    textes = ['A great\x00movie', 'Ceci est un très bon film', 'Das ist ein sehr guter Film']
+    langues, _ = modele_langues().predict(textes)
+    assert langues[1:] == ['fr', 'de']
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    assert detecter_langues_lot(['\x00'] + textes)[2:] == ['fr', 'de']
+
+
+def test_english_fast_path():
+    assert anglais_evident('This is one of the best movies of the year')
+    assert not anglais_evident('Le film est très bon')
+    assert not anglais_evident('Great movie')
+
+
+def test_detecter_langues_lot_matches_single_detection(monkeypatch):
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    textes = ['A gripping story and the acting was superb', 'Ceci est un très bon film', None, '']
+    langues = detecter_langues_lot(textes)
+    assert langues == ['en', 'fr', 'unknown', 'unknown']
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    assert [detecter_langue(text) for text in textes] == langues
+
+
+def test_short_foreign_texts_are_not_classified_as_english(monkeypatch):
+    # Le modèle hésite sur ces textes courts : langdetect tranche, aucun n'est classé anglais
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    assert detecter_langues_lot(['Le film', 'Una película aburrida', 'Me encantó']) == ['fr', 'es', 'es']
+
+
+def test_uncertain_texts_go_to_langdetect(monkeypatch):
+    calls = []
+    monkeypatch.setattr(language, 'detect', lambda text: calls.append(text) or 'fr')
+    monkeypatch.setattr(language, 'language_cache', LanguageCache(maxsize=10))
+    assert detecter_langues_lot(['Le film', 'Ceci est un très bon film']) == ['fr', 'fr']
+    assert calls == ['Le film']
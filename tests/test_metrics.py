@@ -0,0 +1,39 @@
+import json
+import logging
+from metrics import Histogram, counter, gauge, histogram, exposition
+from logs import JsonFormatter
+
+
+def test_exposition_prometheus_text_format():
+    histogram('test_latency_seconds', "Durée", (0.1, 1), endpoint='/a').observe(0.05)
+    histogram('test_latency_seconds', "Durée", (0.1, 1), endpoint='/a').observe(2)
+    histogram('test_latency_seconds', "Durée", (0.1, 1), endpoint='/b').observe(0.5)
+    counter('test_rows_dropped_total', "Lignes", stage='supprimer_non_anglais').inc(3)
+    gauge('test_pending', "En attente", lambda: 7)
+
+    lines = exposition().splitlines()
+    assert lines.count('# TYPE test_latency_seconds histogram') == 1
+    assert 'test_latency_seconds_bucket{endpoint="/a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{endpoint="/a",le="+Inf"} 2' in lines
+    assert 'test_latency_seconds_count{endpoint="/b"} 1' in lines
+    assert 'test_rows_dropped_total{stage="supprimer_non_anglais"} 3' in lines
+    assert 'test_pending 7' in lines
+
+
+def test_label_values_are_escaped():
+    counter('test_escaped_total', "Échappement", path='a"b\\c').inc()
+    assert 'test_escaped_total{path="a\\"b\\\\c"} 1' in exposition().splitlines()
+
+
+def test_histogram_without_labels_is_unchanged():
+    h = Histogram('test_plain', "Simple", (1,))
+    h.observe(0.5)
+    assert h.samples() == ['test_plain_bucket{le="1"} 1', 'test_plain_bucket{le="+Inf"} 1',
+                           'test_plain_sum 0.5', 'test_plain_count 1']
+
+
+def test_json_log_lines_carry_extra_fields():
+    record = logging.LogRecord('api', logging.INFO, __file__, 1, "Fichier nettoyé", None, None)
+    record.rows = 17
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['level'] == 'INFO' and entry['message'] == "Fichier nettoyé" and entry['rows'] == 17
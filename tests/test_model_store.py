@@ -0,0 +1,87 @@
+import os
+import joblib
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.pipeline import Pipeline
+from model_store import ModelStore, ModelNotReadyError, charger_scorer, file_sha256, scorer_path, supprimer_anciens_exports
+
+TEXTS = ["a wonderful film", "terrible acting", "i loved it", "boring plot", "great cast", "a waste of time"]
+LABELS = [4, 0, 3, 1, 4, 0]
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB())]).fit(TEXTS, LABELS)
+    path = tmp_path / 'model.joblib'
+    joblib.dump(pipeline, path)
+    return str(path)
+
+
+def test_charger_scorer_exports_once_per_version(model_path, tmp_path):
+    scorer_dir = str(tmp_path / 'scorers')
+    scorer, version = charger_scorer(model_path, scorer_dir)
+    assert version == file_sha256(model_path)
+    assert os.path.isfile(os.path.join(scorer_path(scorer_dir, version), 'config.json'))
+
+    # Le second chargement relit l'export au lieu de recompiler le pipeline
+    reloaded, _ = charger_scorer(model_path, scorer_dir)
+    assert list(reloaded.predict(TEXTS)) == list(scorer.predict(TEXTS))
+
+
+def test_model_store_not_ready_before_load(model_path, tmp_path):
+    store = ModelStore(model_path, str(tmp_path / 'scorers'))
+    with pytest.raises(ModelNotReadyError):
+        store.scorer
+    store.load()
+    assert len(store.scorer.predict(TEXTS)) == len(TEXTS)
+
+
+def test_model_store_hot_reload_swaps_version(model_path, tmp_path):
+    store = ModelStore(model_path, str(tmp_path / 'scorers'))
+    warmed = []
+    store.warmup = warmed.append
+    old_scorer = store.load()
+    old_version = store.version
+
+    # Même fichier : rien à recharger
+    assert not store.reload()
+
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB(alpha=0.1))]).fit(TEXTS, LABELS)
+    joblib.dump(pipeline, model_path)
+    assert store.has_changed()
+    assert store.reload()
+    assert store.version != old_version
+    assert store.scorer is not old_scorer
+    assert warmed == [old_scorer, store.scorer]
+    # L'ancien scorer, encore tenu par une requête en cours, reste utilisable
+    assert len(old_scorer.predict(TEXTS)) == len(TEXTS)
+
+
+def test_exports_still_in_use_are_kept_during_rolling_reload(model_path, tmp_path):
+    scorer_dir = str(tmp_path / 'scorers')
+    worker, retard = ModelStore(model_path, scorer_dir), ModelStore(model_path, scorer_dir)
+    worker.load()
+    retard.load()
+    versions = [worker.version]
+    for alpha in (0.1, 0.01):
+        pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB(alpha=alpha))]).fit(TEXTS, LABELS)
+        joblib.dump(pipeline, model_path)
+        assert worker.reload()
+        versions.append(worker.version)
+        # Version en service et précédente gardées, quelle que soit leur date
+        exports = sorted(os.listdir(scorer_dir))
+        assert exports == sorted(os.path.basename(scorer_path(scorer_dir, version)) for version in versions[-2:])
+        if alpha == 0.1:
+            # Le worker en retard sert encore la première version, puis recharge la nouvelle sans erreur
+            assert len(retard.scorer.predict(TEXTS)) == len(TEXTS)
+            assert retard.reload() and retard.version == worker.version
+
+
+def test_supprimer_anciens_exports_compares_hashes(tmp_path):
+    scorer_dir = str(tmp_path / 'scorers')
+    for version in ('a' * 64, 'b' * 64, 'c' * 64):
+        os.makedirs(scorer_path(scorer_dir, version))
+    os.makedirs(os.path.join(scorer_dir, '.tmp-export'))
+    assert supprimer_anciens_exports(scorer_dir, ('c' * 64, 'a' * 64, None)) == ['b' * 16]
+    assert sorted(os.listdir(scorer_dir)) == ['.tmp-export', 'a' * 16, 'c' * 16]
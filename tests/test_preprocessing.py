@@ -13,7 +13,14 @@ from preprocessing import (
     replace_empty_with_nan,
     remove_short_words,
     remove_duplicates_by_column,
-    supprimer_termes_3_caracteres_identiques
+    supprimer_termes_3_caracteres_identiques,
+    PreprocessingEngine,
+    OUTPUT_COLUMNS,
+    nettoyage_automatisé,
+    nettoyage_parallele,
+    nettoyage_par_morceaux,
+    sauvegarder_table_lemmes,
+    charger_table_lemmes
 )
 
 @pytest.fixture
@@ -83,3 +90,131 @@ def test_supprimer_termes_3_caracteres_identiques():
    tokens = ['hello', 'world', 'good']
    result = supprimer_termes_3_caracteres_identiques(tokens)
    assert result == ['hello', 'world', 'good'], "Échec du test pour les tokens sans caractères identiques"
+
+
+def test_preprocessing_engine_matches_steps():
+    phrase = 'The cats were running http\\SS in the gardens!!'
+    cleaned = clean_text(phrase)
+    without_stopwords = remove_stopwords(cleaned)
+    tokens = remove_consonant_or_vowel_sequences_from_tokens(tokenize_text(without_stopwords))
+    expected = (
+        cleaned,
+        without_stopwords,
+        tokens,
+        supprimer_termes_3_caracteres_identiques(lemmatize_tokens(tokens)),
+        remove_short_words(tokens, min_length=2),
+    )
+    assert PreprocessingEngine().process(phrase) == expected
+
+
+def test_preprocessing_engine_transform_adds_columns(sample_df):
+    result = PreprocessingEngine().transform(sample_df.drop(columns=['cleaned_text', 'tokens']), 'Phrase')
+    assert list(result.columns[-len(OUTPUT_COLUMNS):]) == OUTPUT_COLUMNS
+    assert len(result) == len(sample_df)
+
+
+def test_nettoyage_parallele_matches_sequential():
+    from langdetect import DetectorFactory
+    DetectorFactory.seed = 0
+    phrases = ['This movie was a wonderful surprise', 'The acting was terrible and boring',
+               'I really loved the soundtrack', 'What a waste of two hours']
+    # Doublons de 'SentenceId' et de 'PhraseId' à cheval sur les frontières des morceaux
+    df = pd.DataFrame({
+        'PhraseId': [1, 2, 3, 1, 4, 2, 5, 6],
+        'SentenceId': [1, 1, 2, 3, 4, 4, 5, 6],
+        'Phrase': [phrases[i % 4] for i in range(8)],
+    })
+    expected = nettoyage_automatisé(df.copy())
+    result = nettoyage_parallele(df.copy(), n_workers=2, chunk_size=2)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_nettoyage_parallele_uses_single_process_pool():
+    # Un pool d'un seul processus sert quand même : le nettoyage quitte le processus appelant
+    from concurrent.futures import ThreadPoolExecutor
+    df = pd.DataFrame({'PhraseId': range(4), 'SentenceId': range(4),
+                       'Phrase': ['This movie was a wonderful surprise'] * 4})
+    maps = []
+
+    class Pool(ThreadPoolExecutor):
+        def map(self, *args, **kwargs):
+            maps.append(args)
+            return super().map(*args, **kwargs)
+
+    with Pool(max_workers=1) as pool:
+        result = nettoyage_parallele(df.copy(), n_workers=1, chunk_size=2, executor=pool)
+    assert len(maps) == 1
+    pd.testing.assert_frame_equal(result, nettoyage_automatisé(df.copy()))
+
+
+def test_nettoyage_par_morceaux_matches_full_file():
+    df = pd.DataFrame({
+        'PhraseId': [1, 2, 3, 1, 4, 2, 5],
+        'SentenceId': [1, 1, 2, 3, 2, 4, 5],
+        'Phrase': ['This movie was a wonderful surprise', 'The acting was terrible and boring',
+                   'I really loved the soundtrack', 'What a waste of two hours',
+                   'The plot was clever and funny', 'The ending was far too long',
+                   'A great cast and a moving story'],
+    })
+    expected = nettoyage_automatisé(df.copy())
+    chunks = [df.iloc[start:start + 3] for start in range(0, len(df), 3)]
+    result = pd.concat(nettoyage_par_morceaux(chunks))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_table_lemmes_round_trip(tmp_path):
+    table = {'cats': (True, 'cat'), 'strengths': (False, '')}
+    chemin = tmp_path / 'lemmes.tsv'
+    sauvegarder_table_lemmes(table, chemin)
+    assert charger_table_lemmes(chemin) == table
+
+
+def test_preprocessing_engine_uses_lemma_table_without_wordnet(monkeypatch):
+    import preprocessing
+    monkeypatch.setattr(preprocessing, 'get_lemmatizer', lambda: pytest.fail("WordNet ne doit pas être chargé"))
+    engine = PreprocessingEngine(lemma_table={'cats': (True, 'cat'), 'strengths': (False, '')}, wordnet_fallback=False)
+    entries = {token: engine.token_entry(token) for token in ['cats', 'strengths', 'a', 'dogs']}
+    row = engine.combine(('cats strengths a dogs', 'cats strengths a dogs', ['cats', 'strengths', 'a', 'dogs']), entries)
+    assert row[2] == ['cats', 'a', 'dogs']
+    assert row[3] == ['cat', 'a', 'dogs']  # 'dogs' absent de la table : gardé tel quel
+    assert row[4] == ['cats', 'dogs']
+
+
+def test_preprocessing_engine_computes_only_requested_columns(monkeypatch):
+    import preprocessing
+    df = pd.DataFrame({'Phrase': ['The cats were running quickly', 'Dogs barked']})
+    full = PreprocessingEngine().transform(df)
+
+    # Sans 'lemmatized_tokens', WordNet n'est jamais appelé
+    monkeypatch.setattr(preprocessing, 'get_lemmatizer', lambda: pytest.fail("WordNet ne doit pas être chargé"))
+    lean = PreprocessingEngine().with_columns(['tokens', 'cleaned_text']).transform(df)
+    assert list(lean.columns) == ['Phrase', 'cleaned_text', 'tokens']
+    assert lean['cleaned_text'].equals(full['cleaned_text'])
+    assert lean['tokens'].tolist() == full['tokens'].tolist()
+    assert not PreprocessingEngine(columns=['tokens']).needs_wordnet
+
+    with pytest.raises(ValueError):
+        PreprocessingEngine(columns=['sentiment'])
+
+
+def test_stage_observers_report_dropped_rows():
+    from preprocessing import add_stage_observer, remove_stage_observer
+    events = []
+    observer = add_stage_observer(lambda *event: events.append(event))
+    df = pd.DataFrame({
+        'PhraseId': [1, 2, 2, 3, 4],
+        'SentenceId': [1, 2, 2, 3, 4],
+        'Phrase': ['This movie was a wonderful surprise', 'The acting was terrible and boring',
+                   'The acting was terrible and boring', 'Ce film était vraiment magnifique et émouvant',
+                   'I really loved the soundtrack'],
+    })
+    try:
+        nettoyage_automatisé(df)
+    finally:
+        remove_stage_observer(observer)
+    stages = {stage: (rows_in, rows_out) for stage, _, rows_in, rows_out in events}
+    assert stages['keep_first_occurrence'] == (5, 4)
+    assert stages['supprimer_non_anglais'] == (4, 3)
+    assert stages['remove_nan_rows'] == (3, 3)
+    assert {'split', 'token_entries', 'combine'} <= set(stages)
+    assert all(seconds >= 0 for _, seconds, _, _ in events)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.pipeline import Pipeline
+from scorer import CompiledScorer
+
+TEXTS = [
+    "a wonderful and moving film", "the acting was terrible", "i loved every minute of it",
+    "boring plot and bad dialogue", "a great cast with a clever story", "what a waste of time",
+    "the soundtrack was beautiful", "painfully slow and predictable", "an instant classic",
+    "the worst movie of the year", "funny touching and smart", "dull characters everywhere",
+]
+LABELS = [4, 0, 4, 1, 3, 0, 3, 1, 4, 0, 3, 1]
+
+
+@pytest.mark.parametrize("vectorizer", [
+    TfidfVectorizer(max_df=0.5),
+    TfidfVectorizer(ngram_range=(1, 3), stop_words='english', strip_accents='unicode'),
+])
+def test_compiled_scorer_matches_pipeline(vectorizer):
+    pipeline = Pipeline([('vectorizer', vectorizer), ('classifier', BernoulliNB(alpha=1))]).fit(TEXTS, LABELS)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    texts = TEXTS + ["a film never seen before", "", "Éléphant terrible et boring"]
+    np.testing.assert_array_equal(scorer.predict(texts), pipeline.predict(texts))
+    expected = pipeline.named_steps['classifier'].predict_joint_log_proba(pipeline.named_steps['vectorizer'].transform(texts))
+    np.testing.assert_allclose(scorer.decision_function(texts), expected)
+
+
+def test_compiled_scorer_save_and_load(tmp_path):
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB())]).fit(TEXTS, LABELS)
+    scorer = CompiledScorer.from_pipeline(pipeline)
+    scorer.save(tmp_path)
+    loaded = CompiledScorer.load(tmp_path)
+    np.testing.assert_array_equal(loaded.predict(TEXTS), scorer.predict(TEXTS))
+
+
+def test_compiled_scorer_rejects_non_binarized_classifier():
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB(binarize=None))]).fit(TEXTS, LABELS)
+    with pytest.raises(ValueError):
+        CompiledScorer.from_pipeline(pipeline)
+
+
+def test_compiled_scorer_empty_input():
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', BernoulliNB())]).fit(TEXTS, LABELS)
+    assert len(CompiledScorer.from_pipeline(pipeline).predict([])) == 0
@@ -0,0 +1,53 @@
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import GridSearchCV
+from scorer import CompiledScorer
+from training import (build_pipeline, train_with_grid_search, cross_validation_scores, build_incremental_pipeline,
+                      train_incremental, save_model)
+
+TEXTS = [
+    "a wonderful and moving film", "the acting was terrible", "i loved every minute of it",
+    "boring plot and bad dialogue", "a great cast with a clever story", "what a waste of time",
+    "the soundtrack was beautiful", "painfully slow and predictable", "an instant classic",
+    "the worst movie of the year", "funny touching and smart", "dull characters everywhere",
+] * 3
+LABELS = [4, 0, 4, 1, 3, 0, 3, 1, 4, 0, 3, 1] * 3
+GRID = {'vectorizer__ngram_range': [(1, 1), (1, 2)], 'classifier__alpha': [0.1, 1]}
+
+
+def test_cached_grid_search_matches_plain_search():
+    plain = GridSearchCV(build_pipeline(), GRID, cv=3).fit(TEXTS, LABELS)
+    cached = train_with_grid_search(TEXTS, LABELS, GRID, cv=3, n_jobs=1, verbose=0)
+    assert cached.best_params_ == plain.best_params_
+    np.testing.assert_allclose(cached.cv_results_['mean_test_score'], plain.cv_results_['mean_test_score'])
+    assert cached.best_estimator_.memory is None
+
+    scores = cross_validation_scores(cached)
+    assert len(scores) == 3 and scores.mean() == cached.best_score_
+
+
+def test_incremental_training_matches_full_fit():
+    df = pd.DataFrame({'lemmatized_tokens': TEXTS, 'Sentiment': LABELS})
+    chunks = [df.iloc[start:start + 10] for start in range(0, len(df), 10)]
+    model, stats = train_incremental(chunks, build_incremental_pipeline(n_features=2 ** 12))
+    full = build_incremental_pipeline(n_features=2 ** 12).fit(TEXTS, LABELS)
+    # partial_fit connaît les 5 classes dès le départ, la classe 2 absente reste vide
+    np.testing.assert_array_equal(model.named_steps['classifier'].feature_count_[[0, 1, 3, 4]],
+                                  full.named_steps['classifier'].feature_count_)
+    assert stats['rows'] == len(df) and stats['evaluated_rows'] == len(df) - 10
+
+    # Mise à jour d'un modèle existant avec de nouvelles lignes
+    model, _ = train_incremental([df.iloc[:6]], model)
+    assert model.named_steps['classifier'].class_count_.sum() == len(df) + 6
+
+
+def test_incremental_model_compiles_for_serving(tmp_path):
+    model, _ = train_incremental([pd.DataFrame({'lemmatized_tokens': TEXTS, 'Sentiment': LABELS})],
+                                 build_incremental_pipeline(n_features=2 ** 12, ngram_range=(1, 2)))
+    scorer = CompiledScorer.from_pipeline(model)
+    texts = TEXTS + ["a film never seen before", ""]
+    np.testing.assert_array_equal(scorer.predict(texts), model.predict(texts))
+
+    save_model(model, str(tmp_path / 'model.joblib'))
+    assert joblib.load(tmp_path / 'model.joblib').named_steps['vectorizer'].n_features == 2 ** 12
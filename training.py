@@ -0,0 +1,221 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.metrics import accuracy_score, classification_report
+from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.pipeline import Pipeline
+from formats import format_entree, lire_tableau, lire_par_morceaux
+from model_store import MODEL_PATH
+
+# Colonnes du fichier nettoyé utilisées pour l'entraînement
+TEXT_COLUMN = os.environ.get("TRAINING_TEXT_COLUMN", "lemmatized_tokens")
+TARGET_COLUMN = os.environ.get("TRAINING_TARGET_COLUMN", "Sentiment")
+
+# Processus de la recherche d'hyperparamètres (-1 = tous les cœurs)
+TRAINING_JOBS = int(os.environ.get("TRAINING_JOBS", "-1"))
+
+# Lignes lues à la fois par l'entraînement par morceaux
+TRAINING_CHUNK_ROWS = int(os.environ.get("TRAINING_CHUNK_ROWS", "100000"))
+
+# Taille de l'espace haché de l'entraînement par morceaux (défaut de HashingVectorizer)
+HASHING_FEATURES = int(os.environ.get("HASHING_FEATURES", str(2 ** 20)))
+
+# Classes de sentiment du corpus (0 à 4) : partial_fit doit les connaître dès le premier morceau
+SENTIMENT_CLASSES = (0, 1, 2, 3, 4)
+
+# Grille d'hyperparamètres des notebooks
+PARAM_GRID = {
+    'vectorizer__ngram_range': [(1, 1), (1, 2), (1, 3)],  # Test des unigrammes, bigrammes, trigrammes
+    'vectorizer__max_df': [0.5, 0.6, 0.7, 0.8, 0.9, 1.0],  # Filtrage par fréquence maximale
+    'vectorizer__min_df': [1, 5, 10, 15, 20],  # Filtrage par fréquence minimale
+    'vectorizer__max_features': [None, 500, 1000],  # Limite du nombre de mots
+    'classifier__alpha': [0.1, 1, 10],  # Hyperparamètre alpha de BernoulliNB
+}
+
+
+# Read a training file: CSV (the notebooks' df_clean_filtered.csv), TSV, NDJSON, Parquet or Arrow
+def load_data(file_path):
+    if file_path.endswith('.csv'):
+        return pd.read_csv(file_path)
+    with open(file_path, 'rb') as f:
+        return lire_tableau(f.read(), format_entree(filename=file_path))
+
+# Read a training file chunk by chunk, without loading it entirely
+def load_data_chunks(file_path, chunksize=TRAINING_CHUNK_ROWS):
+    if file_path.endswith('.csv'):
+        yield from pd.read_csv(file_path, chunksize=chunksize)
+        return
+    with open(file_path, 'rb') as f:
+        yield from lire_par_morceaux(f, format_entree(filename=file_path), chunksize)
+
+def split_data(df, text_column=TEXT_COLUMN, target_column=TARGET_COLUMN, test_size=0.2, random_state=42):
+    X = df[text_column]
+    y = df[target_column]
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    return X_train, X_test, y_train, y_test
+
+# TfidfVectorizer + BernoulliNB pipeline, as compiled by scorer.CompiledScorer
+def build_pipeline(memory=None):
+    return Pipeline([
+        ('vectorizer', TfidfVectorizer()),  # Vectorisation avec TfidfVectorizer
+        ('classifier', BernoulliNB()),      # Classificateur Bernoulli Naive Bayes
+    ], memory=memory)
+
+# Grid search over all cores, each vectorization computed once per fold and shared by the candidates
+def train_with_grid_search(X_train, y_train, param_grid=PARAM_GRID, cv=5, n_jobs=TRAINING_JOBS, cache_dir=None, verbose=1):
+    """Recherche les meilleurs hyperparamètres et renvoie le GridSearchCV entraîné.
+
+    La vectorisation est mise en cache (Pipeline(memory=...)) : les candidats qui ne
+    diffèrent que par classifier__alpha réutilisent la matrice TF-IDF déjà calculée
+    pour le même pli au lieu de refaire fit_transform. Le cache est sur disque, donc
+    partagé par les processus de n_jobs, et supprimé à la fin sauf si cache_dir est fourni.
+    """
+    cache = cache_dir or tempfile.mkdtemp(prefix='training-cache-')
+    try:
+        grid_search = GridSearchCV(build_pipeline(memory=cache), param_grid, cv=cv, verbose=verbose, n_jobs=n_jobs)
+        grid_search.fit(X_train, y_train)
+    finally:
+        if cache_dir is None:
+            shutil.rmtree(cache, ignore_errors=True)
+    # Le modèle sauvegardé ne garde pas de référence au dossier de cache
+    grid_search.best_estimator_.set_params(memory=None)
+    return grid_search
+
+# Cross-validation scores of the best candidate, read from the search instead of refitting
+def cross_validation_scores(grid_search):
+    index = grid_search.best_index_
+    return np.array([grid_search.cv_results_[f'split{fold}_test_score'][index] for fold in range(grid_search.n_splits_)])
+
+def map_labels(labels):
+    return ['Négatif' if label in [0, 1] else 'Positif' for label in labels]
+
+# Accuracy and classification report on the held-out split (Négatif / Positif, as in the notebooks)
+def evaluate_model(model, X_test, y_test):
+    y_test_mapped = map_labels(y_test)
+    y_pred_mapped = map_labels(model.predict(X_test))
+    accuracy = accuracy_score(y_test_mapped, y_pred_mapped)
+    report = classification_report(y_test_mapped, y_pred_mapped, labels=["Négatif", "Positif"], zero_division=0)
+    return accuracy, report
+
+# Save the model atomically: the API reloads the file as soon as it changes
+def save_model(model, model_path=MODEL_PATH):
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    temporaire = model_path + '.tmp'
+    joblib.dump(model, temporaire)
+    os.replace(temporaire, model_path)
+
+# HashingVectorizer + BernoulliNB pipeline for out-of-core training (no vocabulary to hold in memory)
+def build_incremental_pipeline(n_features=HASHING_FEATURES, ngram_range=(1, 1), alpha=1.0):
+    return Pipeline([
+        # Sans signes alternés ni normalisation : seule la présence des termes compte pour BernoulliNB
+        ('vectorizer', HashingVectorizer(n_features=n_features, ngram_range=ngram_range, alternate_sign=False, norm=None)),
+        ('classifier', BernoulliNB(alpha=alpha)),
+    ])
+
+# Train, or update, a pipeline chunk by chunk with BernoulliNB.partial_fit
+def train_incremental(chunks, model=None, text_column=TEXT_COLUMN, target_column=TARGET_COLUMN,
+                      classes=SENTIMENT_CLASSES, on_chunk=None):
+    """Entraîne un modèle sur une suite de morceaux (DataFrame) sans jamais charger tout le corpus.
+
+    Sans model, un pipeline HashingVectorizer + BernoulliNB est créé. Avec un modèle
+    existant (y compris le pipeline TF-IDF des notebooks, dont le vocabulaire reste
+    alors figé), ses comptes sont complétés : la mise à jour hebdomadaire ne porte
+    que sur les nouvelles données. Chaque morceau est d'abord prédit par le modèle
+    courant puis appris (validation progressive) : stats['progressive_accuracy']
+    estime la précision sans jeu de test séparé.
+    """
+    model = model or build_incremental_pipeline()
+    vectorizer = model.steps[0][1]
+    classifier = model.steps[-1][1]
+    stats = {'chunks': 0, 'rows': 0, 'evaluated_rows': 0, 'correct': 0, 'seconds': 0.0}
+
+    debut = time.perf_counter()
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=[text_column, target_column])
+        if not len(chunk):
+            continue
+        X = vectorizer.transform(chunk[text_column].astype(str))
+        y = chunk[target_column].to_numpy()
+        if hasattr(classifier, 'classes_'):
+            stats['correct'] += int((classifier.predict(X) == y).sum())
+            stats['evaluated_rows'] += len(y)
+            classifier.partial_fit(X, y)
+        else:
+            classifier.partial_fit(X, y, classes=np.asarray(classes))
+        stats['chunks'] += 1
+        stats['rows'] += len(y)
+        stats['seconds'] = time.perf_counter() - debut
+        if on_chunk is not None:
+            on_chunk(stats)
+
+    stats['progressive_accuracy'] = stats['correct'] / stats['evaluated_rows'] if stats['evaluated_rows'] else None
+    return model, stats
+
+
+# Grid search mode: hold-out split, parallel cached search, CV scores of the best candidate, evaluation
+def main_grid_search(file_path, model_path=MODEL_PATH, cv=5, n_jobs=TRAINING_JOBS):
+    df = load_data(file_path).dropna(subset=[TEXT_COLUMN, TARGET_COLUMN])
+    X_train, X_test, y_train, y_test = split_data(df)
+
+    debut = time.perf_counter()
+    grid_search = train_with_grid_search(X_train, y_train, cv=cv, n_jobs=n_jobs)
+    print(f"Recherche terminée en {time.perf_counter() - debut:.1f} s : {grid_search.best_params_}")
+
+    scores = cross_validation_scores(grid_search)
+    print(f'Cross-validation scores: {scores}')
+    print(f'Average cross-validation score: {scores.mean()}')
+
+    accuracy, report = evaluate_model(grid_search.best_estimator_, X_test, y_test)
+    print(report)
+    save_model(grid_search.best_estimator_, model_path)
+    print(f'Modèle sauvegardé sous : {model_path}')
+    return grid_search
+
+# Out-of-core mode: stream the file through partial_fit, optionally on top of the current model
+def main_incremental(file_path, model_path=MODEL_PATH, update=False, chunksize=TRAINING_CHUNK_ROWS,
+                     n_features=HASHING_FEATURES, ngram_max=1, alpha=1.0):
+    model = joblib.load(model_path) if update else build_incremental_pipeline(n_features, (1, ngram_max), alpha)
+
+    def afficher(stats):
+        print(f"{stats['rows']} lignes apprises ({stats['rows'] / stats['seconds']:.0f} lignes/s)", flush=True)
+
+    model, stats = train_incremental(load_data_chunks(file_path, chunksize), model, on_chunk=afficher)
+    if stats['progressive_accuracy'] is not None:
+        print(f"Précision progressive : {stats['progressive_accuracy']:.4f}")
+    save_model(model, model_path)
+    print(f'Modèle sauvegardé sous : {model_path}')
+    return model, stats
+
+
+if __name__ == "__main__":
+    # python training.py grid df_clean_filtered.csv
+    # python training.py incremental nouveaux_avis.csv --update
+    parser = argparse.ArgumentParser(description="Entraîne le modèle de sentiment (TF-IDF + BernoulliNB).")
+    parser.add_argument('--output', default=MODEL_PATH, help="fichier du modèle (celui que l'API surveille par défaut)")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    grid = modes.add_parser('grid', help="recherche d'hyperparamètres sur un fichier tenant en mémoire")
+    grid.add_argument('fichier')
+    grid.add_argument('--cv', type=int, default=5, help="nombre de plis de validation croisée")
+    grid.add_argument('--jobs', type=int, default=TRAINING_JOBS, help="processus (-1 = tous les cœurs)")
+
+    incremental = modes.add_parser('incremental', help="entraînement par morceaux (HashingVectorizer + partial_fit)")
+    incremental.add_argument('fichier')
+    incremental.add_argument('--update', action='store_true', help="compléter le modèle existant au lieu d'en créer un")
+    incremental.add_argument('--chunksize', type=int, default=TRAINING_CHUNK_ROWS, help="lignes par morceau")
+    incremental.add_argument('--n-features', type=int, default=HASHING_FEATURES, help="taille de l'espace haché")
+    incremental.add_argument('--ngram-max', type=int, default=1, help="longueur maximale des n-grammes")
+    incremental.add_argument('--alpha', type=float, default=1.0, help="lissage de BernoulliNB")
+
+    args = parser.parse_args()
+    if args.mode == 'grid':
+        main_grid_search(args.fichier, args.output, args.cv, args.jobs)
+    else:
+        main_incremental(args.fichier, args.output, args.update, args.chunksize, args.n_features, args.ngram_max, args.alpha)